@@ -0,0 +1,58 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .constants import POST_TYPE
+from .models import Nominations, Post
+from .viewer import FEEDS_CACHE
+
+
+NOMINATION_STATUS = import_string(settings.NOMINATION_STATUS)
+APPROVALS_COUNT_TIMEOUT = getattr(settings, "FEEDS_APPROVALS_COUNT_TIMEOUT", 10 * 60)
+
+
+def get_approvals_count_key(user_id):
+    return "feeds:approvals_count:{}".format(user_id)
+
+
+def pending_approvals_count(user):
+    """
+    Returns the number of nominations (posts) waiting for the review of the user as assigned or alternate reviewer
+    user: CustomUser
+    """
+    return Post.objects.filter(
+        Q(nomination__assigned_reviewer=user) | Q(nomination__alternate_reviewer=user),
+        post_type=POST_TYPE.USER_CREATED_NOMINATION, mark_delete=False
+    ).exclude(nomination__nom_status__in=[NOMINATION_STATUS.approved, NOMINATION_STATUS.rejected]).count()
+
+
+def get_approvals_count(user):
+    """
+    Returns the cached pending_approvals_count of the user, refer invalidate_approvals_count
+    user: CustomUser
+    """
+    key = get_approvals_count_key(user.pk)
+    approvals_count = FEEDS_CACHE.get(key)
+    if approvals_count is None:
+        approvals_count = pending_approvals_count(user)
+        FEEDS_CACHE.set(key, approvals_count, APPROVALS_COUNT_TIMEOUT)
+    return approvals_count
+
+
+def invalidate_approvals_count(user_ids):
+    """
+    Removes the cached approvals count of the given reviewers
+    user_ids: Iterable[int]
+    """
+    FEEDS_CACHE.delete_many([get_approvals_count_key(user_id) for user_id in set(user_ids) if user_id])
+
+
+def get_nomination_reviewer_ids(nomination_ids):
+    """Returns the ids of assigned and alternate reviewers of the nominations"""
+    reviewer_ids = set()
+    for reviewers in Nominations.objects.filter(id__in=nomination_ids).values_list(
+            "assigned_reviewer_id", "alternate_reviewer_id"):
+        reviewer_ids.update(reviewers)
+    return reviewer_ids
@@ -0,0 +1,66 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .constants import SHARED_WITH
+
+
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+EMPLOYEE_ID_STORE_MODEL = import_string(settings.EMPLOYEE_ID_STORE)
+USER_DEPARTMENT_RELATED_NAME = settings.USER_DEPARTMENT_RELATED_NAME
+
+
+def department_users_query(departments):
+    """Returns the query matching the users of the departments (departments: QuerySet[Department])"""
+    return Q(id__in=USERMODEL.objects.filter(
+        **{"{}__in".format(USER_DEPARTMENT_RELATED_NAME): departments.values("id")}).values("id"))
+
+
+def job_family_users_query(**filters):
+    """Returns the query matching the signed up users of the EmployeeIDStore matching the filters"""
+    return Q(id__in=EMPLOYEE_ID_STORE_MODEL.objects.filter(
+        user__isnull=False, signed_up=True, **filters).values("user_id"))
+
+
+def get_post_audience_query(post):
+    """
+    Returns the query matching the users to be notified about the (staff created) post / poll based on shared_with,
+    None if nobody is to be notified
+    post: Post
+    """
+    creator = post.created_by
+    if post.shared_with == SHARED_WITH.SELF_DEPARTMENT:
+        return department_users_query(getattr(creator, USER_DEPARTMENT_RELATED_NAME).all())
+
+    if post.shared_with == SHARED_WITH.ALL_DEPARTMENTS:
+        return Q(organization_id=creator.organization_id)
+
+    if post.shared_with == SHARED_WITH.SELF_JOB_FAMILY:
+        try:
+            job_family = creator.employee_id_store.job_family
+        except Exception:
+            # User does not have any job family No need to send notification
+            return None
+        return job_family_users_query(user__is_active=True, job_family=job_family)
+
+    if post.shared_with == SHARED_WITH.ORGANIZATION_DEPARTMENTS:
+        return (
+            department_users_query(post.departments.all()) |
+            Q(organization_id__in=post.organizations.values("id")) |
+            job_family_users_query(job_family__in=post.job_families.values("id"))
+        )
+    return None
+
+
+def get_post_audience_ids(post):
+    """
+    Yields the de-duplicated ids (ordered) of the users to be notified about the post, the union of departments,
+    organizations and job families is resolved in a single SQL statement and streamed with iterator()
+    post: Post
+    """
+    query = get_post_audience_query(post)
+    if query is None:
+        return iter(())
+    return USERMODEL.objects.filter(query).order_by("id").values_list("id", flat=True).iterator()
@@ -0,0 +1,4 @@
+"""
+Benchmark of the feeds apis on synthetic tenants, refer the benchmark_feeds management command.
+The generated data is rolled back once the benchmark is over
+"""
@@ -0,0 +1,162 @@
+from __future__ import division, print_function, unicode_literals
+
+import random
+from collections import Counter
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from feeds.constants import POST_TYPE, REACTION_TYPE, SHARED_WITH
+from feeds.counters import reconcile_post_counters
+from feeds.models import Comment, Organization, PollsAnswer, Post, PostLiked, UserJobFamily, UserStrength, Voter
+
+
+DEPARTMENT_MODEL = import_string(settings.DEPARTMENT_MODEL)
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+EMPLOYEE_ID_STORE_MODEL = import_string(settings.EMPLOYEE_ID_STORE)
+
+# number of objects of a tenant per scale, posts are spread across every POST_TYPE and SHARED_WITH
+SCALES = {
+    "small": {"users": 50, "departments": 5, "job_families": 3, "posts": 200, "likes": 5, "comments": 2},
+    "medium": {"users": 500, "departments": 20, "job_families": 10, "posts": 2000, "likes": 10, "comments": 3},
+    "large": {"users": 5000, "departments": 100, "job_families": 30, "posts": 20000, "likes": 20, "comments": 5},
+}
+
+
+class Tenant(object):
+    """Objects of the generated tenant used by the benchmark runner"""
+
+    def __init__(self, organization, admin, users, departments, job_families, posts):
+        self.organization = organization
+        self.admin = admin
+        self.users = users
+        self.departments = departments
+        self.job_families = job_families
+        self.posts = posts
+
+
+class TenantGenerator(object):
+    """
+    Creates a tenant (organization, departments, job families, users, posts, likes, comments, polls and nominations)
+    of the given scale. Objects of the host apps are created with their minimal fields, override the create_*
+    methods and set FEEDS_BENCHMARK_GENERATOR if the host models require more (nominations and appreciation
+    transactions are only generated by such subclass)
+    """
+
+    def __init__(self, scale, seed=0):
+        """
+        scale: dict (refer SCALES)
+        seed: int (same seed generates the same tenant)
+        """
+        self.scale = scale
+        self.random = random.Random(seed)
+
+    def create_organization(self, index):
+        return Organization.objects.create(name="Benchmark {}".format(index))
+
+    def create_department(self, organization, index):
+        return DEPARTMENT_MODEL.objects.create(
+            organization=organization, name="Department {}".format(index), slug="department-{}".format(index))
+
+    def create_job_family(self, organization, index):
+        return UserJobFamily.objects.create(organization=organization, name="Job family {}".format(index))
+
+    def create_user(self, organization, index, is_staff=False):
+        return USERMODEL.objects.create(
+            email="benchmark.{}.{}@example.com".format(organization.pk, index), first_name="User",
+            last_name=str(index), organization=organization, is_staff=is_staff)
+
+    def assign_job_family(self, user, job_family):
+        EMPLOYEE_ID_STORE_MODEL.objects.create(user=user, job_family=job_family, signed_up=True)
+
+    def create_nomination(self, organization, nominator, nominee, reviewer):
+        """Returns the nomination of the nomination post, None skips the nomination posts"""
+        return None
+
+    def create_transaction(self, organization, creator, receiver):
+        """Returns the transaction of the appreciation post, None creates the appreciation without transaction"""
+        return None
+
+    def create_user_strength(self, organization, index):
+        return UserStrength.objects.create(name="Strength {}".format(index))
+
+    def generate(self, index=0):
+        organization = self.create_organization(index)
+        departments = [self.create_department(organization, i) for i in range(self.scale["departments"])]
+        job_families = [self.create_job_family(organization, i) for i in range(self.scale["job_families"])]
+        admin = self.create_user(organization, 0, is_staff=True)
+        users = [admin] + [self.create_user(organization, i) for i in range(1, self.scale["users"])]
+        for user in users:
+            self.random.choice(departments).users.add(user)
+            self.assign_job_family(user, self.random.choice(job_families))
+
+        posts = []
+        post_types = [post_type for post_type, _ in POST_TYPE()]
+        shared_with = [value for value, _ in SHARED_WITH()]
+        for i in range(self.scale["posts"]):
+            post = self.create_post(
+                organization, users, departments, job_families, post_types[i % len(post_types)],
+                shared_with[(i // len(post_types)) % len(shared_with)])
+            if post:
+                posts.append(post)
+        self.create_interactions(posts, users)
+        return Tenant(organization, admin, users, departments, job_families, posts)
+
+    def create_post(self, organization, users, departments, job_families, post_type, shared_with):
+        creator, receiver = self.random.sample(users, 2)
+        data = {
+            "created_by": creator, "post_type": post_type, "shared_with": shared_with,
+            "title": "Benchmark post", "description": "Benchmark description " * 10,
+        }
+        if post_type == POST_TYPE.USER_CREATED_NOMINATION:
+            nomination = self.create_nomination(organization, creator, receiver, self.random.choice(users))
+            if nomination is None:
+                return None
+            data.update(nomination=nomination, user=receiver)
+        elif post_type == POST_TYPE.USER_CREATED_APPRECIATION:
+            data.update(user=receiver)
+        elif post_type == POST_TYPE.GREETING_MESSAGE:
+            data.update(user=receiver, title="greeting_post")
+
+        post = Post.objects.create(**data)
+        post.organizations.add(organization)
+        if shared_with == SHARED_WITH.ORGANIZATION_DEPARTMENTS:
+            post.departments.add(self.random.choice(departments))
+            post.job_families.add(self.random.choice(job_families))
+        if post_type == POST_TYPE.USER_CREATED_APPRECIATION:
+            transaction = self.create_transaction(organization, creator, receiver)
+            if transaction is not None:
+                post.transactions.add(transaction)
+        if post_type == POST_TYPE.USER_CREATED_POLL:
+            PollsAnswer.objects.bulk_create(
+                [PollsAnswer(question=post, answer_text="Answer {}".format(i)) for i in range(3)])
+        return post
+
+    def create_interactions(self, posts, users):
+        """Creates likes, comments and poll votes with bulk_create, the counters are reconciled afterwards"""
+        reaction_types = [reaction_type for reaction_type, _ in REACTION_TYPE()]
+        likes, comments, voters = [], [], []
+        for post in posts:
+            for user in self.random.sample(users, min(self.scale["likes"], len(users))):
+                likes.append(PostLiked(post=post, created_by=user, reaction_type=self.random.choice(reaction_types)))
+            for user in self.random.sample(users, min(self.scale["comments"], len(users))):
+                comments.append(Comment(post=post, created_by=user, content="Benchmark comment"))
+            if post.post_type == POST_TYPE.USER_CREATED_POLL:
+                answers = list(PollsAnswer.objects.filter(question=post))
+                for user in self.random.sample(users, min(self.scale["likes"], len(users))):
+                    voters.append(Voter(question=post, answer=self.random.choice(answers), user=user))
+        PostLiked.objects.bulk_create(likes, batch_size=1000)
+        Comment.objects.bulk_create(comments, batch_size=1000)
+        Voter.objects.bulk_create(voters, batch_size=1000)
+        for answer_id, votes in Counter(voter.answer_id for voter in voters).items():
+            PollsAnswer.objects.filter(pk=answer_id).update(votes=votes)
+        post_ids = [post.id for post in posts]
+        for start in range(0, len(post_ids), 1000):
+            reconcile_post_counters(post_ids[start:start + 1000])
+
+
+def get_tenant_generator(scale, seed=0):
+    """Returns the generator of FEEDS_BENCHMARK_GENERATOR (TenantGenerator by default)"""
+    generator_class = getattr(settings, "FEEDS_BENCHMARK_GENERATOR", None)
+    generator_class = import_string(generator_class) if generator_class else TenantGenerator
+    return generator_class(scale, seed)
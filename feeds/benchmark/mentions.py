@@ -0,0 +1,72 @@
+from __future__ import division, print_function, unicode_literals
+
+import random
+import time
+
+from feeds.benchmark.runner import percentile
+from feeds.utils import Mention, TAG_PATTERN, extract_mentions, extract_user_info
+
+
+def search_mentions(*texts):
+    """Previous implementation of extract_mentions, the email / user id are searched in the body of every tag"""
+    mentions = []
+    for text in texts:
+        if not text:
+            continue
+        for match in TAG_PATTERN.finditer(text):
+            user_info = extract_user_info(match.group(1))
+            if user_info["email_id"] or user_info["user_id"]:
+                mentions.append(Mention(user_info["email_id"], user_info["user_id"]))
+    return mentions
+
+
+class MentionBenchmark(object):
+    """
+    Times the parsing of the mentions of generated descriptions (words, line breaks and mentions by email / user id)
+    with the tokenizer of extract_mentions against the patterns searched per tag (search_mentions)
+    """
+
+    def __init__(self, length, mentions, iterations, seed=0):
+        self.length = length
+        self.mentions = mentions
+        self.iterations = iterations
+        self.random = random.Random(seed)
+
+    def generate_mention(self, index):
+        choice = self.random.randint(0, 2)
+        email = "<email_id>user{}@rewardz.sg</email_id>".format(index)
+        user_id = "<user_id>{}</user_id>".format(index + 1)
+        body = email if choice == 0 else user_id if choice == 1 else email + user_id
+        return '<tag class="mention"><span>@user{}</span>{}</tag>'.format(index, body)
+
+    def generate(self):
+        """Returns a description of about `length` characters having `mentions` mentions"""
+        words = ["feeds", "appreciation", "team", "great", "work", "<b>thanks</b>", "\n"]
+        size = max(self.length // max(self.mentions + 1, 1), 1)
+        parts = []
+        for index in range(self.mentions + 1):
+            text = []
+            while sum(len(word) + 1 for word in text) < size:
+                text.append(self.random.choice(words))
+            parts.append(" ".join(text))
+            if index < self.mentions:
+                parts.append(self.generate_mention(index))
+        return " ".join(parts)
+
+    def run(self):
+        description = self.generate()
+        results = {"length": len(description), "mentions": self.mentions}
+        parsed = {}
+        for name, parse in (("search_mentions", search_mentions), ("extract_mentions", extract_mentions)):
+            latencies = []
+            for _ in range(self.iterations):
+                start = time.time()
+                parsed[name] = parse(description)
+                latencies.append((time.time() - start) * 1000)
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "parsed": len(parsed[name]),
+            }
+        results["mismatches"] = int(parsed["search_mentions"] != parsed["extract_mentions"])
+        return results
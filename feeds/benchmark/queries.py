@@ -0,0 +1,161 @@
+from __future__ import division, print_function, unicode_literals
+
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from feeds.benchmark.runner import percentile
+from feeds.constants import POST_TYPE
+from feeds.models import Post
+from feeds.utils import (
+    accessible_posts_by_user, admin_feeds_to_exclude, assigned_nomination_post_ids, fetch_feeds,
+    get_related_objects_qs, post_api_query, posts_not_shared_with_job_family, posts_not_shared_with_org_department,
+    posts_not_shared_with_self_department, posts_not_visible_to_user,
+    shared_with_all_departments_but_not_belongs_to_user_org,
+)
+from feeds.viewer import get_viewer_context
+
+
+# ordering of the feeds, the id breaks the ties of the generated posts so both implementations read the same page
+FEED_ORDERING = ('-priority', '-modified_on', '-created_on', '-id')
+
+
+def fetch_feeds_by_ids(post_query, exclusion_query, ordering_fields, user, viewer=None):
+    """Previous implementation of fetch_feeds, the ids are read in python and sent back as an IN list"""
+    post_ids = set(Post.objects.filter(post_query).exclude(exclusion_query).values_list('id', flat=True))
+    job_family_id = (viewer or get_viewer_context(user)).job_family_id
+    if job_family_id:
+        post_ids.update(Post.objects.filter(job_families=job_family_id).values_list('id', flat=True))
+    return get_related_objects_qs(Post.objects.filter(id__in=post_ids).order_by(*ordering_fields))
+
+
+def posts_not_visible_to_user_ids(posts, user, post_polls):
+    """Previous implementation of posts_not_visible_to_user, the ids of every rule are read in python"""
+    posts_ids_to_exclude = list(posts_not_shared_with_self_department(posts, user).values_list("id", flat=True))
+    posts_ids_to_exclude.extend(list(admin_feeds_to_exclude(posts, user).values_list("id", flat=True)))
+    posts_ids_to_exclude.extend(list(posts_not_shared_with_org_department(posts, user).values_list("id", flat=True)))
+    if post_polls:
+        posts_ids_to_exclude.extend(list(shared_with_all_departments_but_not_belongs_to_user_org(
+            posts, user).values_list("id", flat=True)))
+        posts_ids_to_exclude.extend(list(posts_not_shared_with_job_family(posts, user).values_list("id", flat=True)))
+
+    posts_ids_not_to_exclude = assigned_nomination_post_ids(user)
+    return list(set(posts_ids_to_exclude) - set(posts_ids_not_to_exclude))
+
+
+def read_page(queryset, page_size=None):
+    """Reads the count and the ids of the first page of the feed, as the paginated list apis do"""
+    page_size = page_size or settings.FEEDS_PAGE_SIZE
+    return queryset.count(), list(queryset.values_list("id", flat=True)[:page_size])
+
+
+class QueryBenchmark(object):
+    """
+    Times the previous and the current implementation of a feed query for sampled users of a generated tenant
+    (refer generator.TenantGenerator) and reports the wall time percentiles, the number of queries and the bytes
+    of SQL sent to the database, the results of both implementations are compared
+    """
+    implementations = ()
+
+    def __init__(self, tenant, iterations, seed=0):
+        self.tenant = tenant
+        self.iterations = iterations
+        self.random = random.Random(seed)
+
+    def get_arguments(self, user):
+        """Returns the arguments of the implementations for the user, built before the queries are captured"""
+        raise NotImplementedError
+
+    @staticmethod
+    def measure(implementation, arguments):
+        # the log of the generated data may be full, the captured queries are counted on the length of the log
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            result = implementation(*arguments)
+            elapsed = time.time() - start
+        return result, elapsed * 1000, len(queries), sum(len(query["sql"].encode("utf-8")) for query in queries)
+
+    def run(self):
+        users = [user for user in self.tenant.users if not user.is_staff]
+        samples = [self.random.choice(users) for _ in range(self.iterations)]
+        results, outputs = {}, {}
+        for name in self.implementations:
+            implementation = getattr(self, name)
+            latencies, query_counts, sql_bytes, outputs[name] = [], [], [], []
+            for user in samples:
+                result, elapsed, query_count, size = self.measure(implementation, self.get_arguments(user))
+                outputs[name].append(result)
+                latencies.append(elapsed)
+                query_counts.append(query_count)
+                sql_bytes.append(size)
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "max_queries": max(query_counts),
+                "mean_sql_bytes": round(sum(sql_bytes) / len(sql_bytes)),
+                "max_sql_bytes": max(sql_bytes),
+            }
+        before, after = [outputs[name] for name in self.implementations]
+        results["mismatches"] = sum(1 for expected, result in zip(before, after) if expected != result)
+        return results
+
+
+class FetchFeedsBenchmark(QueryBenchmark):
+    """fetch_feeds of the posts list api (count and first page), ids read in python against the sub queries"""
+    implementations = ("fetch_feeds_by_ids", "fetch_feeds")
+
+    def get_arguments(self, user):
+        viewer = get_viewer_context(user)
+        _, post_query, exclusion_query = post_api_query(12, user, None, False, QueryDict(""), viewer=viewer)
+        return post_query, exclusion_query, user, viewer
+
+    @staticmethod
+    def fetch_feeds_by_ids(post_query, exclusion_query, user, viewer):
+        return read_page(fetch_feeds_by_ids(post_query, exclusion_query, FEED_ORDERING, user, viewer))
+
+    @staticmethod
+    def fetch_feeds(post_query, exclusion_query, user, viewer):
+        return read_page(fetch_feeds(post_query, exclusion_query, FEED_ORDERING, user, viewer))
+
+
+class PostsNotVisibleBenchmark(QueryBenchmark):
+    """Exclusion of the posts not visible to the user of UserFeedViewSet (count and first page of the user feed)"""
+    implementations = ("posts_not_visible_to_user_ids", "posts_not_visible_to_user")
+    post_polls = False
+
+    def get_arguments(self, user):
+        # the viewer context is cached before the queries are captured, as it is by the earlier lookups of the view
+        get_viewer_context(user)
+        feeds = accessible_posts_by_user(user, user.organization, False, not self.post_polls)
+        if self.post_polls:
+            feeds = feeds.filter(
+                post_type__in=[POST_TYPE.USER_CREATED_POST, POST_TYPE.USER_CREATED_POLL], created_by=user)
+        else:
+            feeds = feeds.filter(
+                post_type__in=[POST_TYPE.USER_CREATED_APPRECIATION, POST_TYPE.USER_CREATED_NOMINATION])
+        return feeds.order_by(*FEED_ORDERING), user, self.post_polls
+
+    @staticmethod
+    def posts_not_visible_to_user_ids(feeds, user, post_polls):
+        return read_page(feeds.exclude(id__in=posts_not_visible_to_user_ids(feeds, user, post_polls)))
+
+    @staticmethod
+    def posts_not_visible_to_user(feeds, user, post_polls):
+        return read_page(feeds.exclude(id__in=posts_not_visible_to_user(user, post_polls)))
+
+
+class PostPollsNotVisibleBenchmark(PostsNotVisibleBenchmark):
+    """Exclusion of the posts not visible to the user of UserFeedViewSet with the post_polls feed flag"""
+    post_polls = True
+
+
+BENCHMARKS = {
+    "fetch_feeds": FetchFeedsBenchmark,
+    "posts_not_visible": PostsNotVisibleBenchmark,
+    "post_polls_not_visible": PostPollsNotVisibleBenchmark,
+}
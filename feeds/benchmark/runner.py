@@ -0,0 +1,127 @@
+from __future__ import division, print_function, unicode_literals
+
+import math
+import random
+import time
+
+from django.db import connection
+from django.utils.six.moves.urllib.parse import parse_qs, urlparse
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.versioning import BaseVersioning
+
+from feeds.constants import POST_TYPE, REACTION_TYPE
+from feeds.paginator import CURSOR_PAGINATION
+from feeds.views import PostViewSet, UserFeedViewSet
+
+
+def fixed_versioning(version):
+    """Returns the versioning class which resolves every request to the given API version"""
+
+    class FixedVersioning(BaseVersioning):
+        def determine_version(self, request, *args, **kwargs):
+            return version
+
+    return FixedVersioning
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of the values"""
+    values = sorted(values)
+    if not values:
+        return None
+    return values[max(int(math.ceil(percent / 100 * len(values))) - 1, 0)]
+
+
+class BenchmarkRunner(object):
+    """
+    Times the feeds apis on a generated tenant (refer generator.TenantGenerator), every endpoint is called
+    `iterations` times by sampled users and the latency percentiles and query counts are reported
+    """
+
+    def __init__(self, tenant, version, iterations, seed=0, deep_page=10):
+        self.tenant = tenant
+        self.version = version
+        self.iterations = iterations
+        self.deep_page = deep_page
+        self.random = random.Random(seed)
+        self.factory = APIRequestFactory()
+        self.versioning_class = fixed_versioning(version)
+
+    def get_endpoints(self):
+        """Returns (name, view, method, path, data, kwargs factory) of the benchmarked apis"""
+        posts = self.tenant.posts
+        appreciations = [post for post in posts if post.post_type == POST_TYPE.USER_CREATED_APPRECIATION] or posts
+        reaction_types = [reaction_type for reaction_type, _ in REACTION_TYPE()]
+
+        def view(viewset, actions):
+            return viewset.as_view(actions, versioning_class=self.versioning_class)
+
+        endpoints = []
+        for name, feed_view, path in (
+                ("posts.list", view(PostViewSet, {"get": "list"}), "/api/posts/"),
+                ("user_feed.organization_recognitions", view(UserFeedViewSet, {"get": "organization_recognitions"}),
+                 "/api/user_feed/organization_recognitions/")):
+            endpoints.extend((name + suffix, feed_view, "get", path, data, lambda: {})
+                             for suffix, data in self.get_page_params(feed_view, path))
+        return endpoints + [
+            ("user_feed.list", view(UserFeedViewSet, {"get": "list"}), "get", "/api/user_feed/", {}, lambda: {}),
+            ("posts.comments", view(PostViewSet, {"get": "comments"}), "get", "/api/posts/comments/", {},
+             lambda: {"pk": self.random.choice(posts).pk}),
+            ("posts.appreciate", view(PostViewSet, {"post": "appreciate"}), "post", "/api/posts/appreciate/",
+             {"type": self.random.choice(reaction_types)}, lambda: {"pk": self.random.choice(appreciations).pk}),
+        ]
+
+    def get_page_params(self, view, path):
+        """
+        Returns (suffix, query params) of the first and the deep page (deep_page) of the feed in both the offset
+        and the cursor pagination, the cursor of the deep page is read by following the next links
+        """
+        user = [user for user in self.tenant.users if not user.is_staff][0]
+        cursor_params = {"pagination": CURSOR_PAGINATION}
+        for _ in range(self.deep_page - 1):
+            request = self.factory.get(path, cursor_params)
+            force_authenticate(request, user=user)
+            next_link = view(request).data.get("next")
+            if not next_link:
+                break
+            cursor_params = {"pagination": CURSOR_PAGINATION,
+                             "cursor": parse_qs(urlparse(next_link).query)["cursor"][0]}
+        return [
+            ("", {}),
+            (".deep_page", {"page": self.deep_page}),
+            (".cursor", {"pagination": CURSOR_PAGINATION}),
+            (".cursor.deep_page", cursor_params),
+        ]
+
+    def call(self, view, method, path, data, kwargs, user):
+        request = getattr(self.factory, method)(path, data, format="json" if method == "post" else None)
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            response = view(request, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            elapsed = time.time() - start
+        return response.status_code, elapsed, len(queries)
+
+    def run(self):
+        results = {}
+        users = [user for user in self.tenant.users if not user.is_staff]
+        for name, view, method, path, data, get_kwargs in self.get_endpoints():
+            latencies, query_counts, status_codes = [], [], {}
+            for _ in range(self.iterations):
+                status_code, elapsed, query_count = self.call(
+                    view, method, path, data, get_kwargs(), self.random.choice(users))
+                latencies.append(elapsed * 1000)
+                query_counts.append(query_count)
+                status_codes[status_code] = status_codes.get(status_code, 0) + 1
+            results[name] = {
+                "runs": self.iterations,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "mean_queries": round(sum(query_counts) / len(query_counts), 2),
+                "max_queries": max(query_counts),
+                "status_codes": status_codes,
+            }
+        return results
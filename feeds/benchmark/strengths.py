@@ -0,0 +1,119 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+import random
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+
+from feeds.benchmark.runner import percentile
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Post
+from feeds.strengths import posts_with_strength, sync_post_strengths
+
+
+TRANSACTION_MODEL = import_string(settings.TRANSACTION_MODEL)
+
+
+def get_context_strength_id(context):
+    """Returns the strength_id of the transaction context as read by values() (str or dict depending on the field)"""
+    if not isinstance(context, dict):
+        context = json.loads(context or "{}")
+    return context.get("strength_id")
+
+
+class StrengthBenchmark(object):
+    """
+    Times the strength filter of the appreciations (strengths / appreciated_by / user_strength filter) on generated
+    appreciations, the strength_id of the transaction contexts parsed in python (as it was filtered before the
+    PostStrength rows) against the PostStrength subquery. The transactions are created by the create_transaction
+    of the tenant generator (refer generator.TenantGenerator)
+    """
+
+    def __init__(self, generator, posts, strengths, iterations, seed=0, batch_size=1000):
+        self.generator = generator
+        self.posts = posts
+        self.strengths = strengths
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+
+    def generate(self):
+        """
+        Creates the appreciations of a single creator with a transaction each, the strengths are spread across the
+        transactions. Returns the ids of the strengths and the time taken by the backfill (sync_post_strengths)
+        """
+        generator = self.generator
+        organization = generator.create_organization(0)
+        self.creator = generator.create_user(organization, 0)
+        receiver = generator.create_user(organization, 1)
+        strength_ids = [generator.create_user_strength(organization, index).pk for index in range(self.strengths)]
+
+        Post.objects.bulk_create([
+            Post(created_by=self.creator, user=receiver, post_type=POST_TYPE.USER_CREATED_APPRECIATION,
+                 shared_with=SHARED_WITH.ALL_DEPARTMENTS, title="Benchmark appreciation")
+            for _ in range(self.posts)
+        ], batch_size=self.batch_size)
+        post_ids = list(Post.objects.filter(created_by=self.creator).order_by("id").values_list("id", flat=True))
+
+        post_transactions, transactions_by_strength = [], defaultdict(list)
+        for post_id in post_ids:
+            transaction = generator.create_transaction(organization, self.creator, receiver)
+            if transaction is None:
+                raise ValueError("Transactions are not generated, set FEEDS_BENCHMARK_GENERATOR")
+            transactions_by_strength[self.random.choice(strength_ids)].append(transaction.pk)
+            post_transactions.append(Post.transactions.through(post_id=post_id, transaction_id=transaction.pk))
+        for strength_id, transaction_ids in transactions_by_strength.items():
+            for start in range(0, len(transaction_ids), self.batch_size):
+                TRANSACTION_MODEL.objects.filter(id__in=transaction_ids[start:start + self.batch_size]).update(
+                    context={"strength_id": strength_id})
+        # rows are created without m2m_changed, the strengths are stored by the backfill
+        Post.transactions.through.objects.bulk_create(post_transactions, batch_size=self.batch_size)
+
+        start = time.time()
+        for index in range(0, len(post_ids), self.batch_size):
+            sync_post_strengths(post_ids[index:index + self.batch_size])
+        return strength_ids, time.time() - start
+
+    def parsed_contexts(self, strength_id):
+        """Filter of the appreciations before PostStrength, every context of the creator is loaded and parsed"""
+        feeds = Post.objects.filter(created_by=self.creator, post_type=POST_TYPE.USER_CREATED_APPRECIATION)
+        return set(
+            feed["id"] for feed in feeds.values("id", "transactions__context")
+            if get_context_strength_id(feed["transactions__context"]) == strength_id
+        )
+
+    def post_strengths(self, strength_id):
+        feeds = Post.objects.filter(created_by=self.creator, post_type=POST_TYPE.USER_CREATED_APPRECIATION)
+        return set(feeds.filter(id__in=posts_with_strength(strength_id)).values_list("id", flat=True))
+
+    def run(self):
+        strength_ids, backfill_time = self.generate()
+        results = {"posts": self.posts, "strengths": self.strengths, "backfill_s": round(backfill_time, 2)}
+        samples = [self.random.choice(strength_ids) for _ in range(self.iterations)]
+        matched = {}
+        for name, strength_filter in (("parsed_contexts", self.parsed_contexts),
+                                      ("post_strengths", self.post_strengths)):
+            latencies, query_counts, matched[name] = [], [], []
+            for strength_id in samples:
+                # the log of the generated data is full, the captured queries are counted on the length of the log
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.time()
+                    matched[name].append(strength_filter(strength_id))
+                    latencies.append((time.time() - start) * 1000)
+                query_counts.append(len(queries))
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "max_queries": max(query_counts),
+                "mean_matched": round(sum(len(ids) for ids in matched[name]) / len(samples), 2),
+            }
+        # both filters match the same posts
+        results["mismatches"] = sum(
+            1 for before, after in zip(matched["parsed_contexts"], matched["post_strengths"]) if before != after)
+        return results
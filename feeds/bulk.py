@@ -0,0 +1,160 @@
+from __future__ import division, print_function, unicode_literals
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils.module_loading import import_string
+
+from .constants import POST_TYPE
+from .counters import get_top_reaction_types
+from .models import (
+    DENORMALIZED_COUNTERS_ENABLED, Comment, PollsAnswer, Post, PostLiked, PostReactionCount, PostTaggedUsers, Voter,
+    get_post_transactions_ordering,
+)
+
+
+DEPARTMENT_MODEL = import_string(settings.DEPARTMENT_MODEL)
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+UserStrength = import_string(settings.USER_STRENGTH_MODEL)
+
+
+class PostBulkContext(object):
+    """
+    Per page lookups of the post serializers computed with a fixed number of grouped queries, it is passed as
+    "bulk" in the serializer context and the serializer methods read from it instead of querying for every post.
+    Serializers fall back to the per post queries when it is not in the context
+    """
+
+    def __init__(self, posts, user):
+        """
+        posts: List[Post] (page of posts)
+        user: CustomUser (requested user)
+        """
+        posts = [post for post in posts if post is not None]
+        post_ids = [post.id for post in posts]
+        poll_ids = [post.id for post in posts if post.post_type == POST_TYPE.USER_CREATED_POLL]
+
+        if DENORMALIZED_COUNTERS_ENABLED:
+            self.appreciation_counts = {post.id: post.like_count for post in posts}
+            self.comment_counts = {post.id: post.comment_count for post in posts}
+            self.total_votes = {post.id: post.vote_count for post in posts if post.id in poll_ids}
+        else:
+            self.appreciation_counts = dict(
+                PostLiked.objects.filter(post_id__in=post_ids).values_list("post_id").annotate(Count("id")).order_by()
+            )
+            self.comment_counts = dict(
+                Comment.objects.filter(post_id__in=post_ids, mark_delete=False).values_list(
+                    "post_id").annotate(Count("id")).order_by()
+            )
+            self.total_votes = dict(
+                PollsAnswer.objects.filter(question_id__in=poll_ids).values_list(
+                    "question_id").annotate(Sum("votes")).order_by()
+            )
+        self.user_reactions = dict(
+            PostLiked.objects.filter(post_id__in=post_ids, created_by=user).values_list("post_id", "reaction_type")
+        )
+        self.reaction_types = self.get_reaction_types(post_ids)
+        self.transactions = self.get_first_transactions(post_ids)
+        self.strengths = self.get_strengths(posts, self.transactions)
+        self.poll_answers = self.get_poll_answers(posts, poll_ids)
+        self.answer_voters = self.get_answer_voters(poll_ids)
+        self.voted_answer_ids = {
+            answer_id for answer_id, voters in self.answer_voters.items()
+            if any(voter.pk == user.pk for voter in voters)
+        }
+        self.winner_answer_ids = self.get_winner_answer_ids(self.poll_answers)
+        voter_ids = {voter.pk for voters in self.answer_voters.values() for voter in voters}
+        self.user_departments = self.get_user_departments(posts, post_ids, voter_ids)
+        self.voted_poll_ids = set(
+            Voter.objects.filter(question_id__in=poll_ids, user=user).values_list("question_id", flat=True))
+
+    @staticmethod
+    def get_reaction_types(post_ids):
+        """Returns the top 2 reaction types (with count) for every post"""
+        if DENORMALIZED_COUNTERS_ENABLED:
+            reaction_counts = defaultdict(list)
+            for reaction_count in PostReactionCount.objects.filter(post_id__in=post_ids):
+                reaction_counts[reaction_count.post_id].append(reaction_count)
+            return {post_id: get_top_reaction_types(counts) for post_id, counts in reaction_counts.items()}
+
+        reaction_types = defaultdict(list)
+        reactions = PostLiked.objects.filter(post_id__in=post_ids).values("post_id", "reaction_type").annotate(
+            reaction_count=Count("reaction_type")).order_by("-reaction_count")
+        for reaction in reactions:
+            post_reactions = reaction_types[reaction.pop("post_id")]
+            if len(post_reactions) < 2:
+                post_reactions.append(reaction)
+        return reaction_types
+
+    @staticmethod
+    def get_first_transactions(post_ids):
+        """Returns the first transaction of every post, as returned by post.transactions.first()"""
+        transactions = {}
+        post_transactions = Post.transactions.through.objects.filter(post_id__in=post_ids).select_related(
+            "transaction", "transaction__user", "transaction__creator").order_by(*get_post_transactions_ordering())
+        for post_transaction in post_transactions:
+            transactions.setdefault(post_transaction.post_id, post_transaction.transaction)
+        return transactions
+
+    @staticmethod
+    def get_strengths(posts, transactions):
+        """Returns the UserStrength of every post, from the transaction context or from the nomination"""
+        strength_ids = {}
+        for post in posts:
+            transaction = transactions.get(post.id)
+            if transaction:
+                strength_ids[post.id] = transaction.context.get("strength_id")
+            elif post.nomination_id and post.nomination.user_strength_id:
+                strength_ids[post.id] = post.nomination.user_strength_id
+        strength_ids = {post_id: int(strength_id) for post_id, strength_id in strength_ids.items() if strength_id}
+        user_strengths = UserStrength.objects.in_bulk(list(set(strength_ids.values())))
+        return {post_id: user_strengths.get(strength_id) for post_id, strength_id in strength_ids.items()}
+
+    @staticmethod
+    def get_poll_answers(posts, poll_ids):
+        """Returns the answers of every poll, the question of the answers is the post of the page"""
+        polls = {post.id: post for post in posts if post.id in poll_ids}
+        poll_answers = {poll_id: [] for poll_id in polls}
+        for answer in PollsAnswer.objects.filter(question_id__in=poll_ids):
+            answer.question = polls[answer.question_id]
+            poll_answers[answer.question_id].append(answer)
+        return poll_answers
+
+    @staticmethod
+    def get_answer_voters(poll_ids):
+        """Returns the voters (ordered by id) of every answer of the polls"""
+        voter_ids = defaultdict(set)
+        for answer_id, user_id in Voter.objects.filter(answer__question_id__in=poll_ids).values_list(
+                "answer_id", "user_id"):
+            voter_ids[answer_id].add(user_id)
+        users = USERMODEL.objects.in_bulk(list(set().union(*voter_ids.values())))
+        return {
+            answer_id: [users[user_id] for user_id in sorted(user_ids) if user_id in users]
+            for answer_id, user_ids in voter_ids.items()
+        }
+
+    @staticmethod
+    def get_winner_answer_ids(poll_answers):
+        """Returns the ids of the answers having more votes than every other answer of the poll (refer is_winner)"""
+        winner_answer_ids = set()
+        for answers in poll_answers.values():
+            max_votes = max([answer.votes for answer in answers] or [0])
+            winners = [answer for answer in answers if answer.votes == max_votes]
+            if len(winners) == 1:
+                winner_answer_ids.add(winners[0].id)
+        return winner_answer_ids
+
+    @staticmethod
+    def get_user_departments(posts, post_ids, user_ids=()):
+        """Returns the department names of creators, receivers, tagged users of the posts and of the given users"""
+        user_ids = set(user_ids)
+        user_ids.update(PostTaggedUsers.objects.filter(post_id__in=post_ids).values_list("user_id", flat=True))
+        for post in posts:
+            user_ids.add(post.created_by_id)
+            if post.user_id:
+                user_ids.add(post.user_id)
+        user_departments = {user_id: [] for user_id in user_ids}
+        for user_id, name in DEPARTMENT_MODEL.objects.filter(users__in=user_ids).values_list("users", "name"):
+            user_departments[user_id].append({"name": name})
+        return user_departments
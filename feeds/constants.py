@@ -38,3 +38,13 @@ POST_CERTIFICATE_ATTACHMENTS = Choices({
     "ECARD": 2,
     "GIF": 3,
 })
+
+AUDIENCE_KIND = Choices({
+    "ORGANIZATION": 1,
+    "DEPARTMENT": 2,
+    "JOB_FAMILY": 3,
+    "USER": 4,
+    "CREATOR": 5,
+    "CREATOR_ORGANIZATION": 6,
+    "CREATOR_DEPARTMENT": 7,
+})
@@ -0,0 +1,130 @@
+from __future__ import division, print_function, unicode_literals
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Comment, CommentLiked, PollsAnswer, Post, PostLiked, PostReactionCount
+
+
+def update_reaction_count(post_id, reaction_type, delta):
+    """Adds delta to the number of reactions of the type on the post"""
+    counts = PostReactionCount.objects.filter(post_id=post_id, reaction_type=reaction_type)
+    if counts.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            PostReactionCount.objects.create(post_id=post_id, reaction_type=reaction_type, count=delta)
+    except IntegrityError:
+        # created concurrently by another request
+        counts.update(count=F("count") + delta)
+
+
+def update_post_reaction_counters(post_id, added=(), removed=()):
+    """
+    Updates like_count and the per reaction type counts of the post
+    post_id: int
+    added: List[int] (reaction types of the PostLiked rows created/updated to)
+    removed: List[int] (reaction types of the PostLiked rows deleted/updated from)
+    """
+    delta = len(added) - len(removed)
+    if delta:
+        Post.objects.filter(id=post_id).update(like_count=F("like_count") + delta)
+    reaction_deltas = Counter(int(reaction_type) for reaction_type in added)
+    reaction_deltas.subtract(int(reaction_type) for reaction_type in removed)
+    for reaction_type, reaction_delta in reaction_deltas.items():
+        if reaction_delta:
+            update_reaction_count(post_id, reaction_type, reaction_delta)
+
+
+def update_comment_like_count(comment_id, delta):
+    """Adds delta to like_count of the comment"""
+    Comment.objects.filter(id=comment_id).update(like_count=F("like_count") + delta)
+
+
+def update_post_comment_count(post_id, delta):
+    """Adds delta to comment_count (non deleted comments) of the post"""
+    Post.objects.filter(id=post_id).update(comment_count=F("comment_count") + delta)
+
+
+def get_top_reaction_types(reaction_counts, limit=2):
+    """
+    Returns the top reaction types in the format of the reaction_type field of the post serializers
+    reaction_counts: Iterable[PostReactionCount]
+    """
+    reaction_counts = sorted(
+        (reaction for reaction in reaction_counts if reaction.count > 0), key=lambda reaction: -reaction.count)
+    return [
+        {"reaction_type": reaction.reaction_type, "reaction_count": reaction.count}
+        for reaction in reaction_counts[:limit]
+    ]
+
+
+def reconcile_post_counters(post_ids, fix=True):
+    """
+    Recomputes the counters of the given posts in bulk and returns the number of posts with drift
+    post_ids: List[int]
+    fix: bool (if False only the drift is reported)
+    """
+    like_counts = dict(
+        PostLiked.objects.filter(post_id__in=post_ids).values_list("post_id").annotate(Count("id")).order_by())
+    comment_counts = dict(
+        Comment.objects.filter(post_id__in=post_ids, mark_delete=False).values_list(
+            "post_id").annotate(Count("id")).order_by())
+    vote_counts = dict(
+        PollsAnswer.objects.filter(question_id__in=post_ids).values_list(
+            "question_id").annotate(Sum("votes")).order_by())
+    reaction_counts = {
+        (post_id, reaction_type): count
+        for post_id, reaction_type, count in PostLiked.objects.filter(post_id__in=post_ids).values_list(
+            "post_id", "reaction_type").annotate(Count("id")).order_by()
+    }
+    stored_reaction_counts = {
+        (post_id, reaction_type): count
+        for post_id, reaction_type, count in PostReactionCount.objects.filter(post_id__in=post_ids).values_list(
+            "post_id", "reaction_type", "count")
+    }
+
+    drifted_post_ids = set()
+    posts = Post.objects.filter(id__in=post_ids).values_list("id", "like_count", "comment_count", "vote_count")
+    for post_id, like_count, comment_count, vote_count in posts:
+        counters = (like_counts.get(post_id, 0), comment_counts.get(post_id, 0), vote_counts.get(post_id) or 0)
+        if counters == (like_count, comment_count, vote_count):
+            continue
+        drifted_post_ids.add(post_id)
+        if fix:
+            Post.objects.filter(id=post_id).update(
+                like_count=counters[0], comment_count=counters[1], vote_count=counters[2])
+
+    drifted_reactions = set(reaction_counts.items()) ^ set(
+        (key, count) for key, count in stored_reaction_counts.items() if count)
+    drifted_reaction_post_ids = set(post_id for (post_id, reaction_type), count in drifted_reactions)
+    if fix and drifted_reaction_post_ids:
+        with transaction.atomic():
+            PostReactionCount.objects.filter(post_id__in=drifted_reaction_post_ids).delete()
+            PostReactionCount.objects.bulk_create([
+                PostReactionCount(post_id=post_id, reaction_type=reaction_type, count=count)
+                for (post_id, reaction_type), count in reaction_counts.items()
+                if post_id in drifted_reaction_post_ids
+            ])
+    return len(drifted_post_ids | drifted_reaction_post_ids)
+
+
+def reconcile_comment_counters(comment_ids, fix=True):
+    """
+    Recomputes like_count of the given comments in bulk and returns the number of comments with drift
+    comment_ids: List[int]
+    fix: bool (if False only the drift is reported)
+    """
+    like_counts = dict(
+        CommentLiked.objects.filter(comment_id__in=comment_ids).values_list(
+            "comment_id").annotate(Count("id")).order_by())
+    drifted = 0
+    for comment_id, like_count in Comment.objects.filter(id__in=comment_ids).values_list("id", "like_count"):
+        if like_counts.get(comment_id, 0) == like_count:
+            continue
+        drifted += 1
+        if fix:
+            Comment.objects.filter(id=comment_id).update(like_count=like_counts.get(comment_id, 0))
+    return drifted
@@ -0,0 +1,176 @@
+from __future__ import division, print_function, unicode_literals
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+
+INSTRUMENTATION_ENABLED = getattr(settings, "FEEDS_INSTRUMENTATION_ENABLED", False)
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: defaultdict(float))
+
+
+class RequestStats(object):
+    """
+    Query count, DB time, serializer time, total time and payload size of a single request of the feeds apis,
+    started once the request is authenticated (refer InstrumentedViewMixin / instrument_view)
+    """
+
+    def __init__(self, view, action, version):
+        self.view = view
+        self.action = action
+        self.version = version
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+        self.queries_start = len(connection.queries_log)
+        self.start = time.time()
+        _local.stats = self
+
+    def abort(self):
+        """Stops the instrumentation without recording, the request has failed with an unhandled exception"""
+        connection.force_debug_cursor = self.force_debug_cursor
+        _local.stats = None
+
+    def finish(self, response):
+        """Collects the DB stats, the payload size is read once the response is rendered"""
+        total_time = time.time() - self.start
+        queries = list(connection.queries_log)[self.queries_start:]
+        self.abort()
+        self.query_count = len(queries)
+        self.db_time = sum(float(query.get("time") or 0) for query in queries)
+        self.total_time = total_time
+        self.status_code = response.status_code
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(self.record)
+        else:
+            self.record(response)
+
+    def record(self, response):
+        self.payload_size = len(response.content) if not getattr(response, "streaming", False) else 0
+        record_request_stats(self)
+
+
+def get_current_stats():
+    return getattr(_local, "stats", None)
+
+
+def record_request_stats(stats):
+    """Logs the stats of the request (structured) and adds them to the in-process aggregates"""
+    row = {
+        "view": stats.view,
+        "action": stats.action,
+        "version": stats.version,
+        "status_code": stats.status_code,
+        "query_count": stats.query_count,
+        "db_time_ms": round(stats.db_time * 1000, 2),
+        "serializer_time_ms": round(stats.serializer_time * 1000, 2),
+        "total_time_ms": round(stats.total_time * 1000, 2),
+        "payload_size": stats.payload_size,
+    }
+    logger.info("feeds request stats", extra={"feeds_stats": row})
+
+    key = (stats.view, stats.action, stats.version)
+    with _stats_lock:
+        aggregate = _stats[key]
+        aggregate["requests"] += 1
+        for name in ("query_count", "db_time_ms", "serializer_time_ms", "total_time_ms", "payload_size"):
+            aggregate[name] += row[name]
+            aggregate["max_" + name] = max(aggregate["max_" + name], row[name])
+
+
+def get_request_stats():
+    """Returns the aggregated stats (totals, averages and maximums) per view/action/API version of this process"""
+    with _stats_lock:
+        stats = [(key, dict(aggregate)) for key, aggregate in _stats.items()]
+
+    results = []
+    for (view, action, version), aggregate in sorted(stats, key=lambda item: [str(part) for part in item[0]]):
+        requests = aggregate.pop("requests")
+        result = {"view": view, "action": action, "version": version, "requests": int(requests)}
+        for name, value in aggregate.items():
+            result[name] = value
+            if not name.startswith("max_"):
+                result["avg_" + name] = round(value / requests, 2)
+        results.append(result)
+    return results
+
+
+def reset_request_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class InstrumentedViewMixin(object):
+    """Records the RequestStats of the viewset when FEEDS_INSTRUMENTATION_ENABLED is set"""
+
+    def initial(self, request, *args, **kwargs):
+        super(InstrumentedViewMixin, self).initial(request, *args, **kwargs)
+        if INSTRUMENTATION_ENABLED:
+            self._request_stats = RequestStats(
+                self.__class__.__name__, getattr(self, "action", None), getattr(request, "version", None))
+
+    def handle_exception(self, exc):
+        try:
+            return super(InstrumentedViewMixin, self).handle_exception(exc)
+        except Exception:
+            stats = getattr(self, "_request_stats", None)
+            if stats is not None:
+                self._request_stats = None
+                stats.abort()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super(InstrumentedViewMixin, self).finalize_response(request, response, *args, **kwargs)
+        stats = getattr(self, "_request_stats", None)
+        if stats is not None:
+            self._request_stats = None
+            stats.finish(response)
+        return response
+
+
+def instrument_view(func):
+    """Records the RequestStats of the function based view, to be applied below @api_view"""
+
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        if not INSTRUMENTATION_ENABLED:
+            return func(request, *args, **kwargs)
+        stats = RequestStats(func.__name__, request.method.lower(), getattr(request, "version", None))
+        try:
+            response = func(request, *args, **kwargs)
+        except Exception:
+            stats.abort()
+            raise
+        stats.finish(response)
+        return response
+    return wrapper
+
+
+class SerializerTimingMixin(object):
+    """
+    Adds the time taken by the serializers to the RequestStats, serializers created while one is being timed
+    (nested serializers, serializers of method fields) are part of the outer time
+    """
+
+    def to_representation(self, instance):
+        stats = get_current_stats()
+        if stats is None or stats.serializing:
+            return super(SerializerTimingMixin, self).to_representation(instance)
+        stats.serializing = True
+        start = time.time()
+        try:
+            return super(SerializerTimingMixin, self).to_representation(instance)
+        finally:
+            stats.serializer_time += time.time() - start
+            stats.serializing = False
@@ -0,0 +1,24 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from feeds.strengths import appreciations_with_strength, sync_post_strengths
+
+
+class Command(BaseCommand):
+    help = "Populates the strengths (PostStrength) of the appreciation posts from the strength_id of their transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of posts synced per batch")
+
+    def handle(self, *args, **options):
+        last_id, total, changed = 0, 0, 0
+        queryset = appreciations_with_strength().order_by("id")
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).values_list("id", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            changed += sync_post_strengths(ids)
+            total += len(ids)
+            last_id = ids[-1]
+        self.stdout.write("Posts: checked {}, strengths created / deleted {}".format(total, changed))
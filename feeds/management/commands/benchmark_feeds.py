@@ -0,0 +1,51 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from feeds.benchmark.generator import SCALES, get_tenant_generator
+from feeds.benchmark.runner import BenchmarkRunner
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic tenants at the given scales, times the feeds apis on them and writes the p50/p95 "
+        "latency and query counts to a JSON report. The generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default="small", help="Comma separated scales ({})".format(
+            ", ".join(sorted(SCALES))))
+        parser.add_argument("--iterations", type=int, default=20, help="Number of calls per api")
+        parser.add_argument("--api-version", type=int, default=12, help="API version of the requests")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data and sampled users")
+        parser.add_argument("--deep-page", type=int, default=10,
+                            help="Page of the feeds timed against the first page (offset and cursor pagination)")
+        parser.add_argument("--output", default=None, help="Path of the JSON report (printed if not given)")
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options["scales"].split(",") if scale.strip()]
+        invalid_scales = set(scales) - set(SCALES)
+        if invalid_scales:
+            raise CommandError("Invalid scales: {}".format(", ".join(sorted(invalid_scales))))
+
+        report = {"created_on": timezone.now().isoformat(), "api_version": options["api_version"], "scales": {}}
+        for index, scale in enumerate(scales):
+            with transaction.atomic():
+                tenant = get_tenant_generator(SCALES[scale], options["seed"]).generate(index)
+                runner = BenchmarkRunner(
+                    tenant, options["api_version"], options["iterations"], options["seed"], options["deep_page"])
+                report["scales"][scale] = {"size": SCALES[scale], "results": runner.run()}
+                transaction.set_rollback(True)
+            self.stdout.write("Benchmarked scale {}".format(scale))
+
+        report = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(report)
+            self.stdout.write("Report written to {}".format(options["output"]))
+        else:
+            self.stdout.write(report)
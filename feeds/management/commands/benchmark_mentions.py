@@ -0,0 +1,33 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from feeds.benchmark.mentions import MentionBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a long description with mentions, times the parsing of the mentions before (patterns searched "
+        "per tag) and after (single pass tokenizer) and writes a JSON report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--length", type=int, default=100000, help="Number of characters of the description")
+        parser.add_argument("--mentions", type=int, default=500, help="Number of mentions in the description")
+        parser.add_argument("--iterations", type=int, default=50, help="Number of parses per implementation")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated description")
+        parser.add_argument("--output", default=None, help="Path of the JSON report (printed if not given)")
+
+    def handle(self, *args, **options):
+        report = MentionBenchmark(
+            options["length"], options["mentions"], options["iterations"], options["seed"]).run()
+
+        report = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(report)
+            self.stdout.write("Report written to {}".format(options["output"]))
+        else:
+            self.stdout.write(report)
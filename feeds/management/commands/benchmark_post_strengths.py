@@ -0,0 +1,43 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from feeds.benchmark.generator import get_tenant_generator
+from feeds.benchmark.strengths import StrengthBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates appreciations with transactions of random strengths, times the strength filter of the "
+        "appreciations before (parsed transaction contexts) and after (PostStrength) and writes a JSON report. "
+        "The generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100000, help="Number of appreciations generated")
+        parser.add_argument("--strengths", type=int, default=10, help="Number of strengths generated")
+        parser.add_argument("--iterations", type=int, default=20, help="Number of calls per filter")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the sampled strengths")
+        parser.add_argument("--output", default=None, help="Path of the JSON report (printed if not given)")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            benchmark = StrengthBenchmark(
+                get_tenant_generator({}, options["seed"]), options["posts"], options["strengths"],
+                options["iterations"], options["seed"])
+            try:
+                report = benchmark.run()
+            except ValueError as ex:
+                raise CommandError(str(ex))
+            transaction.set_rollback(True)
+
+        report = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(report)
+            self.stdout.write("Report written to {}".format(options["output"]))
+        else:
+            self.stdout.write(report)
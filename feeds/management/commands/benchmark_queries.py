@@ -0,0 +1,57 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from feeds.benchmark.generator import SCALES, get_tenant_generator
+from feeds.benchmark.queries import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic tenants at the given scales, times the previous and the current implementation of "
+        "the feed queries (wall time, number of queries and bytes of SQL) and writes a JSON report. "
+        "The generated data is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--benchmarks", default=",".join(sorted(BENCHMARKS)),
+                            help="Comma separated benchmarks ({})".format(", ".join(sorted(BENCHMARKS))))
+        parser.add_argument("--scales", default="small", help="Comma separated scales ({})".format(
+            ", ".join(sorted(SCALES))))
+        parser.add_argument("--iterations", type=int, default=20, help="Number of calls per implementation")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated data and sampled users")
+        parser.add_argument("--output", default=None, help="Path of the JSON report (printed if not given)")
+
+    def handle(self, *args, **options):
+        benchmarks = [name.strip() for name in options["benchmarks"].split(",") if name.strip()]
+        scales = [scale.strip() for scale in options["scales"].split(",") if scale.strip()]
+        invalid = (set(benchmarks) - set(BENCHMARKS)) | (set(scales) - set(SCALES))
+        if invalid:
+            raise CommandError("Invalid benchmarks / scales: {}".format(", ".join(sorted(invalid))))
+
+        report = {"created_on": timezone.now().isoformat(), "scales": {}}
+        for index, scale in enumerate(scales):
+            with transaction.atomic():
+                tenant = get_tenant_generator(SCALES[scale], options["seed"]).generate(index)
+                if connection.vendor == "postgresql":
+                    # planner statistics of the generated rows, otherwise the plans are made for empty tables
+                    with connection.cursor() as cursor:
+                        cursor.execute("ANALYZE")
+                report["scales"][scale] = {"size": SCALES[scale], "results": dict(
+                    (name, BENCHMARKS[name](tenant, options["iterations"], options["seed"]).run())
+                    for name in benchmarks
+                )}
+                transaction.set_rollback(True)
+            self.stdout.write("Benchmarked scale {}".format(scale))
+
+        report = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                output.write(report)
+            self.stdout.write("Report written to {}".format(options["output"]))
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,41 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from feeds.utils import post_api_query
+
+
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+
+
+class Command(BaseCommand):
+    help = "Compares the home feed served from the materialized timelines with the fan-out-on-read home feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("organization", type=int, help="Organization whose users are checked")
+        parser.add_argument("--users", type=int, default=20, help="Number of active users checked")
+        parser.add_argument("--api-version", type=int, default=12, help="API version used to build the feed")
+
+    def handle(self, *args, **options):
+        users = USERMODEL.objects.filter(
+            organization_id=options["organization"], is_active=True).order_by("-last_login")[:options["users"]]
+        if not users:
+            raise CommandError("No active users found for organization {}".format(options["organization"]))
+
+        mismatches = 0
+        for user in users:
+            feed, _, _ = post_api_query(options["api_version"], user, None, False, {})
+            timeline_feed, _, _ = post_api_query(options["api_version"], user, None, False, {}, True)
+            post_ids = set(feed.values_list("id", flat=True))
+            timeline_post_ids = set(timeline_feed.values_list("id", flat=True))
+            if post_ids == timeline_post_ids:
+                continue
+            mismatches += 1
+            self.stdout.write("User {}: missing in timeline {}, extra in timeline {}".format(
+                user.pk, sorted(post_ids - timeline_post_ids), sorted(timeline_post_ids - post_ids)))
+
+        self.stdout.write("Checked {} users, {} mismatches".format(len(users), mismatches))
+        if mismatches:
+            raise CommandError("Materialized timelines are out of sync, run rebuild_feed_timelines")
@@ -0,0 +1,39 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from feeds.models import ECard, Images
+from feeds.tasks import generate_image_renditions
+
+
+class Command(BaseCommand):
+    help = "Generates the renditions of the existing images / ecards which do not have them (or are outdated)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of images read per batch")
+        parser.add_argument("--async", action="store_true", dest="async_",
+                            help="Enqueue the generate_image_renditions task instead of generating in the command")
+        parser.add_argument("--force", action="store_true", help="Generate the renditions of all the images again")
+
+    def handle(self, *args, **options):
+        for model in (Images, ECard):
+            last_id, total, generated, failed = 0, 0, 0, 0
+            queryset = model.objects.exclude(image__isnull=True).exclude(image="").order_by("id")
+            while True:
+                images = list(queryset.filter(id__gt=last_id)[:options["batch_size"]])
+                if not images:
+                    break
+                for image in images:
+                    total += 1
+                    if image.has_renditions and not options["force"]:
+                        continue
+                    if options["async_"]:
+                        generate_image_renditions.delay(model._meta.model_name, image.id, force=options["force"])
+                        generated += 1
+                    elif image.generate_renditions():
+                        generated += 1
+                    else:
+                        failed += 1
+                last_id = images[-1].id
+            self.stdout.write("{}: checked {}, {} {}, failed {}".format(
+                model.__name__, total, "enqueued" if options["async_"] else "generated", generated, failed))
@@ -0,0 +1,33 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from feeds.models import Post
+from feeds.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized timelines used to serve the home feed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of posts pushed per batch")
+        parser.add_argument("--organization", type=int, default=None,
+                            help="Only rebuild the posts created by the users of this organization")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.order_by("id")
+        if options["organization"]:
+            posts = posts.filter(created_by__organization_id=options["organization"])
+
+        last_id, total_posts, total_entries = 0, 0, 0
+        while True:
+            post_ids = list(posts.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+            if not post_ids:
+                break
+            total_entries += rebuild_timelines(post_ids)
+            total_posts += len(post_ids)
+            last_id = post_ids[-1]
+            self.stdout.write("Pushed {} posts ({} timeline entries)".format(total_posts, total_entries))
+
+        self.stdout.write("Done, pushed {} posts ({} timeline entries)".format(total_posts, total_entries))
@@ -0,0 +1,33 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from feeds.models import Post
+from feeds.visibility import rebuild_posts_visibility
+
+
+class Command(BaseCommand):
+    help = "Backfills the PostVisibility index used to resolve the posts accessible by the user"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of posts indexed per batch")
+        parser.add_argument("--organization", type=int, default=None,
+                            help="Only index the posts created by the users of this organization")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        posts = Post.objects.order_by("id")
+        if options["organization"]:
+            posts = posts.filter(created_by__organization_id=options["organization"])
+
+        last_id, total_posts, total_rows = 0, 0, 0
+        while True:
+            post_ids = list(posts.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+            if not post_ids:
+                break
+            total_rows += rebuild_posts_visibility(post_ids)
+            total_posts += len(post_ids)
+            last_id = post_ids[-1]
+            self.stdout.write("Indexed {} posts ({} visibility rows)".format(total_posts, total_rows))
+
+        self.stdout.write("Done, indexed {} posts ({} visibility rows)".format(total_posts, total_rows))
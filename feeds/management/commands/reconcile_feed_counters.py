@@ -0,0 +1,36 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from feeds.counters import reconcile_comment_counters, reconcile_post_counters
+from feeds.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized like/comment/vote counters of posts and comments and reports the drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of rows reconciled per batch")
+        parser.add_argument("--dry-run", action="store_true", default=False,
+                            help="Only report the drift without fixing the counters")
+
+    def reconcile(self, queryset, reconcile_func, batch_size, fix):
+        last_id, total, drifted = 0, 0, 0
+        queryset = queryset.order_by("id")
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            drifted += reconcile_func(ids, fix)
+            total += len(ids)
+            last_id = ids[-1]
+        return total, drifted
+
+    def handle(self, *args, **options):
+        fix = not options["dry_run"]
+        total, drifted = self.reconcile(Post.objects.all(), reconcile_post_counters, options["batch_size"], fix)
+        self.stdout.write("Posts: checked {}, drifted {}".format(total, drifted))
+        total, drifted = self.reconcile(Comment.objects.all(), reconcile_comment_counters, options["batch_size"], fix)
+        self.stdout.write("Comments: checked {}, drifted {}".format(total, drifted))
+        if not fix:
+            self.stdout.write("Dry run, counters are not updated")
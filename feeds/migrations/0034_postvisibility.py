@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0033_auto_20240809_0652'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostVisibility',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('audience_kind', models.SmallIntegerField(choices=[(6, 'Creator organization'), (2, 'Department'), (5, 'Creator'), (4, 'User'), (7, 'Creator department'), (3, 'Job family'), (1, 'Organization')])),
+                ('audience_id', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(related_name='visibilities', to='feeds.Post')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='postvisibility',
+            unique_together=set([('post', 'audience_kind', 'audience_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='postvisibility',
+            index_together=set([('audience_kind', 'audience_id')]),
+        ),
+    ]
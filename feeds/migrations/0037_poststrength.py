@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0036_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStrength',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('post', models.ForeignKey(related_name='strengths', to='feeds.Post', on_delete=django.db.models.deletion.CASCADE)),
+                ('transaction', models.ForeignKey(related_name='+', to='finance.Transaction', on_delete=django.db.models.deletion.CASCADE)),
+                ('user_strength', models.ForeignKey(related_name='+', to='profiles.UserStrength', on_delete=django.db.models.deletion.CASCADE)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='poststrength',
+            unique_together=set([('post', 'transaction')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='poststrength',
+            index_together=set([('user_strength', 'post')]),
+        ),
+    ]
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Partial indexes of the feed queries, these are supported on PostgreSQL only
+POST_INDEXES = (
+    ("feeds_post_type_created_on_idx", "post_type, created_on DESC"),
+    ("feeds_post_feed_ordering_idx", "priority DESC, modified_on DESC, created_on DESC"),
+    ("feeds_post_shared_with_type_idx", "shared_with, post_type"),
+)
+
+# M2M through tables are read from the related side (posts of the organizations / departments / job families)
+THROUGH_INDEXES = (
+    ("organizations", "feeds_post_orgs_reverse_idx"),
+    ("departments", "feeds_post_depts_reverse_idx"),
+    ("job_families", "feeds_post_job_families_reverse_idx"),
+)
+
+# reactions / comments of the user on a post
+INDEX_TOGETHER = (
+    ("postliked", ("post", "created_by")),
+    ("comment", ("post", "created_by")),
+)
+
+
+def get_through_indexes(apps):
+    post_model = apps.get_model("feeds", "Post")
+    for field_name, index_name in THROUGH_INDEXES:
+        field = post_model._meta.get_field(field_name)
+        yield index_name, field.m2m_db_table(), field.m2m_reverse_name(), field.m2m_column_name()
+
+
+def get_index_together(apps, schema_editor):
+    """Returns the index_together indexes as named by the schema editor of Django"""
+    for model_name, field_names in INDEX_TOGETHER:
+        model = apps.get_model("feeds", model_name)
+        columns = [model._meta.get_field(field_name).column for field_name in field_names]
+        yield model, field_names, schema_editor._create_index_name(model, columns, suffix="_idx"), columns
+
+
+def get_index_statements(apps, schema_editor):
+    """Returns (index name, CREATE INDEX statement with the {concurrently} placeholder) of every index"""
+    quote_name = schema_editor.quote_name
+    statements = []
+    for index_name, columns in POST_INDEXES:
+        statements.append((index_name, "CREATE INDEX {{concurrently}} IF NOT EXISTS {} ON {} ({}) WHERE "
+                                       "mark_delete = false".format(quote_name(index_name), quote_name("feeds_post"),
+                                                                    columns)))
+    for index_name, table, related_column, post_column in get_through_indexes(apps):
+        statements.append((index_name, "CREATE INDEX {{concurrently}} IF NOT EXISTS {} ON {} ({}, {})".format(
+            quote_name(index_name), quote_name(table), quote_name(related_column), quote_name(post_column))))
+    for model, _, index_name, columns in get_index_together(apps, schema_editor):
+        statements.append((index_name, "CREATE INDEX {{concurrently}} IF NOT EXISTS {} ON {} ({})".format(
+            quote_name(index_name), quote_name(model._meta.db_table), ", ".join(map(quote_name, columns)))))
+    return statements
+
+
+def execute_outside_transaction(schema_editor, statements):
+    """
+    Executes the statements with {concurrently} set to CONCURRENTLY, which can not run in a transaction block.
+    Django 1.8 runs every migration in the transaction of the schema editor (Migration.atomic is 1.10+), it is
+    committed before the statements and a new one is started for the rest of the migration. The statements are
+    executed without CONCURRENTLY (i.e. locking the tables) if the migration runs in an outer transaction
+    """
+    connection = schema_editor.connection
+    atomic = getattr(schema_editor, "atomic", None)
+    if atomic is not None:
+        atomic.__exit__(None, None, None)
+    try:
+        concurrently = "" if connection.in_atomic_block else "CONCURRENTLY"
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql.format(concurrently=concurrently))
+    finally:
+        if atomic is not None:
+            atomic.__enter__()
+
+
+def get_invalid_indexes(schema_editor, index_names):
+    """Returns the indexes left invalid by a failed CREATE INDEX CONCURRENTLY, IF NOT EXISTS would skip them"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND c.relname = ANY(%s)", [list(index_names)])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        for model, field_names, _, _ in get_index_together(apps, schema_editor):
+            schema_editor.alter_index_together(model, [], [field_names])
+        return
+    statements = get_index_statements(apps, schema_editor)
+    invalid_indexes = get_invalid_indexes(schema_editor, [index_name for index_name, _ in statements])
+    execute_outside_transaction(schema_editor, [
+        "DROP INDEX {{concurrently}} IF EXISTS {}".format(schema_editor.quote_name(index_name))
+        for index_name in invalid_indexes
+    ] + [sql for _, sql in statements])
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        for model, field_names, _, _ in get_index_together(apps, schema_editor):
+            schema_editor.alter_index_together(model, [field_names], [])
+        return
+    execute_outside_transaction(schema_editor, [
+        "DROP INDEX {{concurrently}} IF EXISTS {}".format(schema_editor.quote_name(index_name))
+        for index_name, _ in get_index_statements(apps, schema_editor)
+    ])
+
+
+class Migration(migrations.Migration):
+    # the indexes are created CONCURRENTLY on PostgreSQL, refer execute_outside_transaction for Django 1.8
+    atomic = False
+
+    dependencies = [
+        ('feeds', '0037_poststrength'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterIndexTogether(
+                name='postliked',
+                index_together=set([('post', 'created_by')]),
+            ),
+            migrations.AlterIndexTogether(
+                name='comment',
+                index_together=set([('post', 'created_by')]),
+            ),
+        ]),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0038_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ecard',
+            name='display_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+        migrations.AddField(
+            model_name='ecard',
+            name='large_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+        migrations.AddField(
+            model_name='ecard',
+            name='renditions_key',
+            field=models.CharField(default='', max_length=32, blank=True),
+        ),
+        migrations.AddField(
+            model_name='ecard',
+            name='thumbnail_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+        migrations.AddField(
+            model_name='images',
+            name='display_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+        migrations.AddField(
+            model_name='images',
+            name='large_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+        migrations.AddField(
+            model_name='images',
+            name='renditions_key',
+            field=models.CharField(default='', max_length=32, blank=True),
+        ),
+        migrations.AddField(
+            model_name='images',
+            name='thumbnail_url',
+            field=models.CharField(default='', max_length=500, blank=True),
+        ),
+    ]
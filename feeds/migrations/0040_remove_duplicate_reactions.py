@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_reactions(apps, schema_editor):
+    """Keeps the latest reaction of the user on the post, the unique constraint is added by the next migration"""
+    PostLiked = apps.get_model("feeds", "PostLiked")
+    duplicates = PostLiked.objects.values("post_id", "created_by_id").annotate(
+        latest_id=Max("id"), reactions=Count("id")).filter(reactions__gt=1).order_by()
+    for duplicate in duplicates.iterator():
+        PostLiked.objects.filter(
+            post_id=duplicate["post_id"], created_by_id=duplicate["created_by_id"]
+        ).exclude(id=duplicate["latest_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0039_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_reactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('feeds', '0040_remove_duplicate_reactions'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='postliked',
+            unique_together=set([('post', 'created_by')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='postliked',
+            index_together=set([]),
+        ),
+    ]
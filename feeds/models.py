@@ -1,9 +1,11 @@
+import hashlib
 import logging
+from functools import partial
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.utils import timezone
 from django.utils.module_loading import import_string
 from django.utils.translation import ugettext as _
@@ -16,7 +18,7 @@ from easy_thumbnails.exceptions import InvalidImageFormatError
 from easy_thumbnails.files import get_thumbnailer
 from taggit.managers import TaggableManager
 
-from .constants import POST_TYPE, REACTION_TYPE, SHARED_WITH, POST_CERTIFICATE_ATTACHMENTS
+from .constants import AUDIENCE_KIND, POST_TYPE, REACTION_TYPE, SHARED_WITH, POST_CERTIFICATE_ATTACHMENTS
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,8 @@ Transaction = import_string(settings.TRANSACTION_MODEL)
 Nominations = import_string(settings.NOMINATIONS_MODEL)
 RepeatedEvent = import_string(settings.REPEATED_EVENT_MODEL)
 UserJobFamily = import_string(settings.USER_JOB_FAMILY)
+UserStrength = import_string(settings.USER_STRENGTH_MODEL)
+DENORMALIZED_COUNTERS_ENABLED = getattr(settings, "FEEDS_DENORMALIZED_COUNTERS_ENABLED", False)
 
 
 def post_upload_to_path(instance, filename):
@@ -52,6 +56,20 @@ def post_upload_to_path(instance, filename):
     )
 
 
+def get_post_transactions_ordering():
+    """
+    Returns the ordering of the rows of Post.transactions.through which matches post.transactions.first()
+    i.e. the Meta ordering of the transaction model, by pk if it is not ordered
+    """
+    ordering = []
+    for field_name in Transaction._meta.ordering or ("pk",):
+        prefix = "-" if field_name.startswith("-") else ""
+        field_name = field_name.lstrip("-")
+        lookup = "transaction_id" if field_name in ("pk", Transaction._meta.pk.name) else "transaction__" + field_name
+        ordering.append(prefix + lookup)
+    return ordering
+
+
 class CIImageModel(models.Model):
     IMAGE_SIZES = {
         "thumbnail": (150, 150),
@@ -62,16 +80,45 @@ class CIImageModel(models.Model):
     img_large = CIThumbnailField('image', (1, 1), blank=True, null=True)
     img_display = CIThumbnailField('image', (1, 1), blank=True, null=True)
     img_thumbnail = CIThumbnailField('image', (1, 1), blank=True, null=True)
+    # urls of the renditions generated by the generate_image_renditions task, valid for the renditions_key
+    thumbnail_url = models.CharField(max_length=500, blank=True, default="")
+    display_url = models.CharField(max_length=500, blank=True, default="")
+    large_url = models.CharField(max_length=500, blank=True, default="")
+    renditions_key = models.CharField(max_length=32, blank=True, default="")
 
     def __init__(self, *args, **kwargs):
         for key in self.IMAGE_SIZES:
             field = self._meta.get_field('img_%s' % key)
             field.size = self.IMAGE_SIZES[key]
         super(CIImageModel, self).__init__(*args, **kwargs)
+        self._loaded_thumbnail_sources = self.get_thumbnail_sources()
 
-    def get_thumbnail(self, size_name, default_url=""):
-        if not self.image:
-            return default_url
+    def get_thumbnail_sources(self):
+        """
+        Returns the (image name, size, crop box) of the thumbnails of all the sizes, the keys of the thumbnail url
+        cache. Deferred fields are not loaded for it
+        """
+        image = self.__dict__.get("image")
+        image_name = getattr(image, "name", image)
+        if not image_name:
+            return []
+        return [
+            (image_name, self.IMAGE_SIZES[size_name], self.__dict__.get("img_%s" % size_name))
+            for size_name in sorted(self.IMAGE_SIZES)
+        ]
+
+    def evict_thumbnail_urls(self, changed_only=False):
+        """Evicts the cached thumbnail urls of the image as it was loaded (all or only the re-cropped / replaced)"""
+        from .thumbnails import evict_thumbnail_urls
+
+        sources = self._loaded_thumbnail_sources
+        if changed_only:
+            sources = set(sources) - set(self.get_thumbnail_sources())
+        if sources:
+            evict_thumbnail_urls(list(sources))
+        self._loaded_thumbnail_sources = self.get_thumbnail_sources()
+
+    def render_thumbnail(self, size_name, default_url=""):
         try:
             return get_thumbnailer(self.image).get_thumbnail({
                 'size': self.IMAGE_SIZES[size_name],
@@ -84,10 +131,56 @@ class CIImageModel(models.Model):
             logger.error("Exception occured generating thumbnail for %s (pk=%d) :  %s", self, self.pk, ex)
             return default_url
 
+    def get_thumbnail(self, size_name, default_url=""):
+        """Returns the url of the thumbnail through the thumbnail url cache, it is rendered on a miss only"""
+        from .thumbnails import get_thumbnail_url
+
+        if not self.image:
+            return default_url
+        url = get_thumbnail_url(
+            self.image.name, self.IMAGE_SIZES[size_name], getattr(self, "img_%s" % size_name),
+            partial(self.render_thumbnail, size_name))
+        return url or default_url
+
+    def get_renditions_key(self):
+        """Returns the digest of the image and its crop boxes, the stored renditions are valid for it only"""
+        if not self.image:
+            return ""
+        source = [self.image.name] + [
+            "%s" % (getattr(self, "img_%s" % size_name) or "") for size_name in sorted(self.IMAGE_SIZES)]
+        return hashlib.md5("|".join(source).encode("utf-8")).hexdigest()
+
+    @property
+    def has_renditions(self):
+        return bool(self.renditions_key) and self.renditions_key == self.get_renditions_key()
+
+    def generate_renditions(self):
+        """
+        Renders the thumbnails of all the sizes and stores their urls, returns False if any of them could not be
+        generated (the renditions are kept pending so they are generated again)
+        """
+        urls = dict(("%s_url" % size_name, self.get_thumbnail(size_name)) for size_name in self.IMAGE_SIZES)
+        if not all(urls.values()):
+            return False
+        urls["renditions_key"] = self.get_renditions_key()
+        self.__class__.objects.filter(pk=self.pk).update(**urls)
+        for name, value in urls.items():
+            setattr(self, name, value)
+        return True
+
+    def get_rendition_url(self, size_name):
+        """
+        Returns the stored url of the rendition, the thumbnail is read through the thumbnail url cache till the
+        renditions are generated (the original image if it could not be rendered)
+        """
+        if self.has_renditions:
+            return getattr(self, "%s_url" % size_name)
+        return self.get_thumbnail(size_name, self.image.url if self.image else "")
+
     @property
     def thumbnail_img_url(self):
         try:
-            thumbnail_img_url = self.get_thumbnail("thumbnail")
+            thumbnail_img_url = self.get_rendition_url("thumbnail")
             return thumbnail_img_url
         except ValueError as ex:
             logger.error("Error generating thumbnail for %s (pk=%d) :  %s", self, self.pk, ex)
@@ -96,7 +189,7 @@ class CIImageModel(models.Model):
     @property
     def display_img_url(self):
         try:
-            display_img_url = self.get_thumbnail("display")
+            display_img_url = self.get_rendition_url("display")
             return display_img_url
         except ValueError as ex:
             logger.error("Error generating display for %s (pk=%d) :  %s", self, self.pk, ex)
@@ -105,7 +198,7 @@ class CIImageModel(models.Model):
     @property
     def large_img_url(self):
         try:
-            large_img_url = self.get_thumbnail("large")
+            large_img_url = self.get_rendition_url("large")
             return large_img_url
         except ValueError as ex:
             logger.error("Error generating large for %s (pk=%d) :  %s", self, self.pk, ex)
@@ -190,6 +283,33 @@ class Post(UserInfo):
     )
     source_language = models.CharField(max_length=100, null=True, blank=True)
     tags = TaggableManager()
+    # denormalized counters, maintained with F() expressions and reconciled by reconcile_feed_counters
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    vote_count = models.IntegerField(default=0)
+
+    # fields the visibility index of the post depends on, the timelines depend on TIMELINE_FIELDS as well
+    SHARING_FIELDS = ("user_id", "created_by_id", "shared_with")
+    TIMELINE_FIELDS = ("mark_delete", "post_type")
+
+    def __init__(self, *args, **kwargs):
+        super(Post, self).__init__(*args, **kwargs)
+        self._loaded_sharing = self.get_sharing_values()
+
+    def get_sharing_values(self):
+        """
+        Returns the values of the SHARING_FIELDS / TIMELINE_FIELDS of the post, deferred fields are not loaded for it
+        """
+        return dict(
+            (field_name, self.__dict__.get(field_name)) for field_name in self.SHARING_FIELDS + self.TIMELINE_FIELDS)
+
+    def get_changed_sharing_fields(self):
+        """Returns the SHARING_FIELDS / TIMELINE_FIELDS changed since the post was loaded / last saved"""
+        values = self.get_sharing_values()
+        return set(field_name for field_name, value in values.items() if self._loaded_sharing[field_name] != value)
+
+    def reset_sharing_values(self):
+        self._loaded_sharing = self.get_sharing_values()
 
     @property
     def is_poll(self):
@@ -235,23 +355,31 @@ class Post(UserInfo):
         answer = PollsAnswer.objects.get(pk=answer_id, question=self)
         if self.user_has_voted(user):
             raise ValidationError(_('You have already voted for this question'))
-        Voter.objects.create(answer=answer, user=user, question=self)
-        answer.votes = answer.votes + 1
-        answer.save()
+        # the vote and the counters are written in the same transaction
+        with transaction.atomic():
+            Voter.objects.create(answer=answer, user=user, question=self)
+            PollsAnswer.objects.filter(pk=answer.pk).update(votes=F("votes") + 1)
+            Post.objects.filter(pk=self.pk).update(vote_count=F("vote_count") + 1)
+        self.refresh_from_db(fields=["vote_count"])
 
     def tag_user(self, user):
         PostTaggedUsers.objects.create(post=self, user=user)
 
+    def tag_users(self, user_ids):
+        PostTaggedUsers.objects.bulk_create([PostTaggedUsers(post=self, user_id=user_id) for user_id in user_ids])
+
     def untag_user(self, user):
-        ptu = PostTaggedUsers.objects.filter(post=self, user=user)
-        if ptu:
-            for u in ptu:
-                u.delete()
+        self.untag_users([user.id])
+
+    def untag_users(self, user_ids):
+        PostTaggedUsers.objects.filter(post=self, user_id__in=user_ids).delete()
 
     def related_answers(self):
         return PollsAnswer.objects.filter(question=self)
 
     def total_votes(self):
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return self.vote_count if self.is_poll else 0
         total_votes = None
         if self.is_poll:
             total_votes = self.related_answers().aggregate(
@@ -309,7 +437,11 @@ class Post(UserInfo):
         If no transaction returns 0
         If hide_points is True then points will be shown to the sender and receiver
         """
-        transaction = self.transactions.first()
+        return self.transaction_points(self.transactions.first(), user)
+
+    @staticmethod
+    def transaction_points(transaction, user):
+        """Returns points of the (first) transaction of the post, refer points()"""
         if not transaction:
             return 0
 
@@ -380,15 +512,20 @@ class Comment(UserInfo):
     )
     source_language = models.CharField(max_length=100, null=True, blank=True)
     mark_delete = models.BooleanField(default=False)
+    like_count = models.IntegerField(default=0)
 
     def tag_user(self, user):
         CommentTaggedUsers.objects.create(comment=self, user=user)
 
+    def tag_users(self, user_ids):
+        CommentTaggedUsers.objects.bulk_create(
+            [CommentTaggedUsers(comment=self, user_id=user_id) for user_id in user_ids])
+
     def untag_user(self, user):
-        ctu = CommentTaggedUsers.objects.filter(comment=self, user=user)
-        if ctu:
-            for u in ctu:
-                u.delete()
+        self.untag_users([user.id])
+
+    def untag_users(self, user_ids):
+        CommentTaggedUsers.objects.filter(comment=self, user_id__in=user_ids).delete()
 
     def get_feedback(self):
         """
@@ -403,17 +540,31 @@ class Comment(UserInfo):
     def reaction_types(self):
         return self.commentliked_set.values_list('reaction_type', flat=True).distinct()
 
+    def save(self, *args, **kwargs):
+        # Model.save sends post_save (comment_count of the post) after its transaction, both are written in this one
+        with transaction.atomic():
+            super(Comment, self).save(*args, **kwargs)
+
     def mark_as_delete(self, user):
         try:
-            self.mark_delete = True
-            self.modified_by = user
-            self.save()
+            with transaction.atomic():
+                # locked and read again, a concurrent request marking the comment is not counted twice
+                was_deleted = Comment.objects.select_for_update().values_list("mark_delete", flat=True).get(
+                    pk=self.pk)
+                self.mark_delete = True
+                self.modified_by = user
+                self.save()
+                if not was_deleted:
+                    Post.objects.filter(pk=self.post_id).update(comment_count=F("comment_count") - 1)
         except Comment.DoesNotExist:
             raise ValidationError(_("Comment does not exist"))
 
     def __unicode__(self):
         return "%s" % self.content
 
+    class Meta:
+        index_together = (("post", "created_by"),)
+
 
 class Images(CIImageModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, blank=True, null=True)
@@ -440,6 +591,9 @@ class PostLiked(UserInfo):
     def __unicode__(self):
         return "%s like post %s" % (self.created_by, self.post)
 
+    class Meta:
+        unique_together = (("post", "created_by"),)
+
 
 class CommentLiked(UserInfo):
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE)
@@ -537,4 +691,68 @@ class PostCertificateRecord(models.Model):
         return "{}: {}".format(self.post.title, user_email)
 
 
+class PostVisibility(models.Model):
+    """
+    Denormalized audience index of a Post, one row per (audience_kind, audience_id) the post is shared with.
+    Kept in sync by feeds.visibility so the feed can resolve accessible posts with a single indexed join
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="visibilities")
+    audience_kind = models.SmallIntegerField(choices=AUDIENCE_KIND())
+    audience_id = models.PositiveIntegerField()
+
+    def __unicode__(self):
+        return "{}: {} {}".format(self.post_id, self.get_audience_kind_display(), self.audience_id)
+
+    class Meta:
+        unique_together = (("post", "audience_kind", "audience_id"),)
+        index_together = (("audience_kind", "audience_id"),)
+
+
+class PostReactionCount(models.Model):
+    """Denormalized number of reactions of each type on the post, refer feeds.counters"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="reaction_counts")
+    reaction_type = models.SmallIntegerField(choices=REACTION_TYPE())
+    count = models.IntegerField(default=0)
+
+    def __unicode__(self):
+        return "{}: {} {}".format(self.post_id, self.get_reaction_type_display(), self.count)
+
+    class Meta:
+        unique_together = (("post", "reaction_type"),)
+
+
+class TimelineEntry(models.Model):
+    """
+    Fan-out-on-write timeline, one row per organization / department / job family whose members see the post
+    on their home feed. Kept in sync by feeds.timeline
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    audience_kind = models.SmallIntegerField(choices=AUDIENCE_KIND())
+    audience_id = models.PositiveIntegerField()
+
+    def __unicode__(self):
+        return "{}: {} {}".format(self.post_id, self.get_audience_kind_display(), self.audience_id)
+
+    class Meta:
+        unique_together = (("audience_kind", "audience_id", "post"),)
+
+
+class PostStrength(models.Model):
+    """
+    Strength (strength_id of the context) of a transaction of the post, one row per transaction having a strength
+    so the appreciations are filtered by the strength of any of their transactions in SQL. Kept in sync by
+    feeds.strengths
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="strengths")
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name="+")
+    user_strength = models.ForeignKey(UserStrength, on_delete=models.CASCADE, related_name="+")
+
+    def __unicode__(self):
+        return "{}: {} {}".format(self.post_id, self.transaction_id, self.user_strength_id)
+
+    class Meta:
+        unique_together = (("post", "transaction"),)
+        index_together = (("user_strength", "post"),)
+
+
 auditlog.register(Post, include_fields=['shared_with'])
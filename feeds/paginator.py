@@ -1,8 +1,26 @@
 from __future__ import division, print_function, unicode_literals
 
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
 from django.conf import settings
+from django.db.models import Q
+from django.utils import six
+from django.utils.translation import ugettext as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
-from rest_framework.pagination import PageNumberPagination
+CURSOR_PAGINATION = "cursor"
+
+
+def is_cursor_pagination(request):
+    """Returns True if the client opted in for the keyset (cursor) pagination"""
+    return request.query_params.get("pagination", None) == CURSOR_PAGINATION
 
 
 class FeedsResultsSetPagination(PageNumberPagination):
@@ -28,3 +46,120 @@ class FeedsCommentsSetPagination(PageNumberPagination):
     page_size = 1000
     page_size_query_param = 'pageSize'
     max_page_size = 1000
+
+
+class FeedsCursorPagination(BasePagination):
+    """
+    Keyset pagination, the next page is fetched with a WHERE on the ordering fields of the last row of the
+    current page (e.g. priority, modified_on, created_on, id) so there is neither OFFSET nor COUNT(*).
+    The ordering of the queryset is kept and the primary key is appended to it as tie breaker.
+    Only forward navigation is supported, the response contains next/previous/results
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param) or settings.FEEDS_PAGE_SIZE)
+        except (AttributeError, ValueError):
+            page_size = 10
+        return min(max(page_size, 1), self.max_page_size)
+
+    def has_fewer_rows(self, queryset, request):
+        """
+        Returns True if the queryset has fewer rows than a page, it is the check of the count based fallback of the
+        feeds. It is run on the whole queryset (not the rows after the cursor) so every page takes the same decision,
+        reads a page of ids at most instead of COUNT(*)
+        """
+        page_size = self.get_page_size(request)
+        return len(queryset.values_list("pk", flat=True)[:page_size]) < page_size
+
+    @staticmethod
+    def get_ordering(queryset):
+        """Returns the ordering of the queryset with the primary key as tie breaker"""
+        opts = queryset.model._meta
+        ordering = list(queryset.query.order_by or (opts.ordering if queryset.query.default_ordering else []))
+        ordering = [field.replace("pk", opts.pk.name) if field.lstrip("-") == "pk" else field for field in ordering]
+        if opts.pk.name not in [field.lstrip("-") for field in ordering]:
+            descending = ordering[-1].startswith("-") if ordering else True
+            ordering.append("-" + opts.pk.name if descending else opts.pk.name)
+        return ordering
+
+    @staticmethod
+    def get_field_queries(field_name, descending, value):
+        """
+        Returns (after, equal) queries of a single ordering field for the given cursor value,
+        NULLs are handled the way PostgreSQL sorts them (first in descending, last in ascending order)
+        """
+        if value is None:
+            after = Q(**{field_name + "__isnull": False}) if descending else Q(pk__in=[])
+            return after, Q(**{field_name + "__isnull": True})
+        if descending:
+            after = Q(**{field_name + "__lt": value})
+        else:
+            after = Q(**{field_name + "__gt": value}) | Q(**{field_name + "__isnull": True})
+        return after, Q(**{field_name: value})
+
+    def get_cursor_query(self, ordering, values):
+        """Returns the query matching the rows ordered after the given values"""
+        cursor_query, equal_query = Q(pk__in=[]), Q()
+        for field, value in zip(ordering, values):
+            field_name = field.lstrip("-")
+            after, equal = self.get_field_queries(field_name, field.startswith("-"), value)
+            cursor_query |= equal_query & after
+            equal_query &= equal
+        return cursor_query
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param, None)
+        if not encoded:
+            return None
+        opts = queryset.model._meta
+        try:
+            values = json.loads(urlsafe_b64decode(six.text_type(encoded).encode("ascii")).decode("utf-8"))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                None if value is None else opts.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(_("Invalid cursor"))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request, queryset)
+        if values is not None:
+            queryset = queryset.filter(self.get_cursor_query(self.ordering, values))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data)
+        ]))
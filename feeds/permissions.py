@@ -13,3 +13,15 @@ class IsOptionsOrAuthenticated(IsAuthenticated):
             return True
 
         return super(IsOptionsOrAuthenticated, self).has_permission(request, view)
+
+
+class IsOptionsOrStaff(IsOptionsOrAuthenticated):
+    """
+    Allow OPTIONS from anyone, otherwise require authenticated staff user.
+    """
+
+    def has_permission(self, request, view):
+        if request.method == 'OPTIONS':
+            return True
+
+        return super(IsOptionsOrStaff, self).has_permission(request, view) and request.user.is_staff
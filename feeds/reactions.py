@@ -0,0 +1,217 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.translation import ugettext as _
+from rest_framework.exceptions import ValidationError
+
+from .constants import REACTION_TYPE
+from .counters import get_top_reaction_types, reconcile_post_counters, update_post_reaction_counters
+from .models import DENORMALIZED_COUNTERS_ENABLED, Post, PostLiked, PostReactionCount
+from .response_cache import ORG_RECO_CACHE_ENABLED, invalidate_org_reco_cache_for_post
+
+
+# single statement toggle / set of the reactions, uses INSERT .. ON CONFLICT (PostgreSQL 9.5+)
+REACTION_UPSERT_ENABLED = getattr(settings, "FEEDS_REACTION_UPSERT_ENABLED", False)
+REACTION_BATCH_SIZE = getattr(settings, "FEEDS_REACTION_BATCH_SIZE", 100)
+
+TOGGLE_REACTION_SQL = """
+WITH existing AS (
+    SELECT {id}, {reaction_type} FROM {table} WHERE {post} = %(post_id)s AND {created_by} = %(user_id)s
+), deleted AS (
+    DELETE FROM {table} WHERE {id} IN (SELECT {id} FROM existing WHERE {reaction_type} = %(reaction_type)s)
+    RETURNING {reaction_type}
+), updated AS (
+    UPDATE {table} SET {reaction_type} = %(reaction_type)s
+    WHERE {id} IN (SELECT {id} FROM existing WHERE {reaction_type} <> %(reaction_type)s)
+    RETURNING {id}
+), inserted AS (
+    INSERT INTO {table} ({post}, {created_by}, {reaction_type}, {created_on})
+    SELECT %(post_id)s, %(user_id)s, %(reaction_type)s, %(created_on)s WHERE NOT EXISTS (SELECT 1 FROM existing)
+    ON CONFLICT ({post}, {created_by}) DO NOTHING
+    RETURNING {id}
+)
+SELECT (SELECT {reaction_type} FROM existing), (SELECT COUNT(*) FROM deleted), (SELECT COUNT(*) FROM updated),
+    (SELECT COUNT(*) FROM inserted)
+"""
+
+SET_REACTION_SQL = """
+WITH existing AS (
+    SELECT {reaction_type} FROM {table} WHERE {post} = %(post_id)s AND {created_by} = %(user_id)s
+), upserted AS (
+    INSERT INTO {table} ({post}, {created_by}, {reaction_type}, {created_on})
+    VALUES (%(post_id)s, %(user_id)s, %(reaction_type)s, %(created_on)s)
+    ON CONFLICT ({post}, {created_by}) DO UPDATE SET {reaction_type} = EXCLUDED.{reaction_type}
+    WHERE {table}.{reaction_type} <> EXCLUDED.{reaction_type}
+    RETURNING {id}, xmax = 0 AS inserted
+)
+SELECT (SELECT {reaction_type} FROM existing), (SELECT COUNT(*) FROM upserted),
+    (SELECT COUNT(*) FROM upserted WHERE NOT inserted)
+"""
+
+REMOVE_REACTION_SQL = """
+DELETE FROM {table} WHERE {post} = %(post_id)s AND {created_by} = %(user_id)s RETURNING {reaction_type}
+"""
+
+
+class ReactionChange(object):
+    """Reaction of the user on the post before / after the change, None if the user had / has not reacted"""
+
+    def __init__(self, post_id, previous_type, reaction_type, changed=True):
+        self.post_id = post_id
+        self.previous_type = previous_type
+        self.reaction_type = reaction_type
+        self.changed = bool(changed) and previous_type != reaction_type
+
+    @property
+    def created(self):
+        return self.changed and self.previous_type is None
+
+    @property
+    def liked(self):
+        return self.reaction_type is not None
+
+
+def parse_reaction_type(value):
+    """Returns the reaction type as int, raises ValidationError if it is not one of REACTION_TYPE"""
+    try:
+        reaction_type = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(_("type should be numeric value."))
+    if reaction_type not in dict(REACTION_TYPE()):
+        raise ValidationError(_("type is not a valid reaction type."))
+    return reaction_type
+
+
+def is_reaction_upsert_enabled():
+    return REACTION_UPSERT_ENABLED and connection.vendor == "postgresql"
+
+
+def execute_reaction_sql(sql, post_id, user_id, reaction_type=None):
+    meta = PostLiked._meta
+    quote_name = connection.ops.quote_name
+    sql = sql.format(
+        table=quote_name(meta.db_table),
+        id=quote_name(meta.pk.column),
+        post=quote_name(meta.get_field("post").column),
+        created_by=quote_name(meta.get_field("created_by").column),
+        reaction_type=quote_name(meta.get_field("reaction_type").column),
+        created_on=quote_name(meta.get_field("created_on").column),
+    )
+    params = {"post_id": post_id, "user_id": user_id, "reaction_type": reaction_type, "created_on": timezone.now()}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def apply_reaction_change(change, signalled=False):
+    """
+    Updates the denormalized counters for the change, the organization recognitions cache is invalidated when
+    the change did not send the signals of PostLiked (update / raw SQL)
+    """
+    if not change.changed:
+        return change
+    update_post_reaction_counters(
+        change.post_id,
+        added=[change.reaction_type] if change.reaction_type is not None else [],
+        removed=[change.previous_type] if change.previous_type is not None else [],
+    )
+    if ORG_RECO_CACHE_ENABLED and not signalled:
+        invalidate_org_reco_cache_for_post(change.post_id)
+    return change
+
+
+def apply_reaction_conflict(change):
+    """
+    The reaction was created by a concurrent request of the user after the statement read the existing reaction,
+    its type is not known so the counters of the post are recomputed instead of being updated for the change
+    """
+    reconcile_post_counters([change.post_id])
+    if ORG_RECO_CACHE_ENABLED:
+        invalidate_org_reco_cache_for_post(change.post_id)
+    return change
+
+
+def create_post_reaction(post_id, user, reaction_type):
+    try:
+        with transaction.atomic():
+            PostLiked.objects.create(post_id=post_id, created_by=user, reaction_type=reaction_type)
+    except IntegrityError:
+        # created concurrently by another request of the user
+        return ReactionChange(post_id, None, reaction_type, changed=False)
+    return apply_reaction_change(ReactionChange(post_id, None, reaction_type), signalled=True)
+
+
+@transaction.atomic
+def toggle_post_reaction(post_id, user, reaction_type):
+    """
+    Removes the reaction of the user if it is of the same type, changes its type otherwise or adds it if the user
+    has not reacted to the post. Single statement with FEEDS_REACTION_UPSERT_ENABLED on PostgreSQL.
+    The reaction and the counters of the post are written in the same transaction. Returns ReactionChange
+    """
+    if is_reaction_upsert_enabled():
+        previous_type, deleted, updated, inserted = execute_reaction_sql(
+            TOGGLE_REACTION_SQL, post_id, user.pk, reaction_type)[0]
+        if deleted:
+            change = ReactionChange(post_id, previous_type, None)
+        elif updated or inserted:
+            change = ReactionChange(post_id, previous_type, reaction_type)
+        else:
+            # the reaction was changed concurrently by another request of the user
+            change = ReactionChange(post_id, previous_type, previous_type, changed=False)
+        return apply_reaction_change(change)
+
+    post_liked = PostLiked.objects.filter(post_id=post_id, created_by=user).first()
+    if post_liked is None:
+        return create_post_reaction(post_id, user, reaction_type)
+    if post_liked.reaction_type == reaction_type:
+        post_liked.delete()
+        return apply_reaction_change(ReactionChange(post_id, reaction_type, None), signalled=True)
+    updated = PostLiked.objects.filter(pk=post_liked.pk, reaction_type=post_liked.reaction_type).update(
+        reaction_type=reaction_type)
+    return apply_reaction_change(ReactionChange(post_id, post_liked.reaction_type, reaction_type, changed=updated))
+
+
+@transaction.atomic
+def set_post_reaction(post_id, user, reaction_type):
+    """
+    Sets the reaction of the user on the post to the given type, removes it if reaction_type is None,
+    idempotent so the reactions queued by the offline clients can be synced again.
+    The reaction and the counters of the post are written in the same transaction. Returns ReactionChange
+    """
+    if is_reaction_upsert_enabled():
+        if reaction_type is None:
+            removed = execute_reaction_sql(REMOVE_REACTION_SQL, post_id, user.pk)
+            change = ReactionChange(post_id, removed[0][0] if removed else None, None)
+        else:
+            previous_type, upserted, updated = execute_reaction_sql(
+                SET_REACTION_SQL, post_id, user.pk, reaction_type)[0]
+            if updated and previous_type is None:
+                return apply_reaction_conflict(ReactionChange(post_id, None, reaction_type, changed=False))
+            change = ReactionChange(post_id, previous_type, reaction_type, changed=upserted)
+        return apply_reaction_change(change)
+
+    post_liked = PostLiked.objects.filter(post_id=post_id, created_by=user).first()
+    if post_liked is None:
+        if reaction_type is None:
+            return ReactionChange(post_id, None, None)
+        return create_post_reaction(post_id, user, reaction_type)
+    if reaction_type is None:
+        post_liked.delete()
+        return apply_reaction_change(ReactionChange(post_id, post_liked.reaction_type, None), signalled=True)
+    updated = PostLiked.objects.filter(pk=post_liked.pk, reaction_type=post_liked.reaction_type).update(
+        reaction_type=reaction_type)
+    return apply_reaction_change(ReactionChange(post_id, post_liked.reaction_type, reaction_type, changed=updated))
+
+
+def get_post_reactions_summary(post_id):
+    """Returns the number of reactions and the top reaction types of the post (denormalized counters if enabled)"""
+    if DENORMALIZED_COUNTERS_ENABLED:
+        count = Post.objects.filter(id=post_id).values_list("like_count", flat=True).first() or 0
+        return count, get_top_reaction_types(PostReactionCount.objects.filter(post_id=post_id))
+    post_likes = PostLiked.objects.filter(post_id=post_id)
+    reactions = post_likes.values("reaction_type").annotate(
+        reaction_count=Count("reaction_type")).order_by("-reaction_count")[:2]
+    return post_likes.count(), list(reactions)
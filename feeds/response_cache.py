@@ -0,0 +1,174 @@
+from __future__ import division, print_function, unicode_literals
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from .bulk import PostBulkContext
+from .constants import POST_TYPE
+from .models import Post, PostLiked
+from .utils import user_can_delete_post, user_can_edit_post
+from .viewer import FEEDS_CACHE
+
+
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+ORG_RECO_CACHE_ENABLED = getattr(settings, "FEEDS_ORG_RECO_CACHE_ENABLED", False)
+ORG_RECO_CACHE_TIMEOUT = getattr(settings, "FEEDS_ORG_RECO_CACHE_TIMEOUT", 5 * 60)
+ORG_RECO_CACHE_EVENTS = ("hit", "miss", "bypass")
+# fields of the user which decide the visibility of the posts / are rendered in the cached pages
+ORG_RECO_USER_FIELDS = getattr(settings, "FEEDS_ORG_RECO_USER_FIELDS", (
+    "organization_id", "hide_appreciation", "is_active", "email", settings.PROFILE_FIRST_NAME,
+    settings.PROFILE_LAST_NAME, "img",
+))
+
+
+def get_org_reco_generation_key(organization_id):
+    return "feeds:org_reco:generation:{}".format(organization_id)
+
+
+def get_org_reco_metric_key(event):
+    return "feeds:org_reco:metrics:{}".format(event)
+
+
+def record_org_reco_cache_event(event):
+    """Increments the hit/miss/bypass counter of the organization_recognitions cache"""
+    key = get_org_reco_metric_key(event)
+    if not FEEDS_CACHE.add(key, 1, None):
+        try:
+            FEEDS_CACHE.incr(key)
+        except ValueError:
+            FEEDS_CACHE.set(key, 1, None)
+
+
+def get_org_reco_cache_stats():
+    """Returns the hit/miss/bypass counters of the organization_recognitions cache"""
+    counters = FEEDS_CACHE.get_many([get_org_reco_metric_key(event) for event in ORG_RECO_CACHE_EVENTS])
+    return {event: counters.get(get_org_reco_metric_key(event), 0) for event in ORG_RECO_CACHE_EVENTS}
+
+
+def get_visibility_class(viewer):
+    """
+    Returns the digest of the relations which decides the posts visible to the viewer,
+    users of the organization having the same digest get the same organization_recognitions pages
+    viewer: ViewerContext
+    """
+    visibility = [
+        viewer.is_staff, sorted(viewer.department_ids), viewer.job_family_id,
+        sorted(viewer.admin_org_ids), sorted(viewer.appreciation_org_ids)
+    ]
+    return hashlib.md5(json.dumps(visibility).encode("utf-8")).hexdigest()
+
+
+def get_org_reco_generation(organization_id):
+    """Returns the generation of the organization, read once per request and passed to the keys depending on it"""
+    return FEEDS_CACHE.get(get_org_reco_generation_key(organization_id)) or 0
+
+
+def get_org_reco_params_digest(request):
+    query_params = sorted((key, request.query_params.getlist(key)) for key in request.query_params.keys())
+    return hashlib.md5(json.dumps(query_params).encode("utf-8")).hexdigest()
+
+
+def is_org_reco_cacheable(request, user, generation):
+    """
+    Returns False if the response can not be shared with the other users of the visibility class i.e.
+    post_polls / greeting (personal), nomination reviewers (review status is personal) and users who are part of
+    (creator/receiver/cc/sender or receiver of the transactions) any recognition since they see these posts
+    irrespective of the sharing. The involvement is not limited to the requested period since the view falls back
+    to the undated recognitions when the period has fewer posts than a page.
+    The involvement is stored for the generation of the organization so the cache hits do not query it
+    """
+    query_params = request.query_params
+    if query_params.get("post_polls", None) or query_params.get("greeting", None) or user.is_nomination_reviewer:
+        return False
+    key = "feeds:org_reco:cacheable:{}:{}:{}".format(user.organization_id, generation, user.pk)
+    cacheable = FEEDS_CACHE.get(key)
+    if cacheable is None:
+        involved_posts = Post.objects.filter(
+            Q(user=user) | Q(created_by=user) | Q(cc_users=user) | Q(transactions__user=user) |
+            Q(transactions__creator=user),
+            post_type__in=[POST_TYPE.USER_CREATED_APPRECIATION, POST_TYPE.USER_CREATED_NOMINATION],
+            mark_delete=False
+        )
+        cacheable = not involved_posts.exists()
+        FEEDS_CACHE.set(key, cacheable, ORG_RECO_CACHE_TIMEOUT)
+    return cacheable
+
+
+def get_org_reco_cache_key(request, user, viewer, generation):
+    """Returns the key of the page for the (organization, visibility class, filters and page, API version)"""
+    return "feeds:org_reco:{}:{}:{}:{}:{}".format(
+        user.organization_id, generation, get_visibility_class(viewer), request.version,
+        get_org_reco_params_digest(request))
+
+
+def get_cached_org_reco_response(key):
+    response = FEEDS_CACHE.get(key)
+    record_org_reco_cache_event("miss" if response is None else "hit")
+    return response
+
+
+def cache_org_reco_response(key, response):
+    """Stores the rendered form of the page (plain dicts/lists) so it does not keep the serializer references"""
+    response = json.loads(json.dumps(response, cls=JSONEncoder))
+    FEEDS_CACHE.set(key, response, ORG_RECO_CACHE_TIMEOUT)
+    return response
+
+
+def overlay_viewer_fields(response, user):
+    """
+    Replaces the fields of the cached page which depends on the requested user, points are read again since
+    they depend on the hide_points setting of the organization at the time of the request
+    response: dict (serialized page of OrganizationRecognitionSerializer)
+    user: CustomUser
+    """
+    results = response.get("results") or []
+    post_ids = [result["id"] for result in results]
+    user_reactions = dict(
+        PostLiked.objects.filter(post_id__in=post_ids, created_by=user).values_list("post_id", "reaction_type"))
+    transactions = PostBulkContext.get_first_transactions(post_ids)
+    for result in results:
+        if "points" in result:
+            result["points"] = str(Post.transaction_points(transactions.get(result["id"]), user))
+        result["is_owner"] = result["created_by"] == user.id
+        result["is_admin"] = user.is_staff
+        result["has_appreciated"] = result["id"] in user_reactions
+        result["user_reaction_type"] = user_reactions.get(result["id"])
+        result["can_edit"] = user_can_edit_post(user, result["post_type"], result["created_by"])
+        result["can_delete"] = user_can_delete_post(user, result["post_type"], result["created_by"])
+    return response
+
+
+def invalidate_org_reco_cache(organization_ids):
+    """
+    Moves the organizations to a new generation so the cached organization_recognitions pages are not read anymore
+    organization_ids: Iterable[int]
+    """
+    for organization_id in set(organization_ids):
+        if not organization_id:
+            continue
+        key = get_org_reco_generation_key(organization_id)
+        if not FEEDS_CACHE.add(key, 1, None):
+            try:
+                FEEDS_CACHE.incr(key)
+            except ValueError:
+                FEEDS_CACHE.set(key, 1, None)
+
+
+def invalidate_org_reco_cache_for_post(post_id):
+    """Invalidates the organization_recognitions pages of the organizations in which the post appears"""
+    organization_ids = set(Post.organizations.through.objects.filter(post_id=post_id).values_list(
+        "organization_id", flat=True))
+    for created_by_org_id, user_org_id in Post.objects.filter(id=post_id).values_list(
+            "created_by__organization_id", "user__organization_id"):
+        organization_ids.update([created_by_org_id, user_org_id])
+    invalidate_org_reco_cache(organization_ids)
+
+
+def invalidate_org_reco_cache_for_users(user_ids):
+    """Invalidates the organization_recognitions pages of the organizations of the users"""
+    invalidate_org_reco_cache(USERMODEL.objects.filter(id__in=user_ids).values_list("organization_id", flat=True))
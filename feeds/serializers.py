@@ -7,8 +7,10 @@ from django.db.models import Count
 from rest_framework import serializers
 
 from .constants import POST_TYPE, SHARED_WITH
+from .counters import get_top_reaction_types
+from .instrumentation import SerializerTimingMixin
 from .models import (
-    Comment, CommentLiked, Documents, ECard, ECardCategory, FlagPost,
+    DENORMALIZED_COUNTERS_ENABLED, Comment, CommentLiked, Documents, ECard, ECardCategory, FlagPost,
     Post, PostLiked, PollsAnswer, Images, Videos, Voter,
 )
 from .utils import (
@@ -80,12 +82,16 @@ def get_images_with_ecard(post):
     return all_images
 
 
-def get_user_strength(instance):
+def get_user_strength(instance, bulk=None):
     """
     Returns the serialized user strength data
     :params: instance: Post
+    :params: bulk: PostBulkContext/None
     :returns: UserStrengthSerializer/None
     """
+    if bulk is not None:
+        user_strength = bulk.strengths.get(instance.id)
+        return UserStrengthSerializer(instance=user_strength).data if user_strength else None
     transaction = instance.transactions.first()
     if transaction:
         strength_id = transaction.context.get('strength_id')
@@ -99,22 +105,32 @@ def get_user_strength(instance):
     return None
 
 
-def get_poll_info(instance, request):
+def get_tag_names(instance):
+    """Returns the distinct names of the tags of the post, read from the tags prefetched by get_related_objects_qs"""
+    names = []
+    for tag in instance.tags.all():
+        if tag.name not in names:
+            names.append(tag.name)
+    return names
+
+
+def get_poll_info(instance, request, bulk=None):
     """
     Returns the serialized user Poll data
     :params: instance: Post
     :params: request: HttpRequestObj
+    :params: bulk: PostBulkContext/None
     :returns: PollSerializer/None
     """
     if not instance.post_type == POST_TYPE.USER_CREATED_POLL:
         return None
-    serializer_context = {'request': request}
+    serializer_context = {'request': request, 'bulk': bulk}
     return PollSerializer(
         instance, read_only=True, context=serializer_context
     ).data
 
 
-class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     """
     A ModelSerializer that takes an additional `fields` argument that
     controls which fields should be displayed.
@@ -160,8 +176,10 @@ class UserInfoSerializer(DynamicFieldsModelSerializer):
             "pk", "email", "first_name", "last_name", "departments", "profile_img", "full_name"
         )
 
-    @staticmethod
-    def get_departments(instance):
+    def get_departments(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None and instance.pk in bulk.user_departments:
+            return bulk.user_departments[instance.pk]
         return list(get_departments(instance).values("name"))
 
     def get_profile_img(self, instance):
@@ -224,14 +242,14 @@ class PollSerializer(serializers.ModelSerializer):
 
     def get_answers(self, instance):
         request = self.context.get('request')
-        serializer_context = {'request': request}
-        user = request.user
-        result = instance.related_answers()
+        bulk = self.context.get('bulk')
+        serializer_context = {'request': request, 'bulk': bulk}
+        result = bulk.poll_answers.get(instance.id, []) if bulk is not None else instance.related_answers()
         if not instance.is_poll_active:
             return FinalPollsAnswerSerializer(
                 result, many=True, read_only=True,
                 context=serializer_context).data
-        if instance.user_has_voted(user):
+        if self.get_user_has_voted(instance):
             serializer = SubmittedPollsAnswerSerializer(
                 result, many=True, read_only=True, context=serializer_context)
         else:
@@ -240,11 +258,17 @@ class PollSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_user_has_voted(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return instance.id in bulk.voted_poll_ids
         request = self.context.get('request')
         user = request.user
         return instance.user_has_voted(user)
 
     def get_total_votes(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return bulk.total_votes.get(instance.id) or 0
         return instance.total_votes()
 
 
@@ -512,16 +536,16 @@ class PostSerializer(DynamicFieldsModelSerializer):
         return cc_users_data
 
     def get_tags(self, obj):
-        return list(obj.tags.values_list("name", flat=True))
+        return get_tag_names(obj)
 
     def get_is_admin(self, instance):
         return self.context['request'].user.is_staff
 
     def get_job_families(self, instance):
-        return instance.job_families.values_list("id", flat=True)
+        return [job_family.id for job_family in instance.job_families.all()]
 
     def get_poll_info(self, instance):
-        return get_poll_info(instance, self.context.get('request'))
+        return get_poll_info(instance, self.context.get('request'), self.context.get('bulk'))
 
     @staticmethod
     def get_images(instance):
@@ -542,20 +566,33 @@ class PostSerializer(DynamicFieldsModelSerializer):
         return VideosSerializer(instance.videos_set, many=True).data
 
     def get_created_by_user_info(self, instance):
-        return UserInfoSerializer(instance.created_by, context={'request': self.context.get('request')}).data
+        return UserInfoSerializer(
+            instance.created_by, context={'request': self.context.get('request'), 'bulk': self.context.get('bulk')}
+        ).data
 
     def get_is_owner(self, instance):
         return instance.created_by == self.context['request'].user
 
     def get_has_appreciated(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return instance.id in bulk.user_reactions
         return instance.postliked_set.filter(created_by=self.context['request'].user).exists()
 
-    @staticmethod
-    def get_appreciation_count(instance):
+    def get_appreciation_count(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return bulk.appreciation_counts.get(instance.id, 0)
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return instance.like_count
         return instance.postliked_set.count()
 
-    @staticmethod
-    def get_comments_count(instance):
+    def get_comments_count(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return bulk.comment_counts.get(instance.id, 0)
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return instance.comment_count
         return instance.comment_set.filter(mark_delete=False).count()
 
     def get_can_edit(self, instance):
@@ -564,9 +601,8 @@ class PostSerializer(DynamicFieldsModelSerializer):
     def get_can_delete(self, instance):
         return user_can_delete(self.context['request'].user, instance)
 
-    @staticmethod
-    def get_tagged_users(instance):
-        return UserInfoSerializer(instance.tagged_users, many=True).data
+    def get_tagged_users(self, instance):
+        return UserInfoSerializer(instance.tagged_users, many=True, context={'bulk': self.context.get('bulk')}).data
 
     def get_modified_on(self, instance):
         if instance.modified_on:
@@ -622,12 +658,15 @@ class PostSerializer(DynamicFieldsModelSerializer):
     def get_feed_type(instance):
         return get_feed_type(instance)
 
-    @staticmethod
-    def get_user_strength(instance):
-        return get_user_strength(instance)
+    def get_user_strength(self, instance):
+        return get_user_strength(instance, self.context.get('bulk'))
 
-    @staticmethod
-    def get_reaction_type(instance):
+    def get_reaction_type(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return bulk.reaction_types.get(instance.id, list())
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return get_top_reaction_types(instance.reaction_counts.all())
         post_likes = instance.postliked_set
         if post_likes.exists():
             return post_likes.values('reaction_type').annotate(
@@ -635,6 +674,9 @@ class PostSerializer(DynamicFieldsModelSerializer):
         return list()
 
     def get_user_reaction_type(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return bulk.user_reactions.get(instance.id)
         return get_user_reaction_type(self.context['request'].user, instance)
 
     def get_nomination(self, instance):
@@ -643,6 +685,9 @@ class PostSerializer(DynamicFieldsModelSerializer):
             fields=self.context.get('nomination_fields')).data
 
     def get_points(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return str(instance.transaction_points(bulk.transactions.get(instance.id), self.context['request'].user))
         return str(instance.points(self.context['request'].user))
 
     @staticmethod
@@ -722,7 +767,7 @@ class PostDetailSerializer(PostSerializer):
 
     @staticmethod
     def get_job_families(instance):
-        return instance.job_families.values_list("id", flat=True)
+        return [job_family.id for job_family in instance.job_families.all()]
 
     @staticmethod
     def get_is_download_choice_needed(post):
@@ -755,7 +800,8 @@ class PostDetailSerializer(PostSerializer):
         return self.context.get("request").user in (instance.user, instance.created_by)
 
     def get_user(self, post):
-        return get_user_detail_with_org(post, {"request": self.context.get("request")})
+        return get_user_detail_with_org(
+            post, {"request": self.context.get("request"), "bulk": self.context.get("bulk")})
 
     @staticmethod
     def get_greeting_info(post):
@@ -806,7 +852,8 @@ class PostFeedSerializer(PostSerializer):
         return get_info_for_greeting_post(post)
 
     def get_user(self, post):
-        return get_user_detail_with_org(post, {"request": self.context.get("request")})
+        return get_user_detail_with_org(
+            post, {"request": self.context.get("request"), "bulk": self.context.get("bulk")})
 
     class Meta:
         model = Post
@@ -823,7 +870,7 @@ class PostFeedSerializer(PostSerializer):
         )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     commented_by_user_info = serializers.SerializerMethodField()
     liked_count = serializers.SerializerMethodField()
     liked_by = serializers.SerializerMethodField()
@@ -862,6 +909,8 @@ class CommentSerializer(serializers.ModelSerializer):
                                                        "departments"]).data
 
     def get_liked_count(self, instance):
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return instance.like_count
         return CommentLiked.objects.filter(comment=instance).count()
 
     def get_liked_by(self, instance):
@@ -971,9 +1020,12 @@ class PollsAnswerSerializer(serializers.ModelSerializer):
         )
 
     def get_voters_info(self, instance):
-        voters = instance.get_voters()
-        voters = UserModel.objects.filter(pk__in=voters)
-        return UserInfoSerializer(voters, many=True, read_only=True).data
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            voters = bulk.answer_voters.get(instance.id, [])
+        else:
+            voters = UserModel.objects.filter(pk__in=instance.get_voters()).order_by("pk")
+        return UserInfoSerializer(voters, many=True, read_only=True, context={'bulk': bulk}).data
 
 
 class PollsAnswerSerializerLite(serializers.ModelSerializer):
@@ -985,15 +1037,18 @@ class PollsAnswerSerializerLite(serializers.ModelSerializer):
             "id", "question", "answer_text", "votes", "voters_info",
         )
 
-    @staticmethod
-    def get_voters_info(instance):
-        voters = instance.get_voters()
-        voters = UserModel.objects.filter(pk__in=voters)
+    def get_voters_info(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            voters = bulk.answer_voters.get(instance.id, [])
+        else:
+            voters = UserModel.objects.filter(pk__in=instance.get_voters()).order_by("pk")
         return UserInfoSerializer(voters, many=True, read_only=True, fields=["pk"]).data
 
 
 class SubmittedPollsAnswerSerializer(PollsAnswerSerializerLite):
     has_voted = serializers.SerializerMethodField()
+    percentage = serializers.SerializerMethodField()
 
     class Meta:
         model = PollsAnswer
@@ -1003,14 +1058,27 @@ class SubmittedPollsAnswerSerializer(PollsAnswerSerializerLite):
         )
 
     def get_has_voted(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return instance.id in bulk.voted_answer_ids
         request = self.context.get('request')
         user = request.user if request else None
         if user:
             return Voter.objects.filter(answer=instance, user=user).exists()
         return False
 
+    def get_percentage(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is None:
+            return instance.percentage
+        total_votes = bulk.total_votes.get(instance.question_id) or 0
+        if total_votes > 0:
+            return int(round((instance.votes * 100.0) / total_votes))
+
 
 class FinalPollsAnswerSerializer(SubmittedPollsAnswerSerializer):
+    is_winner = serializers.SerializerMethodField()
+
     class Meta:
         model = PollsAnswer
         fields = (
@@ -1018,6 +1086,12 @@ class FinalPollsAnswerSerializer(SubmittedPollsAnswerSerializer):
             "percentage", "voters_info", "is_winner",
         )
 
+    def get_is_winner(self, instance):
+        bulk = self.context.get('bulk')
+        if bulk is not None:
+            return instance.id in bulk.winner_answer_ids
+        return instance.is_winner
+
 
 class FlagPostSerializer(serializers.ModelSerializer):
     user_info = serializers.SerializerMethodField()
@@ -1040,7 +1114,7 @@ class ECardCategorySerializer(serializers.ModelSerializer):
         fields = ('pk', 'name', 'organization')
 
 
-class GreetingSerializerBase(serializers.ModelSerializer):
+class GreetingSerializerBase(SerializerTimingMixin, serializers.ModelSerializer):
     created_on = serializers.SerializerMethodField()
     created_by_user_info = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
@@ -1054,6 +1128,7 @@ class GreetingSerializerBase(serializers.ModelSerializer):
         super(GreetingSerializerBase, self).__init__(*args, **kwargs)
         self.request = self.context.get("request")
         self.user = self.request.user
+        self.bulk = self.context.get("bulk")
 
     def get_created_on(self, instance):
         if not self.user:
@@ -1061,7 +1136,7 @@ class GreetingSerializerBase(serializers.ModelSerializer):
         return get_user_localtime(instance.created_on, self.user.organization.timezone)
 
     def get_created_by_user_info(self, instance):
-        return UserInfoSerializer(instance.created_by, context={'request': self.request}).data
+        return UserInfoSerializer(instance.created_by, context={'request': self.request, 'bulk': self.bulk}).data
 
     def get_is_owner(self, instance):
         return instance.created_by == self.user
@@ -1111,15 +1186,21 @@ class OrganizationRecognitionSerializer(GreetingSerializerBase):
                 return instance.modified_on
             return get_user_localtime(instance.modified_on, self.user.organization.timezone)
 
-    @staticmethod
-    def get_appreciation_count(instance):
+    def get_appreciation_count(self, instance):
+        if self.bulk is not None:
+            return self.bulk.appreciation_counts.get(instance.id, 0)
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return instance.like_count
         return instance.postliked_set.count()
 
     def get_poll_info(self, instance):
-        return get_poll_info(instance, self.context.get('request'))
+        return get_poll_info(instance, self.request, self.bulk)
 
-    @staticmethod
-    def get_comments_count(instance):
+    def get_comments_count(self, instance):
+        if self.bulk is not None:
+            return self.bulk.comment_counts.get(instance.id, 0)
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return instance.comment_count
         return instance.comment_set.filter(mark_delete=False).count()
 
     def get_can_edit(self, instance):
@@ -1129,23 +1210,31 @@ class OrganizationRecognitionSerializer(GreetingSerializerBase):
         return user_can_delete(self.user, instance)
 
     def get_has_appreciated(self, instance):
+        if self.bulk is not None:
+            return instance.id in self.bulk.user_reactions
         return instance.postliked_set.filter(created_by=self.user).exists()
 
-    @staticmethod
-    def get_reaction_type(instance):
+    def get_reaction_type(self, instance):
+        if self.bulk is not None:
+            return self.bulk.reaction_types.get(instance.id, list())
+        if DENORMALIZED_COUNTERS_ENABLED:
+            return get_top_reaction_types(instance.reaction_counts.all())
         if instance.postliked_set.count() > 0:
             return instance.postliked_set.values('reaction_type').annotate(
                 reaction_count=Count('reaction_type')).order_by('-reaction_count')[:2]
         return list()
 
-    @staticmethod
-    def get_user_strength(instance):
-        return get_user_strength(instance)
+    def get_user_strength(self, instance):
+        return get_user_strength(instance, self.bulk)
 
     def get_user_reaction_type(self, instance):
+        if self.bulk is not None:
+            return self.bulk.user_reactions.get(instance.id)
         return get_user_reaction_type(self.user, instance)
 
     def get_points(self, instance):
+        if self.bulk is not None:
+            return str(instance.transaction_points(self.bulk.transactions.get(instance.id), self.user))
         return str(instance.points(self.user))
 
     def get_nomination(self, instance):
@@ -1154,7 +1243,7 @@ class OrganizationRecognitionSerializer(GreetingSerializerBase):
         ).data
 
     def get_user(self, post):
-        return get_user_detail_with_org(post, {"request": self.request})
+        return get_user_detail_with_org(post, {"request": self.request, "bulk": self.bulk})
 
     class Meta:
         model = Post
@@ -1177,7 +1266,7 @@ class GreetingSerializer(GreetingSerializerBase):
 
     @staticmethod
     def get_tags(obj):
-        return list(obj.tags.values_list("name", flat=True))
+        return get_tag_names(obj)
 
     class Meta:
         model = Post
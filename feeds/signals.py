@@ -1,13 +1,40 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils.module_loading import import_string
 from django.conf import settings
 
-from feeds.models import Comment
+from feeds.models import Comment, ECard, Images, Nominations, Post, PostLiked
+from feeds.approvals import get_nomination_reviewer_ids, invalidate_approvals_count
 from feeds.constants import POST_TYPE
+from feeds.counters import update_post_comment_count
+from feeds.response_cache import (
+    ORG_RECO_CACHE_ENABLED, ORG_RECO_USER_FIELDS, invalidate_org_reco_cache, invalidate_org_reco_cache_for_post,
+    invalidate_org_reco_cache_for_users,
+)
+from feeds.strengths import sync_post_strengths
+from feeds.tasks import generate_image_renditions
+from feeds.timeline import (
+    TIMELINE_ENABLE_FLAG, TIMELINES_ENABLED, invalidate_timeline_flag, push_creator_posts_to_timelines,
+    push_posts_to_timelines, push_to_timelines,
+)
+from feeds.viewer import invalidate_organization_viewer_contexts, invalidate_viewer_contexts
+from feeds.visibility import (
+    VISIBILITY_INDEX_ENABLED, index_post_visibility, index_posts_visibility, reindex_creator_departments,
+    reindex_creator_organization,
+)
 
 
 FEEDBACK_STATUS_OPTIONS = import_string(settings.FEEDBACK_STATUS_OPTIONS)
+DEPARTMENT_MODEL = import_string(settings.DEPARTMENT_MODEL)
+ORGANIZATION_MODEL = import_string(settings.ORGANIZATION_MODEL)
+ORGANIZATION_SETTINGS_MODEL = import_string(settings.ORGANIZATION_SETTINGS_MODEL)
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+TRANSACTION_MODEL = import_string(settings.TRANSACTION_MODEL)
+EMPLOYEE_ID_STORE_MODEL = import_string(settings.EMPLOYEE_ID_STORE)
+USER_JOB_FAMILY_MODEL = import_string(settings.USER_JOB_FAMILY)
+M2M_CHANGED_ACTIONS = ("post_add", "post_remove", "post_clear")
+# fields of the user the visibility index / timelines / cached pages depend on, compared against the values as loaded
+USER_SNAPSHOT_FIELDS = tuple(set(("organization_id",) + tuple(ORG_RECO_USER_FIELDS)))
 
 
 @receiver(post_save, sender=Comment)
@@ -30,3 +57,391 @@ def update_feedback_for_first_staff_comment(sender, instance, created, **kwargs)
                 if feedback.status == FEEDBACK_STATUS_OPTIONS.SUBMITTED:
                     feedback.status = FEEDBACK_STATUS_OPTIONS.UNDER_REVIEW
                     feedback.save()
+
+
+@receiver(post_save, sender=Comment)
+def increment_post_comment_count(sender, instance, created, **kwargs):
+    """
+    Method to count the comment in comment_count of the post whenever it is created (from any of the views),
+    it is taken out by Comment.mark_as_delete
+    """
+    if created and not instance.mark_delete:
+        update_post_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_post_comment_count(sender, instance, **kwargs):
+    """
+    Method to take the comment out of comment_count of the post whenever it is deleted without being marked as deleted
+    """
+    if not instance.mark_delete:
+        update_post_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def update_post_visibility(sender, instance, created, **kwargs):
+    """
+    Method to sync the visibility index and timelines whenever user / created_by / shared_with of the post changes
+    (mark_delete / post_type as well for the timelines)
+    """
+    changed_fields = instance.get_changed_sharing_fields()
+    instance.reset_sharing_values()
+    if VISIBILITY_INDEX_ENABLED and (created or changed_fields.intersection(Post.SHARING_FIELDS)):
+        index_post_visibility(instance)
+    if TIMELINES_ENABLED and (created or changed_fields):
+        push_to_timelines(instance)
+
+
+def get_cleared_ids(sender, instance, action, get_ids):
+    """
+    Returns the ids of the related objects being cleared (pk_set is None for clear), these are read on pre_clear
+    since they are not known anymore on post_clear
+    get_ids: callable returning the ids of the related objects of the instance
+    """
+    cleared_ids = instance.__dict__.setdefault("_cleared_ids", {})
+    if action == "pre_clear":
+        cleared_ids[sender] = list(get_ids())
+        return []
+    return cleared_ids.pop(sender, [])
+
+
+@receiver(m2m_changed, sender=Post.organizations.through)
+@receiver(m2m_changed, sender=Post.departments.through)
+@receiver(m2m_changed, sender=Post.job_families.through)
+def update_post_visibility_for_sharing(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to sync the visibility index and timelines whenever organizations / departments / job families
+    of the post changes
+    """
+    if not (VISIBILITY_INDEX_ENABLED or TIMELINES_ENABLED):
+        return
+    if not reverse:
+        post_ids = [instance.pk] if action in M2M_CHANGED_ACTIONS else []
+    elif action in ("pre_clear", "post_clear"):
+        # organization / department / job family is cleared i.e. organization.posts.clear()
+        field_name = [field.name for field in Post._meta.many_to_many if field.rel.through is sender][0]
+        post_ids = get_cleared_ids(sender, instance, action, lambda: Post.objects.filter(
+            **{field_name: instance}).values_list("id", flat=True))
+    else:
+        post_ids = list(pk_set or []) if action in M2M_CHANGED_ACTIONS else []
+    if not post_ids:
+        return
+    if VISIBILITY_INDEX_ENABLED:
+        index_posts_visibility(post_ids)
+    if TIMELINES_ENABLED:
+        push_posts_to_timelines(post_ids)
+
+
+@receiver(m2m_changed, sender=DEPARTMENT_MODEL.users.through)
+def update_post_visibility_for_creator_departments(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to sync the visibility index and timelines of the posts created by the users whose departments has changed
+    """
+    if not (VISIBILITY_INDEX_ENABLED or TIMELINES_ENABLED):
+        return
+    if isinstance(instance, USERMODEL):
+        user_ids = [instance.pk] if action in M2M_CHANGED_ACTIONS else []
+    elif action in ("pre_clear", "post_clear"):
+        # users of the department are cleared
+        user_ids = get_cleared_ids(sender, instance, action, lambda: instance.users.values_list("id", flat=True))
+    else:
+        user_ids = list(pk_set or []) if action in M2M_CHANGED_ACTIONS else []
+    if not user_ids:
+        return
+    if VISIBILITY_INDEX_ENABLED:
+        reindex_creator_departments(user_ids)
+    if TIMELINES_ENABLED:
+        push_creator_posts_to_timelines(user_ids)
+
+
+def get_user_values(instance):
+    """
+    Returns the values of the USER_SNAPSHOT_FIELDS of the user (name of the files), deferred fields are not loaded
+    for it
+    """
+    values = {}
+    for field_name in USER_SNAPSHOT_FIELDS:
+        value = instance.__dict__.get(field_name)
+        values[field_name] = getattr(value, "name", value)
+    return values
+
+
+def get_changed_user_fields(instance):
+    """Returns the USER_SNAPSHOT_FIELDS changed since the user was loaded / last saved"""
+    loaded_values = getattr(instance, "_feeds_loaded_values", {})
+    return set(
+        field_name for field_name, value in get_user_values(instance).items()
+        if loaded_values.get(field_name) != value
+    )
+
+
+@receiver(post_init, sender=USERMODEL)
+def snapshot_user_values(sender, instance, **kwargs):
+    """
+    Method to keep the values of the user the feeds depend on as loaded, so the saves which do not change
+    them (e.g. last_login) are ignored
+    """
+    instance._feeds_loaded_values = get_user_values(instance)
+
+
+@receiver(post_save, sender=USERMODEL)
+def update_post_visibility_for_creator_organization(sender, instance, created, **kwargs):
+    """
+    Method to sync the visibility index and timelines of the posts created by the user if the organization has changed
+    """
+    if created or "organization_id" not in get_changed_user_fields(instance):
+        return
+    if VISIBILITY_INDEX_ENABLED:
+        reindex_creator_organization(instance)
+    if TIMELINES_ENABLED:
+        push_creator_posts_to_timelines([instance.pk])
+
+
+@receiver(post_save, sender=ORGANIZATION_SETTINGS_MODEL)
+@receiver(post_delete, sender=ORGANIZATION_SETTINGS_MODEL)
+def invalidate_timeline_flag_for_settings(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached timeline flag of the organization whenever its setting is switched
+    """
+    if instance.key == TIMELINE_ENABLE_FLAG:
+        invalidate_timeline_flag(instance.organization_id)
+
+
+@receiver(m2m_changed, sender=DEPARTMENT_MODEL.users.through)
+def invalidate_viewer_context_for_departments(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to invalidate the cached viewer context of the users whose departments has changed
+    """
+    if isinstance(instance, USERMODEL):
+        if action in M2M_CHANGED_ACTIONS:
+            invalidate_viewer_contexts([instance.pk])
+    elif action == "pre_clear":
+        # users are not known anymore once the department is cleared
+        invalidate_viewer_contexts(list(instance.users.values_list("id", flat=True)))
+    elif action in M2M_CHANGED_ACTIONS and pk_set:
+        invalidate_viewer_contexts(pk_set)
+
+
+@receiver(pre_delete, sender=DEPARTMENT_MODEL)
+def invalidate_viewer_context_for_deleted_department(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached viewer context of the users of the department being deleted, the users are
+    removed from it without m2m_changed
+    """
+    invalidate_viewer_contexts(list(instance.users.values_list("id", flat=True)))
+
+
+@receiver(post_save, sender=USERMODEL)
+def invalidate_viewer_context_for_user(sender, instance, created, **kwargs):
+    """
+    Method to invalidate the cached viewer context whenever the user (organization, staff flag) changes
+    """
+    if not created:
+        invalidate_viewer_contexts([instance.pk])
+
+
+@receiver(post_save, sender=ORGANIZATION_MODEL)
+@receiver(post_delete, sender=ORGANIZATION_MODEL)
+def invalidate_viewer_context_for_organization(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached viewer contexts whenever an organization changes (e.g. its parent), the
+    organizations the users administer / are affiliated to are authorized against them
+    """
+    invalidate_organization_viewer_contexts()
+
+
+@receiver(m2m_changed)
+def invalidate_viewer_context_for_organization_relations(sender, instance, action, model, **kwargs):
+    """
+    Method to invalidate the cached viewer contexts whenever the organizations related to an organization
+    (e.g. affiliations) change
+    """
+    if action in M2M_CHANGED_ACTIONS and isinstance(instance, ORGANIZATION_MODEL) and model is ORGANIZATION_MODEL:
+        invalidate_organization_viewer_contexts()
+
+
+@receiver(post_save, sender=EMPLOYEE_ID_STORE_MODEL)
+@receiver(post_delete, sender=EMPLOYEE_ID_STORE_MODEL)
+def invalidate_viewer_context_for_job_family(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached viewer context of the user whenever the job family changes
+    """
+    if instance.user_id:
+        invalidate_viewer_contexts([instance.user_id])
+
+
+@receiver(pre_delete, sender=USER_JOB_FAMILY_MODEL)
+def invalidate_viewer_context_for_deleted_job_family(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached viewer context of the users of the job family being deleted, the job family is
+    unset on the employee id stores without post_save
+    """
+    invalidate_viewer_contexts(list(EMPLOYEE_ID_STORE_MODEL.objects.filter(
+        job_family=instance, user__isnull=False).values_list("user_id", flat=True)))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=PostLiked)
+@receiver(post_delete, sender=PostLiked)
+def invalidate_org_reco_cache_for_reaction(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached organization recognitions of the organizations in which the post appears
+    whenever the post, its comments or reactions change
+    """
+    if ORG_RECO_CACHE_ENABLED:
+        invalidate_org_reco_cache_for_post(instance.pk if sender is Post else instance.post_id)
+
+
+@receiver(m2m_changed, sender=Post.organizations.through)
+def invalidate_org_reco_cache_for_sharing(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to invalidate the cached organization recognitions whenever the organizations of the post changes
+    """
+    if not ORG_RECO_CACHE_ENABLED:
+        return
+    if action == "pre_clear" and not reverse:
+        # organizations are not known anymore once the post is cleared
+        invalidate_org_reco_cache_for_post(instance.pk)
+    elif action in M2M_CHANGED_ACTIONS:
+        if reverse:
+            invalidate_org_reco_cache([instance.pk])
+        else:
+            invalidate_org_reco_cache(pk_set or [])
+            invalidate_org_reco_cache_for_post(instance.pk)
+
+
+def get_changed_related_ids(sender, instance, action, pk_set, related_manager):
+    """Returns the ids of the related objects added / removed / cleared by the m2m_changed action"""
+    if action in ("pre_clear", "post_clear"):
+        return get_cleared_ids(sender, instance, action, lambda: related_manager.values_list("id", flat=True))
+    return list(pk_set or []) if action in M2M_CHANGED_ACTIONS else []
+
+
+@receiver(m2m_changed, sender=Post.cc_users.through)
+def invalidate_org_reco_cache_for_cc_users(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to invalidate the cached organization recognitions of the post and of the cc users whenever the cc users
+    of the post changes, the involvement of the users in the recognitions decides whether their pages are cached
+    """
+    if not ORG_RECO_CACHE_ENABLED:
+        return
+    related_ids = get_changed_related_ids(sender, instance, action, pk_set, instance.cc_users)
+    if not related_ids:
+        return
+    post_ids, user_ids = (related_ids, [instance.pk]) if reverse else ([instance.pk], related_ids)
+    invalidate_org_reco_cache_for_users(user_ids)
+    for post_id in post_ids:
+        invalidate_org_reco_cache_for_post(post_id)
+
+
+@receiver(m2m_changed, sender=Post.transactions.through)
+def invalidate_org_reco_cache_for_transactions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to invalidate the cached organization recognitions of the post and of the senders / receivers of the
+    transactions whenever the transactions of the post changes
+    """
+    if not ORG_RECO_CACHE_ENABLED:
+        return
+    related_ids = get_changed_related_ids(
+        sender, instance, action, pk_set, instance.post_set if reverse else instance.transactions)
+    if not related_ids:
+        return
+    post_ids, transaction_ids = (related_ids, [instance.pk]) if reverse else ([instance.pk], related_ids)
+    user_ids = set()
+    for transaction_user_id, creator_id in TRANSACTION_MODEL.objects.filter(id__in=transaction_ids).values_list(
+            "user_id", "creator_id"):
+        user_ids.update([transaction_user_id, creator_id])
+    invalidate_org_reco_cache_for_users(user_ids)
+    for post_id in post_ids:
+        invalidate_org_reco_cache_for_post(post_id)
+
+
+@receiver(post_save, sender=USERMODEL)
+def invalidate_org_reco_cache_for_user(sender, instance, created, **kwargs):
+    """
+    Method to invalidate the cached organization recognitions of the previous and the current organization
+    whenever the user fields they depend on (e.g. hide_appreciation) changes
+    """
+    if not ORG_RECO_CACHE_ENABLED or created:
+        return
+    if get_changed_user_fields(instance).intersection(ORG_RECO_USER_FIELDS):
+        previous_organization_id = getattr(instance, "_feeds_loaded_values", {}).get("organization_id")
+        invalidate_org_reco_cache([previous_organization_id, instance.organization_id])
+
+
+@receiver(pre_save, sender=Nominations)
+def invalidate_approvals_count_for_previous_reviewers(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached approvals count of the reviewers the nomination is taken away from
+    """
+    if instance.pk:
+        invalidate_approvals_count(get_nomination_reviewer_ids([instance.pk]))
+
+
+@receiver(post_save, sender=Nominations)
+def invalidate_approvals_count_for_nomination(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached approvals count of the reviewers whenever the nomination (status) changes
+    """
+    invalidate_approvals_count([instance.assigned_reviewer_id, instance.alternate_reviewer_id])
+
+
+@receiver(post_save, sender=Post)
+def invalidate_approvals_count_for_nomination_post(sender, instance, **kwargs):
+    """
+    Method to invalidate the cached approvals count of the reviewers whenever the nomination post is created / deleted
+    """
+    if instance.post_type == POST_TYPE.USER_CREATED_NOMINATION and instance.nomination_id:
+        invalidate_approvals_count(get_nomination_reviewer_ids([instance.nomination_id]))
+
+
+@receiver(m2m_changed, sender=Post.transactions.through)
+def sync_post_strength_for_transactions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Method to sync the strengths of the posts whenever transactions of the post changes
+    """
+    if action not in M2M_CHANGED_ACTIONS:
+        return
+    if not reverse:
+        sync_post_strengths([instance.pk])
+    elif pk_set:
+        sync_post_strengths(list(pk_set))
+
+
+@receiver(post_save, sender=Images)
+@receiver(post_save, sender=ECard)
+def evict_thumbnail_urls_for_image(sender, instance, **kwargs):
+    """
+    Method to evict the cached thumbnail urls of the image whenever it is replaced / re-cropped
+    """
+    instance.evict_thumbnail_urls(changed_only=True)
+
+
+@receiver(post_delete, sender=Images)
+@receiver(post_delete, sender=ECard)
+def evict_thumbnail_urls_for_deleted_image(sender, instance, **kwargs):
+    """
+    Method to evict the cached thumbnail urls of the image whenever it is deleted
+    """
+    instance.evict_thumbnail_urls()
+
+
+@receiver(post_save, sender=Images)
+@receiver(post_save, sender=ECard)
+def enqueue_image_renditions(sender, instance, **kwargs):
+    """
+    Method to generate the renditions of the image in the background whenever the image / its crop boxes changes
+    """
+    if instance.image and not instance.has_renditions:
+        generate_image_renditions.delay(instance._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=USERMODEL)
+def reset_user_values(sender, instance, **kwargs):
+    """
+    Method to take the saved values of the user as loaded, connected last so the handlers above compare against
+    the values before the save
+    """
+    instance._feeds_loaded_values = get_user_values(instance)
@@ -0,0 +1,58 @@
+from __future__ import division, print_function, unicode_literals
+
+from .constants import POST_TYPE
+from .models import Post, PostStrength, UserStrength
+
+
+def get_transaction_strength_id(transaction):
+    """Returns the strength_id of the transaction context as int (None if it is missing or invalid)"""
+    try:
+        return int((transaction.context or {}).get("strength_id"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def sync_post_strengths(post_ids):
+    """
+    Stores the strength of every transaction (having strength) of the given posts as PostStrength rows,
+    the stale rows are deleted and the missing ones created in bulk so it takes a fixed number of queries for the
+    batch. Returns the number of rows created / deleted
+    post_ids: List[int]
+    """
+    strength_ids = {}
+    post_transactions = Post.transactions.through.objects.filter(post_id__in=post_ids).select_related("transaction")
+    for post_transaction in post_transactions:
+        strength_ids[(post_transaction.post_id, post_transaction.transaction_id)] = get_transaction_strength_id(
+            post_transaction.transaction)
+
+    # strengths could have been removed after the transaction, those are not stored
+    existing_ids = set(UserStrength.objects.filter(
+        id__in=set(strength_ids.values()) - {None}).values_list("id", flat=True))
+    strengths = set(
+        (post_id, transaction_id, strength_id) for (post_id, transaction_id), strength_id in strength_ids.items()
+        if strength_id in existing_ids
+    )
+    stored = dict(
+        ((post_id, transaction_id, strength_id), row_id) for row_id, post_id, transaction_id, strength_id in
+        PostStrength.objects.filter(post_id__in=post_ids).values_list(
+            "id", "post_id", "transaction_id", "user_strength_id")
+    )
+    stale_ids = [row_id for key, row_id in stored.items() if key not in strengths]
+    if stale_ids:
+        PostStrength.objects.filter(id__in=stale_ids).delete()
+    missing = sorted(strengths - set(stored))
+    PostStrength.objects.bulk_create([
+        PostStrength(post_id=post_id, transaction_id=transaction_id, user_strength_id=strength_id)
+        for post_id, transaction_id, strength_id in missing
+    ])
+    return len(stale_ids) + len(missing)
+
+
+def posts_with_strength(strength_id):
+    """Returns the ids (subquery) of the posts having a transaction of the strength"""
+    return PostStrength.objects.filter(user_strength_id=strength_id).values("post_id")
+
+
+def appreciations_with_strength():
+    """Returns the appreciation posts which has transactions i.e. posts of which the strength is synced"""
+    return Post.objects.filter(post_type=POST_TYPE.USER_CREATED_APPRECIATION, transactions__isnull=False).distinct()
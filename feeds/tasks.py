@@ -1,22 +1,26 @@
 from __future__ import division, print_function, unicode_literals
 
 import logging
+from django.apps import apps
 from django.conf import settings
+from django.db import transaction
 from django.utils.translation import ugettext as _
 from django.utils.module_loading import import_string
-from celery import shared_task
-from feeds.constants import SHARED_WITH
+from celery import group, shared_task
 
+from feeds.audience import get_post_audience_ids
 from feeds.models import Comment, Post
+from feeds.viewer import FEEDS_CACHE
 
 check_org_email = import_string(settings.CHECK_ORG_EMAIL)
 PendingEmail = import_string(settings.PENDING_EMAIL)
 EMAIL_TYPE = import_string(settings.EMAIL_TYPE)
 TEMPLATE_MODEL = import_string(settings.TEMPLATE_MODEL)
 CustomUser = import_string(settings.CUSTOM_USER_MODEL)
-EmployeeIDStore = import_string(settings.EMPLOYEE_ID_STORE)
 NOTIFICATION_OBJECT = import_string(settings.POST_NOTIFICATION_OBJECT_TYPE)
 NOTIFICATION_OBJECT_TYPE = NOTIFICATION_OBJECT.Posts
+NOTIFICATION_CHUNK_SIZE = getattr(settings, "FEEDS_NOTIFICATION_CHUNK_SIZE", 1000)
+NOTIFICATION_IDEMPOTENCY_TIMEOUT = getattr(settings, "FEEDS_NOTIFICATION_IDEMPOTENCY_TIMEOUT", 24 * 60 * 60)
 
 
 logger = logging.getLogger(__name__)
@@ -59,57 +63,150 @@ def notify_user_via_email(self, comment_id):
     )
 
 
-@shared_task(bind=True)
-def notify_user_via_push_notification(self, poll_id, is_post=False):
-    from feeds.utils import get_user_name, push_notification
+@shared_task(bind=True, max_retries=3, default_retry_delay=5)
+def notify_new_comment_via_push_notification(self, comment_id):
+    """
+    Notifies the commentators and the creator of the post about the new comment (refer utils.notify_new_comment)
+    """
+    from feeds.utils import notify_new_comment
+
+    try:
+        comment = Comment.objects.select_related("created_by", "post", "post__created_by").get(id=comment_id)
+    except Comment.DoesNotExist as exc:
+        # the request which created the comment may not have committed yet
+        raise self.retry(exc=exc)
+    if comment.post:
+        notify_new_comment(comment, comment.created_by)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=5)
+def notify_tagged_users(self, sender_id, message, recipient_ids, object_id):
+    """
+    Notifies the users mentioned in a post / comment in one batch (refer utils.sync_tagged_users), the notifications
+    are created in a transaction so the retry does not notify twice
+    """
+    from feeds.utils import bulk_push_notification
+
+    try:
+        sender = CustomUser.objects.get(id=sender_id)
+        with transaction.atomic():
+            bulk_push_notification(
+                sender, message, recipient_ids, object_type=NOTIFICATION_OBJECT_TYPE, object_id=object_id,
+                raise_exception=True)
+    except CustomUser.DoesNotExist:
+        return
+    except Exception as exc:
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def generate_image_renditions(self, model_name, image_id, force=False):
+    """
+    Generates the thumbnail / display / large renditions of the Images / ECard and stores their urls on the row,
+    retried when the image is not committed yet or the renditions could not be generated
+    """
+    model = apps.get_model("feeds", model_name)
+    try:
+        image = model.objects.get(id=image_id)
+    except model.DoesNotExist as exc:
+        raise self.retry(exc=exc)
+    if not image.image or (image.has_renditions and not force):
+        return
+    if not image.generate_renditions():
+        raise self.retry()
+
+
+def get_notification_key(poll_id, *parts):
+    return ":".join(["feeds:notify", str(poll_id)] + [str(part) for part in parts])
 
+
+def get_notification_progress(poll_id):
+    """
+    Returns the progress of the fan-out of the post notification i.e. number of chunks enqueued / done
+    and recipients notified, None if the fan-out has not started
+    """
+    keys = [get_notification_key(poll_id, name) for name in ("chunks", "done", "notified")]
+    values = FEEDS_CACHE.get_many(keys)
+    if keys[0] not in values:
+        return None
+    return {
+        "chunks": values[keys[0]], "done": values.get(keys[1], 0), "notified": values.get(keys[2], 0)
+    }
+
+
+def increment_notification_progress(poll_id, name, delta):
+    key = get_notification_key(poll_id, name)
+    if not FEEDS_CACHE.add(key, delta, NOTIFICATION_IDEMPOTENCY_TIMEOUT):
+        FEEDS_CACHE.incr(key, delta)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def notify_user_via_push_notification(self, poll_id, is_post=False):
+    """
+    Coordinator of the post / poll notification, resolves the audience and enqueues notify_users_chunk
+    for every NOTIFICATION_CHUNK_SIZE recipients as a group so the chunks are processed by the workers in parallel.
+    The fan-out happens once per post, the task being retried or enqueued again does not notify twice.
+    The fan-out key is released if the audience could not be resolved / the chunks could not be enqueued
+    so the retry fans out again
+    """
     try:
         poll = Post.objects.get(id=poll_id)
     except Post.DoesNotExist:
         return
-    creator = poll.created_by
-    if not creator.is_staff:
+    if not poll.created_by.is_staff:
+        return
+    key = get_notification_key(poll_id, "fan_out")
+    if not FEEDS_CACHE.add(key, 1, NOTIFICATION_IDEMPOTENCY_TIMEOUT):
+        logger.info("Notifications of the post %s are already enqueued", poll_id)
         return
-    accessible_users = []
-    if poll.shared_with == SHARED_WITH.SELF_DEPARTMENT:
-        departments = creator.departments.all()
-        for dept in departments:
-            accessible_users.extend(list(dept.users.all()))
-
-    elif poll.shared_with == SHARED_WITH.ALL_DEPARTMENTS:
-        accessible_users.extend(list(creator.organization.users.all()))
-
-    elif poll.shared_with == SHARED_WITH.SELF_JOB_FAMILY:
-        try:
-            employee_id_store = EmployeeIDStore.objects.filter(
-                user__is_active=True, job_family=creator.employee_id_store.job_family, signed_up=True)
-            for emp_id_store in employee_id_store:
-                if emp_id_store.user in accessible_users:
-                    continue
-                accessible_users.append(emp_id_store.user)
-        except Exception:
-            # User does not have any job family No need to send notification
-            pass
-
-    elif poll.shared_with == SHARED_WITH.ORGANIZATION_DEPARTMENTS:
-        departments = poll.departments.all()
-        organizations = poll.organizations.all()
-        employee_ids_store = EmployeeIDStore.objects.filter(job_family__in=poll.job_families.all())
-        for department in departments:
-            accessible_users.extend(list(department.users.all()))
-
-        for organization in organizations:
-            accessible_users.extend(list(organization.users.all()))
-
-        for employee_id_store in employee_ids_store:
-            user = employee_id_store.user
-            if user and employee_id_store.signed_up and user not in accessible_users:
-                accessible_users.append(user)
-
-    user_name = get_user_name(creator)
-    message = _("'%s' created a new post." % user_name) if is_post else _("'%s' started a new poll." % user_name)
-    object_type = NOTIFICATION_OBJECT_TYPE
-
-    for usr in accessible_users:
-        push_notification(creator, message, usr, object_type=object_type, object_id=poll_id,
-                          extra_context={"redirect_screen": "Poll"})
+
+    try:
+        chunks, chunk = [], []
+        for recipient_id in get_post_audience_ids(poll):
+            chunk.append(recipient_id)
+            if len(chunk) >= NOTIFICATION_CHUNK_SIZE:
+                chunks.append(chunk)
+                chunk = []
+        if chunk:
+            chunks.append(chunk)
+
+        FEEDS_CACHE.set(get_notification_key(poll_id, "chunks"), len(chunks), NOTIFICATION_IDEMPOTENCY_TIMEOUT)
+        if chunks:
+            group(
+                notify_users_chunk.s(poll_id, index, recipient_ids, is_post)
+                for index, recipient_ids in enumerate(chunks)
+            ).apply_async()
+    except Exception as exc:
+        FEEDS_CACHE.delete(key)
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def notify_users_chunk(self, poll_id, chunk_index, recipient_ids, is_post=False):
+    """
+    Notifies a chunk of the audience of the post / poll, the (post, chunk) key is taken before writing
+    and released if it fails so the retry (and only the retry) notifies the chunk again
+    """
+    from feeds.utils import bulk_push_notification, get_user_name
+
+    key = get_notification_key(poll_id, "chunk", chunk_index)
+    if not FEEDS_CACHE.add(key, 1, NOTIFICATION_IDEMPOTENCY_TIMEOUT):
+        logger.info("Chunk %s of the post %s is already notified", chunk_index, poll_id)
+        return
+    try:
+        poll = Post.objects.select_related("created_by").get(id=poll_id)
+        creator = poll.created_by
+        user_name = get_user_name(creator)
+        message = _("'%s' created a new post." % user_name) if is_post else _("'%s' started a new poll." % user_name)
+        with transaction.atomic():
+            notified = bulk_push_notification(
+                creator, message, recipient_ids, object_type=NOTIFICATION_OBJECT_TYPE, object_id=poll_id,
+                extra_context={"redirect_screen": "Poll"}, raise_exception=True)
+    except Post.DoesNotExist:
+        return
+    except Exception as exc:
+        FEEDS_CACHE.delete(key)
+        raise self.retry(exc=exc)
+
+    increment_notification_progress(poll_id, "done", 1)
+    increment_notification_progress(poll_id, "notified", notified)
@@ -0,0 +1,121 @@
+from __future__ import division, print_function, unicode_literals
+
+import json
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Post
+from feeds.viewer import FEEDS_CACHE
+
+
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+ORGANIZATION_MODEL = import_string(settings.ORGANIZATION_MODEL)
+DEPARTMENT_MODEL = import_string(settings.DEPARTMENT_MODEL)
+TRANSACTION_MODEL = import_string(settings.TRANSACTION_MODEL)
+
+
+class FeedsTestCase(TestCase):
+    """Creates the organizations, departments, users and posts the feeds are tested against"""
+
+    def setUp(self):
+        # viewer contexts / generations are cached by the ids of the users, which are reused across the tests
+        FEEDS_CACHE.clear()
+        self.organization = self.create_organization("Rewardz")
+        self.other_organization = self.create_organization("Other")
+        self.department = self.create_department(self.organization, "Engineering")
+        self.other_department = self.create_department(self.organization, "Sales")
+
+    def patch(self, target, name, value):
+        """Sets the attribute (e.g. a feature flag of a module) for the test only"""
+        self.addCleanup(setattr, target, name, getattr(target, name))
+        setattr(target, name, value)
+
+    @staticmethod
+    def create_organization(name):
+        return ORGANIZATION_MODEL.objects.create(name=name, slug=name.lower())
+
+    @staticmethod
+    def create_department(organization, name):
+        return DEPARTMENT_MODEL.objects.create(organization=organization, name=name, slug=name.lower())
+
+    @staticmethod
+    def create_user(email, organization, departments=(), **kwargs):
+        user = USERMODEL.objects.create(email=email, organization=organization, **kwargs)
+        for department in departments:
+            getattr(user, settings.USER_DEPARTMENT_RELATED_NAME).add(department)
+        return user
+
+    @staticmethod
+    def create_post(created_by, post_type=POST_TYPE.USER_CREATED_POST, shared_with=SHARED_WITH.SELF_DEPARTMENT,
+                    organizations=(), departments=(), **kwargs):
+        post = Post.objects.create(created_by=created_by, post_type=post_type, shared_with=shared_with, **kwargs)
+        post.organizations.add(*organizations)
+        post.departments.add(*departments)
+        return post
+
+    @staticmethod
+    def create_transaction(user, creator, points=10, **kwargs):
+        return TRANSACTION_MODEL.objects.create(
+            user=user, creator=creator, organization=creator.organization, points=points, **kwargs)
+
+    @staticmethod
+    def get_request(user, path="/", version=12, **params):
+        request = Request(APIRequestFactory().get(path, params))
+        request.user = user
+        request.version = version
+        return request
+
+    @staticmethod
+    def render(data):
+        """Returns the serialized data as rendered in the response (QuerySets, Decimals etc. as plain values)"""
+        return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+class VisibilityTestCase(FeedsTestCase):
+    """
+    Posts of every SHARED_WITH x POST_TYPE created by users of the same / other department and organization
+    (shared with nobody, the organization or a department of it) and the viewers the visibility is checked for
+    """
+
+    def setUp(self):
+        super(VisibilityTestCase, self).setUp()
+        self.outside_department = self.create_department(self.other_organization, "Marketing")
+        self.member = self.create_user("member@rewardz.sg", self.organization, [self.department])
+        self.colleague = self.create_user("colleague@rewardz.sg", self.organization, [self.other_department])
+        self.outsider = self.create_user("outsider@other.sg", self.other_organization, [self.outside_department])
+        self.admin = self.create_user("admin@rewardz.sg", self.organization, [self.other_department], is_staff=True)
+        self.hidden = self.create_user(
+            "hidden@rewardz.sg", self.organization, [self.department], hide_appreciation=True)
+        self.viewers = [self.member, self.colleague, self.outsider, self.admin, self.hidden]
+
+        sharing = [
+            {},
+            {"organizations": [self.organization]},
+            {"departments": [self.department]},
+            {"organizations": [self.other_organization]},
+        ]
+        index = 0
+        for created_by in (self.member, self.colleague, self.outsider, self.admin):
+            for shared_with, _ in SHARED_WITH():
+                for post_type, _ in POST_TYPE():
+                    receiver = [None, self.member, self.hidden, self.colleague][index // len(sharing) % 4]
+                    post = self.create_post(
+                        created_by, post_type=post_type, shared_with=shared_with, user=receiver,
+                        title="greeting_post" if post_type == POST_TYPE.GREETING_MESSAGE else "Post {}".format(index),
+                        **sharing[index % len(sharing)])
+                    if index % 5 == 0:
+                        post.cc_users.add(self.colleague)
+                    if index % 7 == 0:
+                        post.mark_as_delete(created_by)
+                    index += 1
+        self.posts = list(Post.objects.order_by("id"))
+
+    @staticmethod
+    def get_ids(queryset):
+        return set(queryset.values_list("id", flat=True))
@@ -0,0 +1,95 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from feeds.audience import get_post_audience_ids
+from feeds.constants import POST_TYPE, SHARED_WITH
+
+from .base import FeedsTestCase
+
+
+EMPLOYEE_ID_STORE_MODEL = import_string(settings.EMPLOYEE_ID_STORE)
+USER_JOB_FAMILY_MODEL = import_string(settings.USER_JOB_FAMILY)
+
+
+class PostAudienceTest(FeedsTestCase):
+    """Users notified about a post / poll for every shared_with, each user once"""
+
+    def setUp(self):
+        super(PostAudienceTest, self).setUp()
+        self.outside_department = self.create_department(self.other_organization, "Marketing")
+        self.job_family = USER_JOB_FAMILY_MODEL.objects.create(organization=self.organization, name="Engineers")
+        self.other_job_family = USER_JOB_FAMILY_MODEL.objects.create(organization=self.organization, name="Sales")
+
+        self.creator = self.create_user(
+            "creator@rewardz.sg", self.organization, [self.department, self.other_department], is_staff=True)
+        self.member = self.create_user("member@rewardz.sg", self.organization, [self.department])
+        self.colleague = self.create_user("colleague@rewardz.sg", self.organization, [self.other_department])
+        self.outsider = self.create_user("outsider@other.sg", self.other_organization, [self.outside_department])
+        self.unassigned = self.create_user("unassigned@rewardz.sg", self.organization)
+        self.inactive = self.create_user("inactive@rewardz.sg", self.organization, is_active=False)
+        self.pending = self.create_user("pending@rewardz.sg", self.organization)
+
+        for user, job_family, signed_up in (
+                (self.creator, self.job_family, True), (self.member, self.job_family, True),
+                (self.outsider, self.job_family, True), (self.inactive, self.job_family, True),
+                (self.pending, self.job_family, False), (self.colleague, self.other_job_family, True)):
+            EMPLOYEE_ID_STORE_MODEL.objects.create(
+                user=user, organization=user.organization, job_family=job_family, signed_up=signed_up)
+
+    def get_audience_ids(self, shared_with, creator=None, job_families=(), **sharing):
+        post = self.create_post(
+            creator or self.creator, post_type=POST_TYPE.USER_CREATED_POLL, shared_with=shared_with, **sharing)
+        post.job_families.add(*job_families)
+        audience_ids = list(get_post_audience_ids(post))
+        self.assertEqual(audience_ids, sorted(set(audience_ids)))
+        return audience_ids
+
+    @staticmethod
+    def get_ids(*users):
+        return sorted(user.id for user in users)
+
+    def test_self_department(self):
+        # member of both departments of the creator is notified once
+        getattr(self.member, settings.USER_DEPARTMENT_RELATED_NAME).add(self.other_department)
+        self.assertEqual(
+            self.get_audience_ids(SHARED_WITH.SELF_DEPARTMENT), self.get_ids(self.creator, self.member, self.colleague))
+        self.assertEqual(
+            self.get_audience_ids(SHARED_WITH.SELF_DEPARTMENT, creator=self.unassigned), [])
+
+    def test_all_departments(self):
+        self.assertEqual(
+            self.get_audience_ids(SHARED_WITH.ALL_DEPARTMENTS),
+            self.get_ids(self.creator, self.member, self.colleague, self.unassigned, self.inactive, self.pending))
+
+    def test_self_job_family(self):
+        # signed up and active users of the job family of the creator
+        self.assertEqual(
+            self.get_audience_ids(SHARED_WITH.SELF_JOB_FAMILY), self.get_ids(self.creator, self.member, self.outsider))
+        self.assertEqual(self.get_audience_ids(SHARED_WITH.SELF_JOB_FAMILY, creator=self.unassigned), [])
+
+    def test_organization_departments(self):
+        # members of the departments / organizations / job families shared with, users matching several once
+        self.assertEqual(
+            self.get_audience_ids(
+                SHARED_WITH.ORGANIZATION_DEPARTMENTS, departments=[self.department, self.outside_department],
+                organizations=[self.other_organization], job_families=[self.job_family]),
+            self.get_ids(self.creator, self.member, self.outsider, self.inactive))
+        self.assertEqual(
+            self.get_audience_ids(
+                SHARED_WITH.ORGANIZATION_DEPARTMENTS, organizations=[self.organization],
+                job_families=[self.other_job_family]),
+            self.get_ids(self.creator, self.member, self.colleague, self.unassigned, self.inactive, self.pending))
+        self.assertEqual(self.get_audience_ids(SHARED_WITH.ORGANIZATION_DEPARTMENTS), [])
+
+    def test_admin_only(self):
+        self.assertEqual(self.get_audience_ids(SHARED_WITH.ADMIN_ONLY), [])
+
+    def test_single_query(self):
+        post = self.create_post(
+            self.creator, post_type=POST_TYPE.USER_CREATED_POLL, shared_with=SHARED_WITH.ORGANIZATION_DEPARTMENTS,
+            departments=[self.department], organizations=[self.other_organization])
+        post.job_families.add(self.job_family)
+        with self.assertNumQueries(1):
+            list(get_post_audience_ids(post))
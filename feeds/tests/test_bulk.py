@@ -0,0 +1,122 @@
+from __future__ import division, print_function, unicode_literals
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from feeds.bulk import PostBulkContext
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import PollsAnswer, Post
+from feeds.serializers import OrganizationRecognitionSerializer, PostFeedSerializer, get_user_strength
+from feeds.utils import get_related_objects_qs
+
+from .base import FeedsTestCase, TRANSACTION_MODEL
+
+
+UserStrength = import_string(settings.USER_STRENGTH_MODEL)
+
+
+class PostBulkContextParityTest(FeedsTestCase):
+    """Serializers return the same data with and without the bulk context"""
+
+    def setUp(self):
+        super(PostBulkContextParityTest, self).setUp()
+        self.sender = self.create_user("sender@rewardz.sg", self.organization, [self.department])
+        self.receiver = self.create_user("receiver@rewardz.sg", self.organization, [self.other_department])
+        self.viewer = self.create_user("viewer@rewardz.sg", self.organization, [self.department])
+        self.strengths = [
+            UserStrength.objects.create(name="Strength {}".format(index), organization=self.organization)
+            for index in range(2)
+        ]
+        for index in range(3):
+            post = self.create_post(
+                self.sender, post_type=POST_TYPE.USER_CREATED_APPRECIATION, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+                organizations=[self.organization], user=self.receiver, title="Appreciation {}".format(index))
+            transactions = [
+                self.create_transaction(self.receiver, self.sender, context={"strength_id": strength.pk})
+                for strength in self.strengths
+            ]
+            if index == 1:
+                # latest transaction is created first, the ids do not follow the ordering of the transactions
+                TRANSACTION_MODEL.objects.filter(pk=transactions[0].pk).update(
+                    created=timezone.now() + timedelta(days=1))
+            post.transactions.add(*transactions)
+        self.posts = list(Post.objects.filter(post_type=POST_TYPE.USER_CREATED_APPRECIATION).order_by("id"))
+
+    def test_first_transactions(self):
+        bulk = PostBulkContext(self.posts, self.viewer)
+        for post in self.posts:
+            self.assertEqual(bulk.transactions.get(post.id), post.transactions.first())
+
+    def test_user_strength(self):
+        bulk = PostBulkContext(self.posts, self.viewer)
+        for post in self.posts:
+            self.assertEqual(get_user_strength(post, bulk), get_user_strength(post))
+
+    def test_serializers(self):
+        for user in (self.viewer, self.sender, self.receiver):
+            request = self.get_request(user)
+            for serializer_class in (PostFeedSerializer, OrganizationRecognitionSerializer):
+                bulk_data = serializer_class(
+                    self.posts, many=True, context={"request": request, "bulk": PostBulkContext(self.posts, user)}).data
+                data = serializer_class(self.posts, many=True, context={"request": request}).data
+                self.assertEqual(self.render(bulk_data), self.render(data))
+
+
+class PostBulkContextQueriesTest(FeedsTestCase):
+    """Pages of appreciations, posts and polls (active, voted, closed) are serialized with a fixed number of queries"""
+
+    def setUp(self):
+        super(PostBulkContextQueriesTest, self).setUp()
+        self.sender = self.create_user("sender@rewardz.sg", self.organization, [self.department])
+        self.receiver = self.create_user("receiver@rewardz.sg", self.organization, [self.other_department])
+        self.viewer = self.create_user("viewer@rewardz.sg", self.organization, [self.department])
+        strength = UserStrength.objects.create(name="Strength", organization=self.organization)
+        for index in range(60):
+            post_type = (POST_TYPE.USER_CREATED_APPRECIATION, POST_TYPE.USER_CREATED_POST,
+                         POST_TYPE.USER_CREATED_POLL)[index % 3]
+            post = self.create_post(
+                self.sender, post_type=post_type, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+                organizations=[self.organization], user=self.receiver, title="Post {}".format(index))
+            if post_type == POST_TYPE.USER_CREATED_APPRECIATION:
+                post.transactions.add(
+                    self.create_transaction(self.receiver, self.sender, context={"strength_id": strength.pk}))
+            elif post_type == POST_TYPE.USER_CREATED_POST:
+                post.tag_users([self.receiver.id, self.viewer.id])
+            else:
+                answers = [
+                    PollsAnswer.objects.create(question=post, answer_text="Answer {}".format(answer))
+                    for answer in range(3)
+                ]
+                post.vote(self.receiver, answers[0].id)
+                if index % 2:
+                    post.vote(self.viewer, answers[index % 3].id)
+                if index % 4 == 1:
+                    Post.objects.filter(pk=post.pk).update(created_on=timezone.now() - timedelta(days=30))
+        self.post_ids = list(Post.objects.order_by("id").values_list("id", flat=True))
+
+    def get_page(self, post_ids):
+        return list(get_related_objects_qs(Post.objects.filter(id__in=post_ids).order_by("id")))
+
+    def serialize(self, page, user, bulk=True):
+        context = {"request": self.get_request(user)}
+        if bulk:
+            context["bulk"] = PostBulkContext(page, user)
+        return self.render(PostFeedSerializer(page, many=True, context=context).data)
+
+    def test_polls(self):
+        page = self.get_page(self.post_ids)
+        for user in (self.viewer, self.sender, self.receiver):
+            self.assertEqual(self.serialize(page, user), self.serialize(page, user, bulk=False))
+
+    def test_page_size(self):
+        # pages of other posts, the cached lookups of a page are not reused by the other
+        with CaptureQueriesContext(connection) as small_page:
+            self.serialize(self.get_page(self.post_ids[:10]), self.viewer)
+        with CaptureQueriesContext(connection) as page:
+            self.serialize(self.get_page(self.post_ids[10:]), self.viewer)
+        self.assertEqual(len(page), len(small_page), "\n".join(query["sql"] for query in page))
@@ -0,0 +1,98 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from feeds.constants import POST_TYPE
+from feeds.models import Post
+from feeds.utils import accessible_posts_by_user, can_view_post
+from feeds.viewer import ViewerContext, get_viewer_context
+
+from .base import USERMODEL, VisibilityTestCase
+
+
+USER_JOB_FAMILY_MODEL = import_string(settings.USER_JOB_FAMILY)
+EMPLOYEE_ID_STORE_MODEL = import_string(settings.EMPLOYEE_ID_STORE)
+
+
+class CanViewPostParityTest(VisibilityTestCase):
+    """can_view_post gives the same access as looking the post up in accessible_posts_by_user"""
+
+    @staticmethod
+    def get_organizations(user, allow_feedback):
+        # organizations passed by the detail apis
+        if allow_feedback and user.is_staff:
+            return list(user.child_organizations.values_list("id", flat=True))
+        return user.organization
+
+    @staticmethod
+    def is_accessible(user, post, organization, allow_feedback, appreciations):
+        return accessible_posts_by_user(
+            user, organization, allow_feedback, appreciations, post.id).distinct().filter(id=post.id).exists()
+
+    def assertAccessEqual(self, user, post, organization, allow_feedback, appreciations, expected_appreciations):
+        post = Post.objects.select_related("created_by").get(id=post.id)
+        self.assertEqual(
+            can_view_post(user, post, organization, allow_feedback, appreciations),
+            self.is_accessible(user, post, organization, allow_feedback, expected_appreciations),
+            "post {} ({}, {}) {} allow_feedback={} appreciations={}".format(
+                post.id, post.post_type, post.shared_with, user.email, allow_feedback, appreciations))
+
+    def test_can_view_post(self):
+        for user in self.viewers:
+            for allow_feedback in (False, True):
+                organization = self.get_organizations(user, allow_feedback)
+                for post in self.posts:
+                    for appreciations in (False, True):
+                        self.assertAccessEqual(user, post, organization, allow_feedback, appreciations, appreciations)
+
+    def test_appreciation_posts(self):
+        """appreciations=True is passed for every post, it was passed only for the appreciation posts earlier"""
+        for user in self.viewers:
+            for allow_feedback in (False, True):
+                organization = self.get_organizations(user, allow_feedback)
+                for post in self.posts:
+                    self.assertAccessEqual(user, post, organization, allow_feedback, True,
+                                           post.post_type == POST_TYPE.USER_CREATED_APPRECIATION)
+
+    def test_staff_organizations(self):
+        organizations = list(self.admin.child_organizations)
+        for post in self.posts:
+            for allow_feedback in (False, True):
+                self.assertAccessEqual(self.admin, post, organizations, allow_feedback, False, False)
+
+
+class CanViewPostInvalidationTest(VisibilityTestCase):
+    """can_view_post reads the cached viewer context, it follows the changes of the relations it is built from"""
+
+    def assertAccessCurrent(self, user):
+        # the viewer context is kept on the user object, it is read again from the cache for a new object
+        user = USERMODEL.objects.get(id=user.id)
+        viewer = get_viewer_context(user)
+        current = ViewerContext(USERMODEL.objects.get(id=user.id))
+        self.assertEqual(sorted(viewer.department_ids), sorted(current.department_ids))
+        self.assertEqual(viewer.job_family_id, current.job_family_id)
+        for post in Post.objects.select_related("created_by").order_by("id"):
+            self.assertEqual(
+                can_view_post(user, post, user.organization, False, True),
+                can_view_post(user, post, user.organization, False, True, viewer=current),
+                "post {} ({}, {})".format(post.id, post.post_type, post.shared_with))
+
+    def test_department_changed(self):
+        self.assertAccessCurrent(self.member)
+        getattr(self.member, settings.USER_DEPARTMENT_RELATED_NAME).remove(self.department)
+        getattr(self.member, settings.USER_DEPARTMENT_RELATED_NAME).add(self.other_department)
+        self.assertAccessCurrent(self.member)
+
+    def test_department_deleted(self):
+        self.assertAccessCurrent(self.member)
+        self.department.delete()
+        self.assertAccessCurrent(self.member)
+
+    def test_job_family_deleted(self):
+        job_family = USER_JOB_FAMILY_MODEL.objects.create(organization=self.organization, name="Engineers")
+        EMPLOYEE_ID_STORE_MODEL.objects.create(
+            user=self.member, organization=self.organization, job_family=job_family)
+        self.assertAccessCurrent(self.member)
+        job_family.delete()
+        self.assertAccessCurrent(self.member)
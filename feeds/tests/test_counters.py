@@ -0,0 +1,122 @@
+from __future__ import division, print_function, unicode_literals
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds import reactions, signals, views
+from feeds.benchmark.runner import fixed_versioning
+from feeds.constants import POST_TYPE, REACTION_TYPE
+from feeds.counters import reconcile_comment_counters, reconcile_post_counters
+from feeds.models import Comment, CommentLiked, PollsAnswer, Post, PostLiked
+from feeds.reactions import set_post_reaction, toggle_post_reaction
+from feeds.views import CommentViewset
+
+from .base import FeedsTestCase
+
+
+class CounterError(Exception):
+    pass
+
+
+def fail(*args, **kwargs):
+    raise CounterError
+
+
+class PostCommentCountTest(FeedsTestCase):
+
+    def setUp(self):
+        super(PostCommentCountTest, self).setUp()
+        self.user = self.create_user("user@rewardz.sg", self.organization, [self.department])
+        self.post = self.create_post(self.user, organizations=[self.organization])
+
+    def get_comment_count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_comment_count(self):
+        comments = [
+            Comment.objects.create(post=self.post, created_by=self.user, content="Comment {}".format(index))
+            for index in range(3)
+        ]
+        self.assertEqual(self.get_comment_count(), 3)
+
+        comments[0].mark_as_delete(self.user)
+        comments[0].mark_as_delete(self.user)
+        self.assertEqual(self.get_comment_count(), 2)
+
+        comments[0].delete()
+        comments[1].delete()
+        self.assertEqual(self.get_comment_count(), 1)
+        self.assertEqual(self.get_comment_count(), Comment.objects.filter(post=self.post, mark_delete=False).count())
+
+    def test_stale_mark_as_delete(self):
+        # comment marked as deleted by another request, the instance of this one is not refreshed
+        comment = Comment.objects.create(post=self.post, created_by=self.user, content="Comment")
+        Comment.objects.get(pk=comment.pk).mark_as_delete(self.user)
+        comment.mark_as_delete(self.user)
+        self.assertEqual(self.get_comment_count(), 0)
+
+    def test_comment_rollback(self):
+        # the comment is not saved when its counter can not be updated
+        self.patch(signals, "update_post_comment_count", fail)
+        with self.assertRaises(CounterError):
+            Comment.objects.create(post=self.post, created_by=self.user, content="Comment")
+        self.assertFalse(Comment.objects.filter(post=self.post).exists())
+
+
+class CounterTransactionTest(FeedsTestCase):
+    """The likes, comments and votes are written in the same transaction as the counters they update"""
+
+    def setUp(self):
+        super(CounterTransactionTest, self).setUp()
+        self.user = self.create_user("user@rewardz.sg", self.organization, [self.department])
+        self.post = self.create_post(self.user, organizations=[self.organization], departments=[self.department])
+        self.comment = Comment.objects.create(post=self.post, created_by=self.user, content="Comment")
+        self.like_view = CommentViewset.as_view({"post": "like"}, versioning_class=fixed_versioning(12))
+
+    def like_comment(self, reaction_type=REACTION_TYPE.LIKE):
+        request = APIRequestFactory().post(
+            "/api/comments/{}/like/".format(self.comment.pk), {"type": reaction_type}, format="json")
+        force_authenticate(request, user=self.user)
+        return self.like_view(request, pk=self.comment.pk)
+
+    def test_post_reactions(self):
+        for change_reaction, reaction_types in (
+                (toggle_post_reaction, [REACTION_TYPE.LIKE, REACTION_TYPE.LOVE, REACTION_TYPE.LOVE]),
+                (set_post_reaction, [REACTION_TYPE.LIKE, REACTION_TYPE.LOVE, None])):
+            like_counts = []
+            for reaction_type in reaction_types:
+                change_reaction(self.post.pk, self.user, reaction_type)
+                like_counts.append(Post.objects.get(pk=self.post.pk).like_count)
+                self.assertEqual(reconcile_post_counters([self.post.pk], fix=False), 0)
+            self.assertEqual(like_counts, [1, 1, 0])
+
+    def test_post_reaction_rollback(self):
+        self.patch(reactions, "update_post_reaction_counters", fail)
+        for change_reaction in (toggle_post_reaction, set_post_reaction):
+            with self.assertRaises(CounterError):
+                change_reaction(self.post.pk, self.user, REACTION_TYPE.LIKE)
+            self.assertFalse(PostLiked.objects.filter(post=self.post).exists())
+
+    def test_comment_likes(self):
+        self.assertEqual(self.like_comment().status_code, 200)
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).like_count, 1)
+        self.assertEqual(self.like_comment().status_code, 200)
+        self.assertEqual(Comment.objects.get(pk=self.comment.pk).like_count, 0)
+        self.assertEqual(reconcile_comment_counters([self.comment.pk], fix=False), 0)
+
+    def test_comment_like_rollback(self):
+        self.patch(views, "update_comment_like_count", fail)
+        with self.assertRaises(CounterError):
+            self.like_comment()
+        self.assertFalse(CommentLiked.objects.filter(comment=self.comment).exists())
+
+        CommentLiked.objects.create(comment=self.comment, created_by=self.user, reaction_type=REACTION_TYPE.LIKE)
+        with self.assertRaises(CounterError):
+            self.like_comment()
+        self.assertTrue(CommentLiked.objects.filter(comment=self.comment).exists())
+
+    def test_vote(self):
+        poll = self.create_post(self.user, post_type=POST_TYPE.USER_CREATED_POLL, organizations=[self.organization])
+        answer = PollsAnswer.objects.create(question=poll, answer_text="Answer")
+        poll.vote(self.user, answer.pk)
+        self.assertEqual(Post.objects.get(pk=poll.pk).vote_count, 1)
+        self.assertEqual(reconcile_post_counters([poll.pk], fix=False), 0)
@@ -0,0 +1,58 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.http import QueryDict
+
+from feeds.benchmark.generator import get_tenant_generator
+from feeds.benchmark.queries import FetchFeedsBenchmark
+from feeds.models import Post
+from feeds.utils import fetch_feeds, org_reco_api_query, post_api_query
+
+from .base import VisibilityTestCase
+
+
+class FetchFeedsParityTest(VisibilityTestCase):
+    """fetch_feeds (ids resolved in sub queries) returns the same posts as resolving the ids in python"""
+
+    @staticmethod
+    def get_expected_ids(post_query, exclusion_query, user):
+        # previous implementation of fetch_feeds
+        ids = set(Post.objects.filter(post_query).exclude(exclusion_query).values_list("id", flat=True))
+        job_family = getattr(user, "job_family", None)
+        if job_family:
+            ids |= set(job_family.posts.values_list("id", flat=True))
+        return ids
+
+    def assertFeedsEqual(self, user, post_query, exclusion_query):
+        queryset = fetch_feeds(post_query, exclusion_query, ("-priority", "-created_on"), user)
+        ids = list(queryset.values_list("id", flat=True))
+        self.assertEqual(len(ids), len(set(ids)), user.email)
+        self.assertEqual(set(ids), self.get_expected_ids(post_query, exclusion_query, user), user.email)
+
+    def test_post_api(self):
+        for user in self.viewers:
+            for params in ("", "feedback=true", "created_by=user_org", "created_by=user_dept"):
+                _, post_query, exclusion_query = post_api_query(12, user, None, False, QueryDict(params))
+                self.assertFeedsEqual(user, post_query, exclusion_query)
+
+    def test_org_reco_api(self):
+        for user in self.viewers:
+            for post_polls in (None, True):
+                _, post_query, exclusion_query = org_reco_api_query(user, post_polls, 12, None, QueryDict(""))
+                self.assertFeedsEqual(user, post_query, exclusion_query)
+
+    def test_ordering(self):
+        for user in self.viewers:
+            _, post_query, exclusion_query = post_api_query(12, user, None, False, QueryDict(""))
+            ordering = ("-priority", "-modified_on", "-created_on", "-id")
+            self.assertEqual(
+                list(fetch_feeds(post_query, exclusion_query, ordering, user).values_list("id", flat=True)),
+                list(Post.objects.filter(id__in=self.get_expected_ids(post_query, exclusion_query, user)).order_by(
+                    *ordering).values_list("id", flat=True)),
+                user.email)
+
+    def test_benchmark(self):
+        scale = {"users": 10, "departments": 3, "job_families": 2, "posts": 40, "likes": 2, "comments": 1}
+        results = FetchFeedsBenchmark(get_tenant_generator(scale).generate(0), 5).run()
+        self.assertEqual(results["mismatches"], 0)
+        self.assertEqual(results["fetch_feeds"]["max_queries"], 2)
+        self.assertEqual(results["fetch_feeds_by_ids"]["max_queries"], 4)
@@ -0,0 +1,81 @@
+from __future__ import division, print_function, unicode_literals
+
+from importlib import import_module
+from unittest import skipUnless
+
+from django.apps import apps
+from django.db import connection
+from django.test import TransactionTestCase
+
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Post
+
+
+feed_indexes = import_module("feeds.migrations.0038_feed_indexes")
+
+
+@skipUnless(connection.vendor == "postgresql", "partial / concurrently created indexes require PostgreSQL")
+class FeedIndexesTest(TransactionTestCase):
+    """
+    Indexes of 0038_feed_indexes are created CONCURRENTLY (outside of the transaction of the schema editor) and
+    used by the feed queries, the tables of the tests are created from the models so the migration is run here
+    """
+
+    def setUp(self):
+        self.run_migration(feed_indexes.create_indexes)
+        self.addCleanup(self.run_migration, feed_indexes.drop_indexes)
+
+    @staticmethod
+    def run_migration(code):
+        with connection.schema_editor() as schema_editor:
+            code(apps, schema_editor)
+
+    @staticmethod
+    def get_indexes():
+        with connection.schema_editor() as schema_editor:
+            index_names = [index_name for index_name, _ in feed_indexes.get_index_statements(apps, schema_editor)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = ANY(%s)", [index_names])
+            return index_names, dict(cursor.fetchall())
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # the tables are small, sequential scans would always win
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                cursor.execute("EXPLAIN " + sql, params)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute("RESET enable_seqscan")
+
+    def test_created(self):
+        index_names, indexes = self.get_indexes()
+        self.assertEqual(sorted(indexes), sorted(index_names))
+        self.assertTrue(all(indexes.values()))
+
+        # run again / invalid index left by a failed CREATE INDEX CONCURRENTLY
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE pg_index SET indisvalid = false WHERE indexrelid = %s::regclass",
+                ["feeds_post_type_created_on_idx"])
+        self.run_migration(feed_indexes.create_indexes)
+        self.assertEqual(self.get_indexes()[1], indexes)
+
+    def test_query_plans(self):
+        posts = Post.objects.filter(mark_delete=False)
+        plans = (
+            ("feeds_post_type_created_on_idx",
+             posts.filter(post_type=POST_TYPE.USER_CREATED_POST).order_by("-created_on")[:10]),
+            ("feeds_post_feed_ordering_idx", posts.order_by("-priority", "-modified_on", "-created_on")[:10]),
+            ("feeds_post_shared_with_type_idx",
+             posts.filter(shared_with=SHARED_WITH.ALL_DEPARTMENTS, post_type=POST_TYPE.USER_CREATED_POST)),
+            ("feeds_post_orgs_reverse_idx",
+             Post.organizations.through.objects.filter(organization_id=1).values_list("post_id", flat=True)),
+            ("feeds_post_depts_reverse_idx",
+             Post.departments.through.objects.filter(department_id=1).values_list("post_id", flat=True)),
+        )
+        for index_name, queryset in plans:
+            self.assertIn(index_name, self.explain(queryset))
@@ -0,0 +1,42 @@
+from __future__ import division, print_function, unicode_literals
+
+import random
+
+from django.test import SimpleTestCase
+
+from feeds.benchmark.mentions import MentionBenchmark, search_mentions
+from feeds.utils import Mention, extract_mentions
+
+
+class ExtractMentionsTest(SimpleTestCase):
+    """The tokenizer of extract_mentions parses the same mentions as the patterns searched per tag"""
+
+    fragments = [
+        "<tag>", '<tag class="mention">', "<tags>", "</tag>", "<email_id>user@rewardz.sg</email_id>",
+        "<email_id>other@rewardz.sg</email_id>", "<email_id>invalid</email_id>", "<user_id>12</user_id>",
+        "<user_id>34</user_id>", "<user_id>x</user_id>", "<span>@user</span>", "\n", "text ", "<", ">",
+    ]
+
+    def test_mentions(self):
+        text = (
+            'Thanks <tag class="mention"><email_id>user@rewardz.sg</email_id><user_id>12</user_id></tag> and '
+            "<tag><user_id>34</user_id><email_id>other@rewardz.sg</email_id></tag>\n"
+            "<tag><email_id>first@rewardz.sg</email_id><email_id>second@rewardz.sg</email_id></tag>"
+            "<tag><span>no id</span></tag> <tag><user_id>56</user_id>\n</tag>"
+        )
+        self.assertEqual(extract_mentions(text, None, "<tag><user_id>78</user_id></tag>"), [
+            Mention("user@rewardz.sg", "12"), Mention("other@rewardz.sg", "34"), Mention("first@rewardz.sg", None),
+            Mention(None, "78"),
+        ])
+
+    def test_generated_texts(self):
+        generator = random.Random(0)
+        for _ in range(2000):
+            text = "".join(generator.choice(self.fragments) for _ in range(generator.randint(1, 30)))
+            self.assertEqual(extract_mentions(text), search_mentions(text), repr(text))
+
+    def test_long_description(self):
+        description = MentionBenchmark(100000, 500, 1).generate()
+        mentions = extract_mentions(description)
+        self.assertEqual(len(mentions), 500)
+        self.assertEqual(mentions, search_mentions(description))
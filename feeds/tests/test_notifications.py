@@ -0,0 +1,64 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_save
+from django.utils.module_loading import import_string
+
+from feeds import utils
+from feeds.utils import bulk_push_notification
+
+from .base import FeedsTestCase, USERMODEL
+
+
+PUSH_NOTIFICATION_MODEL = import_string(settings.PUSH_NOTIFICATION)
+
+
+class BulkPushNotificationTest(FeedsTestCase):
+    """Notifications are created in chunks and delivered by the hook, or saved one by one without it"""
+
+    def setUp(self):
+        super(BulkPushNotificationTest, self).setUp()
+        self.sender = self.create_user("sender@rewardz.sg", self.organization, [self.department])
+        self.delivered = []
+        self.patch(utils, "PUSH_NOTIFICATION_DELIVERY", lambda notifications: self.delivered.append(
+            [notification.recipient_id for notification in notifications]))
+
+    def create_recipients(self, count):
+        USERMODEL.objects.bulk_create([
+            USERMODEL(
+                email="user{}@rewardz.sg".format(index), employee_id="user{}".format(index),
+                organization=self.organization)
+            for index in range(count)
+        ])
+        return list(USERMODEL.objects.exclude(id=self.sender.id).order_by("id").values_list("id", flat=True))
+
+    def test_chunk_queries(self):
+        recipient_ids = self.create_recipients(10000)
+        notification = PUSH_NOTIFICATION_MODEL(sender=self.sender, message="Hello", recipient_id=recipient_ids[0])
+        # one INSERT per chunk, unless the database limits the rows of a statement (e.g. variables of SQLite)
+        rows_per_insert = connection.ops.bulk_batch_size(
+            PUSH_NOTIFICATION_MODEL._meta.concrete_fields, [notification] * 500)
+        queries_per_chunk = -(-500 // rows_per_insert)
+        with self.assertNumQueries(20 * queries_per_chunk):
+            created = bulk_push_notification(
+                self.sender, "Hello", recipient_ids + recipient_ids[:10], object_id=1, batch_size=500,
+                raise_exception=True)
+        self.assertEqual(created, 10000)
+        self.assertEqual([len(chunk) for chunk in self.delivered], [500] * 20)
+        self.assertEqual(sum(self.delivered, []), recipient_ids)
+        self.assertEqual(PUSH_NOTIFICATION_MODEL.objects.filter(sender=self.sender).count(), 10000)
+
+    def test_without_delivery_hook(self):
+        self.patch(utils, "PUSH_NOTIFICATION_DELIVERY", None)
+        recipient_ids = self.create_recipients(3)
+        saved = []
+
+        def notification_saved(sender, instance, created, **kwargs):
+            saved.append(instance.recipient_id)
+
+        post_save.connect(notification_saved, sender=PUSH_NOTIFICATION_MODEL)
+        self.addCleanup(post_save.disconnect, notification_saved, sender=PUSH_NOTIFICATION_MODEL)
+        self.assertEqual(bulk_push_notification(self.sender, "Hello", recipient_ids, batch_size=2), 3)
+        self.assertEqual(saved, recipient_ids)
+        self.assertEqual(self.delivered, [])
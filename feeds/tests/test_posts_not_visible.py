@@ -0,0 +1,45 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.http import QueryDict
+
+from feeds.benchmark.generator import get_tenant_generator
+from feeds.benchmark.queries import (
+    PostPollsNotVisibleBenchmark, PostsNotVisibleBenchmark, posts_not_visible_to_user_ids,
+)
+from feeds.models import Post
+from feeds.utils import org_reco_api_query, posts_not_visible_to_user
+
+from .base import VisibilityTestCase
+
+
+class PostsNotVisibleParityTest(VisibilityTestCase):
+    """posts_not_visible_to_user (single query) excludes the same posts as the per rule id lists"""
+
+    @staticmethod
+    def get_expected_ids(posts, user, post_polls):
+        return set(posts_not_visible_to_user_ids(posts, user, post_polls))
+
+    def test_all_posts(self):
+        for user in self.viewers:
+            for post_polls in (False, True):
+                self.assertEqual(
+                    self.get_ids(Post.objects.filter(id__in=posts_not_visible_to_user(user, post_polls))),
+                    self.get_expected_ids(Post.objects.all(), user, post_polls),
+                    "{} {}".format(user.email, post_polls))
+
+    def test_org_reco_feeds(self):
+        for user in self.viewers:
+            for post_polls in (None, True):
+                feeds, _, _ = org_reco_api_query(user, post_polls, 12, None, QueryDict(""))
+                self.assertEqual(
+                    self.get_ids(feeds.exclude(id__in=posts_not_visible_to_user(user, bool(post_polls)))),
+                    self.get_ids(feeds.exclude(id__in=self.get_expected_ids(feeds, user, bool(post_polls)))),
+                    "{} {}".format(user.email, post_polls))
+
+    def test_benchmark(self):
+        scale = {"users": 10, "departments": 3, "job_families": 2, "posts": 40, "likes": 2, "comments": 1}
+        tenant = get_tenant_generator(scale).generate(0)
+        for benchmark_class in (PostsNotVisibleBenchmark, PostPollsNotVisibleBenchmark):
+            results = benchmark_class(tenant, 5).run()
+            self.assertEqual(results["mismatches"], 0)
+            self.assertEqual(results["posts_not_visible_to_user"]["max_queries"], 2)
@@ -0,0 +1,191 @@
+from __future__ import division, print_function, unicode_literals
+
+import threading
+import time
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds import reactions
+from feeds.benchmark.runner import fixed_versioning
+from feeds.constants import POST_TYPE, REACTION_TYPE, SHARED_WITH
+from feeds.counters import reconcile_post_counters
+from feeds.models import Post, PostLiked
+from feeds.reactions import set_post_reaction, toggle_post_reaction
+from feeds.utils import can_view_post
+from feeds.viewer import FEEDS_CACHE
+from feeds.views import PostViewSet
+
+from .base import FeedsTestCase, VisibilityTestCase
+
+
+def get_reactions(post):
+    return list(PostLiked.objects.filter(post=post).values_list("created_by_id", "reaction_type"))
+
+
+class ReactionTestMixin(object):
+
+    def assertReactions(self, post, expected):
+        self.assertEqual(get_reactions(post), expected)
+        # like_count / reaction counts follow the rows
+        self.assertEqual(reconcile_post_counters([post.id], fix=False), 0)
+
+
+@skipUnless(connection.vendor == "postgresql", "INSERT .. ON CONFLICT requires PostgreSQL")
+class ReactionUpsertTest(ReactionTestMixin, FeedsTestCase):
+    """Reactions toggled / set by the single statement upserts"""
+
+    def setUp(self):
+        super(ReactionUpsertTest, self).setUp()
+        self.patch(reactions, "REACTION_UPSERT_ENABLED", True)
+        self.user = self.create_user("member@rewardz.sg", self.organization, [self.department])
+        self.post = self.create_post(self.user, organizations=[self.organization])
+
+    def test_toggle(self):
+        change = toggle_post_reaction(self.post.id, self.user, REACTION_TYPE.LIKE)
+        self.assertTrue(change.created)
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LIKE)])
+
+        change = toggle_post_reaction(self.post.id, self.user, REACTION_TYPE.LOVE)
+        self.assertEqual((change.changed, change.created, change.previous_type), (True, False, REACTION_TYPE.LIKE))
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LOVE)])
+
+        change = toggle_post_reaction(self.post.id, self.user, REACTION_TYPE.LOVE)
+        self.assertEqual((change.changed, change.liked), (True, False))
+        self.assertReactions(self.post, [])
+
+    def test_set(self):
+        change = set_post_reaction(self.post.id, self.user, REACTION_TYPE.LIKE)
+        self.assertTrue(change.created)
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LIKE)])
+
+        change = set_post_reaction(self.post.id, self.user, REACTION_TYPE.LIKE)
+        self.assertEqual((change.changed, change.liked), (False, True))
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LIKE)])
+
+        change = set_post_reaction(self.post.id, self.user, REACTION_TYPE.CELEBRATE)
+        self.assertEqual((change.changed, change.previous_type), (True, REACTION_TYPE.LIKE))
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.CELEBRATE)])
+
+    def test_remove(self):
+        set_post_reaction(self.post.id, self.user, REACTION_TYPE.LIKE)
+        change = set_post_reaction(self.post.id, self.user, None)
+        self.assertEqual((change.changed, change.previous_type, change.liked), (True, REACTION_TYPE.LIKE, False))
+        self.assertReactions(self.post, [])
+
+        change = set_post_reaction(self.post.id, self.user, None)
+        self.assertFalse(change.changed)
+        self.assertReactions(self.post, [])
+
+
+@skipUnless(connection.vendor == "postgresql", "INSERT .. ON CONFLICT requires PostgreSQL")
+class ReactionUpsertConflictTest(ReactionTestMixin, TransactionTestCase):
+    """
+    The reaction is inserted by another transaction while the upsert waits on the unique constraint, the rows of
+    the tests are committed so the transactions run on their own connections
+    """
+
+    def setUp(self):
+        FEEDS_CACHE.clear()
+        self.addCleanup(setattr, reactions, "REACTION_UPSERT_ENABLED", reactions.REACTION_UPSERT_ENABLED)
+        reactions.REACTION_UPSERT_ENABLED = True
+        organization = FeedsTestCase.create_organization("Rewardz")
+        self.user = FeedsTestCase.create_user("member@rewardz.sg", organization)
+        self.post = FeedsTestCase.create_post(self.user, organizations=[organization])
+
+    def react_concurrently(self, reaction, reaction_type):
+        """Runs reaction while the reaction of reaction_type set by another request is not committed"""
+        inserted = threading.Event()
+
+        def insert():
+            try:
+                with transaction.atomic():
+                    set_post_reaction(self.post.id, self.user, reaction_type)
+                    inserted.set()
+                    # the upsert of the test blocks on the uncommitted row meanwhile
+                    time.sleep(0.5)
+            finally:
+                inserted.set()
+                connection.close()
+
+        thread = threading.Thread(target=insert)
+        thread.start()
+        inserted.wait()
+        try:
+            return reaction(self.post.id, self.user, REACTION_TYPE.LOVE)
+        finally:
+            thread.join()
+
+    def test_toggle_conflict(self):
+        change = self.react_concurrently(toggle_post_reaction, REACTION_TYPE.LIKE)
+        self.assertFalse(change.changed)
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LIKE)])
+
+    def test_set_conflict(self):
+        # created by the other request, the type is changed by the upsert
+        change = self.react_concurrently(set_post_reaction, REACTION_TYPE.LIKE)
+        self.assertEqual((change.created, change.liked, change.reaction_type), (False, True, REACTION_TYPE.LOVE))
+        self.assertReactions(self.post, [(self.user.id, REACTION_TYPE.LOVE)])
+
+
+class AppreciateBatchTest(ReactionTestMixin, VisibilityTestCase):
+    """posts/appreciate_batch/ sets the reactions of the posts the user can appreciate, replays are no-ops"""
+
+    def setUp(self):
+        super(AppreciateBatchTest, self).setUp()
+        self.view = PostViewSet.as_view({"post": "appreciate_batch"}, versioning_class=fixed_versioning(12))
+
+    def appreciate_batch(self, user, reactions):
+        request = APIRequestFactory().post("/api/posts/appreciate_batch/", {"reactions": reactions}, format="json")
+        force_authenticate(request, user=user)
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["results"]
+
+    def test_access(self):
+        # same rule as posts/<id>/appreciate/
+        post_ids = [post.id for post in self.posts]
+        for user in self.viewers:
+            results = []
+            for start in range(0, len(post_ids), reactions.REACTION_BATCH_SIZE):
+                results += self.appreciate_batch(user, [
+                    {"post": post_id, "type": REACTION_TYPE.LIKE}
+                    for post_id in post_ids[start:start + reactions.REACTION_BATCH_SIZE]
+                ])
+            expected = [
+                can_view_post(user, post, user.organization, False, True)
+                for post in Post.objects.filter(id__in=post_ids).select_related("created_by").order_by("id")
+            ]
+            self.assertEqual(["error" not in result for result in results], expected, user.email)
+
+    def test_admin_child_organization(self):
+        # self department posts of the administered organizations are appreciated by id
+        self.other_organization.parent = self.organization
+        self.other_organization.save()
+        post = self.create_post(self.outsider)
+        self.assertTrue(can_view_post(self.admin, post, self.admin.organization, False, True))
+        results = self.appreciate_batch(self.admin, [{"post": post.id, "type": REACTION_TYPE.LIKE}])
+        self.assertEqual((results[0]["post"], results[0]["liked"]), (post.id, True))
+
+    def test_replay(self):
+        post = self.create_post(
+            self.colleague, post_type=POST_TYPE.USER_CREATED_POST, shared_with=SHARED_WITH.ALL_DEPARTMENTS)
+        other_post = self.create_post(self.colleague, organizations=[self.organization])
+        set_post_reaction(other_post.id, self.member, REACTION_TYPE.LIKE)
+        batch = [
+            {"post": post.id, "type": REACTION_TYPE.LIKE},
+            {"post": other_post.id, "type": None},
+            {"post": post.id, "type": REACTION_TYPE.SUPPORT},
+        ]
+        results = self.appreciate_batch(self.member, batch)
+        self.assertEqual(
+            [(result["post"], result["liked"], result["reaction_type"], result["count"]) for result in results],
+            [(post.id, True, REACTION_TYPE.SUPPORT, 1), (other_post.id, False, None, 0)])
+        self.assertReactions(post, [(self.member.id, REACTION_TYPE.SUPPORT)])
+        self.assertReactions(other_post, [])
+
+        self.assertEqual(self.appreciate_batch(self.member, batch), results)
+        self.assertReactions(post, [(self.member.id, REACTION_TYPE.SUPPORT)])
+        self.assertReactions(other_post, [])
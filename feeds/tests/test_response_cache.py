@@ -0,0 +1,95 @@
+from __future__ import division, print_function, unicode_literals
+
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds import signals, views
+from feeds.benchmark.runner import fixed_versioning
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Post
+from feeds.response_cache import get_org_reco_cache_stats
+from feeds.views import UserFeedViewSet
+
+from .base import FeedsTestCase, ORGANIZATION_MODEL
+
+
+class OrgRecoCacheParityTest(FeedsTestCase):
+    """Cached organization_recognitions pages are the same as the ones built for the requested user"""
+
+    def setUp(self):
+        super(OrgRecoCacheParityTest, self).setUp()
+        self.patch(signals, "ORG_RECO_CACHE_ENABLED", True)
+        # points of the recognitions are shown only to the sender and the receiver of the transactions
+        self.hide_points = "true"
+        self.patch(ORGANIZATION_MODEL, "appreciation_screen_setting", property(
+            lambda organization: {"hide_points": self.hide_points}, lambda organization, value: None))
+        self.view = UserFeedViewSet.as_view(
+            {"get": "organization_recognitions"}, versioning_class=fixed_versioning(12))
+
+        self.viewer = self.create_user("viewer@rewardz.sg", self.organization, [self.department])
+        self.peer = self.create_user("peer@rewardz.sg", self.organization, [self.department])
+        self.sender = self.create_user("sender@rewardz.sg", self.organization, [self.department])
+        self.receiver = self.create_user("receiver@rewardz.sg", self.organization, [self.other_department])
+        self.admin = self.create_user("admin@rewardz.sg", self.organization, [self.other_department], is_staff=True)
+        self.admin_peer = self.create_user(
+            "admin.peer@rewardz.sg", self.organization, [self.other_department], is_staff=True)
+        creator = self.create_user("creator@rewardz.sg", self.organization, [self.other_department])
+        for index in range(3):
+            post = self.create_post(
+                creator, post_type=POST_TYPE.USER_CREATED_APPRECIATION, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+                organizations=[self.organization], user=self.receiver, title="Appreciation {}".format(index))
+            # sender is part of the recognition through the transaction only
+            post.transactions.add(self.create_transaction(self.receiver, self.sender, points=10 + index))
+
+    def get_response(self, user, cache_enabled):
+        self.patch(views, "ORG_RECO_CACHE_ENABLED", cache_enabled)
+        request = APIRequestFactory().get("/api/user_feed/organization_recognitions/")
+        force_authenticate(request, user=user)
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        return self.render(response.data)
+
+    def assertCachedEqual(self, user, peer):
+        expected = self.get_response(user, False)
+        # page is cached by the user of the same visibility class first
+        self.get_response(peer, True)
+        self.assertEqual(self.get_response(user, True), expected, user.email)
+
+    def test_viewer(self):
+        self.assertCachedEqual(self.viewer, self.peer)
+        self.assertEqual(get_org_reco_cache_stats()["hit"], 1)
+
+    def test_sender(self):
+        self.assertCachedEqual(self.sender, self.peer)
+        self.assertEqual(get_org_reco_cache_stats()["bypass"], 1)
+
+    def test_admin(self):
+        self.assertCachedEqual(self.admin, self.admin_peer)
+
+    def test_involved_later(self):
+        self.assertCachedEqual(self.viewer, self.peer)
+        post = self.create_post(
+            self.peer, post_type=POST_TYPE.USER_CREATED_APPRECIATION, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+            organizations=[self.organization], user=self.receiver, title="Appreciation")
+        post.cc_users.add(self.viewer)
+        self.assertCachedEqual(self.viewer, self.peer)
+
+    def test_involved_before_period(self):
+        # recognitions older than the period are loaded by the fallback when the period has fewer posts than a page
+        old_sender = self.create_user("old.sender@rewardz.sg", self.organization, [self.department])
+        post = self.create_post(
+            self.receiver, post_type=POST_TYPE.USER_CREATED_APPRECIATION, shared_with=SHARED_WITH.SELF_DEPARTMENT,
+            organizations=[self.organization], user=self.receiver, title="Old appreciation")
+        post.transactions.add(self.create_transaction(self.receiver, old_sender, points=20))
+        Post.objects.filter(id=post.id).update(created_on=timezone.now() - timedelta(days=90))
+        self.assertCachedEqual(old_sender, self.peer)
+        self.assertEqual(get_org_reco_cache_stats()["bypass"], 1)
+
+    def test_hide_points_changed(self):
+        self.get_response(self.peer, True)
+        self.hide_points = "false"
+        expected = self.get_response(self.viewer, False)
+        self.assertEqual(self.get_response(self.viewer, True), expected)
+        self.assertEqual(get_org_reco_cache_stats()["hit"], 1)
@@ -0,0 +1,73 @@
+from __future__ import division, print_function, unicode_literals
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds.benchmark.generator import get_tenant_generator
+from feeds.benchmark.runner import fixed_versioning
+from feeds.benchmark.strengths import StrengthBenchmark
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Post, UserStrength
+from feeds.strengths import posts_with_strength, sync_post_strengths
+from feeds.views import UserFeedViewSet
+
+from .base import FeedsTestCase
+
+
+class PostStrengthTest(FeedsTestCase):
+    """Appreciations are filtered by the strength of any of their transactions"""
+
+    def setUp(self):
+        super(PostStrengthTest, self).setUp()
+        self.receiver = self.create_user("receiver@rewardz.sg", self.organization, [self.department])
+        self.sender = self.create_user("sender@rewardz.sg", self.organization, [self.department])
+        self.other_sender = self.create_user("other.sender@rewardz.sg", self.organization, [self.department])
+        self.strength = UserStrength.objects.create(name="Teamwork", slug="teamwork")
+        self.other_strength = UserStrength.objects.create(name="Ownership", slug="ownership")
+        self.post = self.create_post(
+            self.sender, post_type=POST_TYPE.USER_CREATED_APPRECIATION, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+            organizations=[self.organization], user=self.receiver)
+        self.transaction = self.create_transaction(
+            self.receiver, self.sender, context={"strength_id": self.strength.id})
+        self.other_transaction = self.create_transaction(
+            self.receiver, self.other_sender, context={"strength_id": str(self.other_strength.id)})
+        self.post.transactions.add(self.transaction, self.other_transaction)
+
+    def get_post_ids(self, strength):
+        return list(Post.objects.filter(id__in=posts_with_strength(strength.id)).values_list(
+            "id", flat=True))
+
+    def test_any_transaction(self):
+        self.assertEqual(self.get_post_ids(self.strength), [self.post.id])
+        self.assertEqual(self.get_post_ids(self.other_strength), [self.post.id])
+
+    def test_transaction_removed(self):
+        self.post.transactions.remove(self.other_transaction)
+        self.assertEqual(self.get_post_ids(self.strength), [self.post.id])
+        self.assertEqual(self.get_post_ids(self.other_strength), [])
+
+    def test_strength_changed(self):
+        self.transaction.context = {"strength_id": self.other_strength.id}
+        self.transaction.save()
+        self.assertEqual(sync_post_strengths([self.post.id]), 2)
+        self.assertEqual(self.get_post_ids(self.strength), [])
+        self.assertEqual(self.get_post_ids(self.other_strength), [self.post.id])
+        self.assertEqual(sync_post_strengths([self.post.id]), 0)
+
+    def test_strength_deleted(self):
+        self.strength.delete()
+        self.assertEqual(sync_post_strengths([self.post.id]), 0)
+        self.assertEqual(self.get_post_ids(self.other_strength), [self.post.id])
+
+    def test_appreciated_by(self):
+        view = UserFeedViewSet.as_view({"get": "appreciated_by"}, versioning_class=fixed_versioning(12))
+        request = APIRequestFactory().get("/api/user_feed/appreciated_by/", {"strength": self.other_strength.id})
+        force_authenticate(request, user=self.receiver)
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user["pk"] for user in response.data["users"]], [self.other_sender.id])
+
+    def test_benchmark(self):
+        results = StrengthBenchmark(get_tenant_generator({}), 50, 3, 5).run()
+        self.assertEqual(results["mismatches"], 0)
+        self.assertEqual(results["post_strengths"]["max_queries"], 1)
+        self.assertGreater(results["post_strengths"]["mean_matched"], 0)
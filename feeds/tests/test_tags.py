@@ -0,0 +1,88 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+
+from feeds import utils
+from feeds.models import Comment, CommentTaggedUsers, PostTaggedUsers
+from feeds.utils import tag_users_to_comment, tag_users_to_post
+
+from .base import FeedsTestCase, USERMODEL
+
+
+PUSH_NOTIFICATION_MODEL = import_string(settings.PUSH_NOTIFICATION)
+
+
+class RecordedTask(object):
+    """Stands for the notify_tagged_users task, records the batches instead of enqueuing them"""
+
+    def __init__(self):
+        self.enqueued = []
+
+    def delay(self, **kwargs):
+        self.enqueued.append(kwargs)
+
+
+class TagUsersTest(FeedsTestCase):
+    """Hundreds of users mentioned in a post / comment are tagged and notified in batches"""
+
+    def setUp(self):
+        super(TagUsersTest, self).setUp()
+        self.creator = self.create_user("creator@rewardz.sg", self.organization, [self.department])
+        self.post = self.create_post(self.creator, organizations=[self.organization])
+        USERMODEL.objects.bulk_create([
+            USERMODEL(
+                email="user{}@rewardz.sg".format(index), employee_id="user{}".format(index),
+                organization=self.organization)
+            for index in range(400)
+        ])
+        self.user_ids = list(
+            USERMODEL.objects.exclude(id=self.creator.id).order_by("id").values_list("id", flat=True))
+
+    def get_notified_ids(self):
+        return sorted(PUSH_NOTIFICATION_MODEL.objects.filter(sender=self.creator).values_list(
+            "recipient_id", flat=True))
+
+    def test_post_mentions(self):
+        # ids are received as strings from the description, invalid and unknown ids are skipped
+        tag_users_to_post(self.post, [str(user_id) for user_id in self.user_ids] + ["invalid", "0"])
+        self.assertEqual(
+            sorted(PostTaggedUsers.objects.filter(post=self.post).values_list("user_id", flat=True)), self.user_ids)
+        self.assertEqual(self.get_notified_ids(), self.user_ids)
+        self.assertEqual(
+            set(PUSH_NOTIFICATION_MODEL.objects.filter(sender=self.creator).values_list("object_id", flat=True)),
+            {self.post.id})
+
+        # edited post, only the newly mentioned users are notified
+        PUSH_NOTIFICATION_MODEL.objects.all().delete()
+        tag_users_to_post(self.post, self.user_ids[100:] + [self.creator.id])
+        self.assertEqual(
+            sorted(PostTaggedUsers.objects.filter(post=self.post).values_list("user_id", flat=True)),
+            sorted(self.user_ids[100:] + [self.creator.id]))
+        self.assertEqual(self.get_notified_ids(), [self.creator.id])
+
+    def test_comment_mentions(self):
+        comment = Comment.objects.create(post=self.post, created_by=self.creator, content="Mentions")
+        tag_users_to_comment(comment, self.user_ids)
+        self.assertEqual(
+            sorted(CommentTaggedUsers.objects.filter(comment=comment).values_list("user_id", flat=True)),
+            self.user_ids)
+        self.assertEqual(self.get_notified_ids(), self.user_ids)
+
+    def test_single_batch(self):
+        task = RecordedTask()
+        self.patch(utils, "notify_tagged_users", task)
+        post = self.create_post(self.creator, organizations=[self.organization])
+        with CaptureQueriesContext(connection) as few_mentions:
+            tag_users_to_post(post, self.user_ids[:10])
+        with CaptureQueriesContext(connection) as many_mentions:
+            tag_users_to_post(self.post, self.user_ids)
+        # same queries (unless the database limits the rows of an INSERT) and a single task for the notifications
+        fields = [field for field in PostTaggedUsers._meta.concrete_fields if not field.primary_key]
+        rows_per_insert = connection.ops.bulk_batch_size(fields, self.user_ids)
+        self.assertEqual(len(many_mentions), len(few_mentions) + (len(self.user_ids) - 1) // rows_per_insert)
+        self.assertEqual(len(task.enqueued), 2)
+        self.assertEqual(sorted(task.enqueued[1]["recipient_ids"]), self.user_ids)
+        self.assertEqual(PUSH_NOTIFICATION_MODEL.objects.count(), 0)
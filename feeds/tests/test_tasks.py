@@ -0,0 +1,65 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.db import DatabaseError
+
+from feeds import tasks
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.tasks import get_notification_key, notify_user_via_push_notification
+from feeds.viewer import FEEDS_CACHE
+
+from .base import FeedsTestCase
+
+
+class RecordedGroup(object):
+    """Stands for celery.group, records the signatures of the chunks instead of enqueuing them"""
+    enqueued = []
+
+    def __init__(self, signatures):
+        self.signatures = list(signatures)
+
+    def apply_async(self):
+        RecordedGroup.enqueued.append(self.signatures)
+
+
+class NotificationFanOutTest(FeedsTestCase):
+
+    def setUp(self):
+        super(NotificationFanOutTest, self).setUp()
+        self.admin = self.create_user("admin@rewardz.sg", self.organization, [self.department], is_staff=True)
+        self.user = self.create_user("user@rewardz.sg", self.organization, [self.department])
+        self.post = self.create_post(
+            self.admin, post_type=POST_TYPE.USER_CREATED_POST, shared_with=SHARED_WITH.ALL_DEPARTMENTS,
+            organizations=[self.organization])
+        self.fan_out_key = get_notification_key(self.post.id, "fan_out")
+        FEEDS_CACHE.delete_many([self.fan_out_key, get_notification_key(self.post.id, "chunks")])
+        RecordedGroup.enqueued = []
+        self.patch_tasks("group", RecordedGroup)
+
+    def patch_tasks(self, name, value):
+        self.addCleanup(setattr, tasks, name, getattr(tasks, name))
+        setattr(tasks, name, value)
+
+    def test_fan_out_key_released_on_failure(self):
+        def get_post_audience_ids(post):
+            raise DatabaseError("audience could not be resolved")
+
+        self.patch_tasks("get_post_audience_ids", get_post_audience_ids)
+        # called directly, retry raises the original exception
+        with self.assertRaises(DatabaseError):
+            notify_user_via_push_notification(self.post.id, True)
+        self.assertIsNone(FEEDS_CACHE.get(self.fan_out_key))
+        self.assertEqual(RecordedGroup.enqueued, [])
+
+        # retry fans out once the audience is resolved
+        self.patch_tasks("get_post_audience_ids", lambda post: iter([self.user.id]))
+        notify_user_via_push_notification(self.post.id, True)
+        self.assertEqual(FEEDS_CACHE.get(self.fan_out_key), 1)
+        self.assertEqual(FEEDS_CACHE.get(get_notification_key(self.post.id, "chunks")), 1)
+        self.assertEqual(len(RecordedGroup.enqueued), 1)
+
+    def test_fan_out_once(self):
+        self.patch_tasks("get_post_audience_ids", lambda post: iter([self.user.id]))
+        notify_user_via_push_notification(self.post.id, True)
+        notify_user_via_push_notification(self.post.id, True)
+        self.assertEqual(len(RecordedGroup.enqueued), 1)
+        self.assertEqual(len(RecordedGroup.enqueued[0]), 1)
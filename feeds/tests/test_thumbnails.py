@@ -0,0 +1,47 @@
+from __future__ import division, print_function, unicode_literals
+
+from feeds import thumbnails
+from feeds.models import Images
+
+from .base import FeedsTestCase
+
+
+class RenditionUrlTest(FeedsTestCase):
+    """Urls of the images are the stored renditions, the cached thumbnails till the renditions are generated"""
+
+    def setUp(self):
+        super(RenditionUrlTest, self).setUp()
+        # the process-local thumbnail urls outlive the tests, the image names are the same in every test
+        thumbnails._local_cache.clear()
+        user = self.create_user("member@rewardz.sg", self.organization, [self.department])
+        post = self.create_post(user)
+        # rows are created without post_save so the renditions are pending
+        Images.objects.bulk_create([Images(post=post, image="posts/photo.png")])
+        self.rendered = []
+        self.rendered_url = "/media/posts/photo.png.{}.png"
+        self.patch(Images, "render_thumbnail", lambda image, size_name, default_url="": self.render_thumbnail(
+            image, size_name, default_url))
+
+    def render_thumbnail(self, image, size_name, default_url=""):
+        self.rendered.append(size_name)
+        return self.rendered_url.format(size_name) if self.rendered_url else default_url
+
+    @staticmethod
+    def get_image():
+        return Images.objects.get()
+
+    def test_pending_renditions(self):
+        self.assertEqual(self.get_image().thumbnail_img_url, "/media/posts/photo.png.thumbnail.png")
+        self.assertEqual(self.get_image().thumbnail_img_url, "/media/posts/photo.png.thumbnail.png")
+        self.assertEqual(self.rendered, ["thumbnail"])
+
+    def test_render_failed(self):
+        self.rendered_url = None
+        image = self.get_image()
+        self.assertEqual(image.display_img_url, image.image.url)
+
+    def test_generated_renditions(self):
+        self.assertTrue(self.get_image().generate_renditions())
+        self.rendered_url = None
+        self.assertEqual(self.get_image().large_img_url, "/media/posts/photo.png.large.png")
+        self.assertEqual(sorted(self.rendered), ["display", "large", "thumbnail"])
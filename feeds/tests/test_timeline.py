@@ -0,0 +1,71 @@
+from __future__ import division, print_function, unicode_literals
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds import timeline
+from feeds.benchmark.runner import fixed_versioning
+from feeds.constants import SHARED_WITH
+from feeds.models import Post
+from feeds.timeline import TIMELINE_ENABLE_FLAG, is_timeline_enabled, rebuild_timelines
+from feeds.views import PostViewSet
+
+from .base import FeedsTestCase
+
+
+ORGANIZATION_SETTINGS_MODEL = import_string(settings.ORGANIZATION_SETTINGS_MODEL)
+
+
+class TimelineFlagTest(FeedsTestCase):
+    """The timeline flag is read once per organization and the home feed of a timeline is read once"""
+
+    def setUp(self):
+        super(TimelineFlagTest, self).setUp()
+        self.patch(timeline, "TIMELINES_ENABLED", True)
+        self.member = self.create_user("member@rewardz.sg", self.organization, [self.department])
+        self.colleague = self.create_user("colleague@rewardz.sg", self.organization, [self.other_department])
+        # out of the default period (60 days) of the list API
+        self.post = self.create_post(self.colleague, shared_with=SHARED_WITH.ALL_DEPARTMENTS)
+        Post.objects.filter(id=self.post.id).update(created_on=timezone.now() - timedelta(days=90))
+        rebuild_timelines([self.post.id])
+        self.view = PostViewSet.as_view({"get": "list"}, versioning_class=fixed_versioning(12))
+
+    def enable_timeline(self, enabled=True):
+        return ORGANIZATION_SETTINGS_MODEL.objects.create(
+            organization=self.organization, key=TIMELINE_ENABLE_FLAG, value=enabled)
+
+    def get_feed(self, **params):
+        request = APIRequestFactory().get("/api/posts/", params)
+        force_authenticate(request, user=self.member)
+        response = self.view(request)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_flag_cached(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(is_timeline_enabled(self.organization))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_timeline_enabled(self.organization))
+
+    def test_flag_switched(self):
+        self.assertFalse(is_timeline_enabled(self.organization))
+        setting = self.enable_timeline()
+        self.assertTrue(is_timeline_enabled(self.organization))
+        self.assertFalse(is_timeline_enabled(self.other_organization))
+        setting.delete()
+        self.assertFalse(is_timeline_enabled(self.organization))
+
+    def test_fallback_without_timeline(self):
+        self.assertEqual([post["id"] for post in self.get_feed()["results"]], [self.post.id])
+        self.assertEqual([post["id"] for post in self.get_feed(pagination="cursor")["results"]], [self.post.id])
+
+    def test_no_fallback_with_timeline(self):
+        self.enable_timeline()
+        self.assertEqual(self.get_feed()["results"], [])
+        self.assertEqual(self.get_feed(pagination="cursor")["results"], [])
+        self.assertEqual(
+            [post["id"] for post in self.get_feed(created_during=120)["results"]], [self.post.id])
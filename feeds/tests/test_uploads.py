@@ -0,0 +1,63 @@
+from __future__ import division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from feeds.benchmark.runner import fixed_versioning
+from feeds.constants import POST_TYPE, SHARED_WITH
+from feeds.models import Documents, Post
+from feeds.views import PostViewSet
+
+from .base import FeedsTestCase
+
+
+class PostUploadTest(FeedsTestCase):
+    """Files of the post are streamed to the (local filesystem) storage and validated before the post is saved"""
+
+    def setUp(self):
+        super(PostUploadTest, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = self.create_user(
+            "member@rewardz.sg", self.organization, [self.department], allow_user_post_feed=True)
+        self.view = PostViewSet.as_view({"post": "create"}, versioning_class=fixed_versioning(12))
+
+    def create_post(self, **files):
+        data = {
+            "title": "Post", "description": "Files", "post_type": POST_TYPE.USER_CREATED_POST,
+            "shared_with": SHARED_WITH.ALL_DEPARTMENTS,
+        }
+        data.update(files)
+        request = APIRequestFactory().post("/api/posts/", data, format="multipart")
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def get_stored_files(self):
+        return [
+            os.path.join(path, name) for path, _, names in os.walk(self.media_root) for name in names
+        ]
+
+    def test_large_document(self):
+        # larger than FILE_UPLOAD_MAX_MEMORY_SIZE, it is written to a temporary file as it is received
+        size = 12 * 1024 * 1024
+        response = self.create_post(
+            documents=SimpleUploadedFile("report.pdf", b"x" * size, content_type="application/pdf"))
+        self.assertEqual(response.status_code, 200, response.data)
+        document = Documents.objects.get(post_id=response.data["id"])
+        self.assertEqual(os.path.getsize(document.document.path), size)
+        self.assertEqual(self.get_stored_files(), [document.document.path])
+
+    def test_invalid_image(self):
+        response = self.create_post(
+            images=SimpleUploadedFile("photo.png", b"not an image", content_type="image/png"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.get_stored_files(), [])
@@ -0,0 +1,36 @@
+from __future__ import division, print_function, unicode_literals
+
+from feeds.viewer import ViewerContext, get_viewer_context
+
+from .base import FeedsTestCase, USERMODEL
+
+
+class ViewerContextInvalidationTest(FeedsTestCase):
+    """Organizations of the cached viewer context follow the changes of the organization hierarchy"""
+
+    def setUp(self):
+        super(ViewerContextInvalidationTest, self).setUp()
+        self.admin = self.create_user("admin@rewardz.sg", self.organization, [self.department], is_staff=True)
+
+    def assertOrganizationsCurrent(self, user):
+        # the viewer context is kept on the user object, it is read again from the cache for a new object
+        viewer = get_viewer_context(USERMODEL.objects.get(id=user.id))
+        current = ViewerContext(USERMODEL.objects.get(id=user.id))
+        self.assertEqual(sorted(viewer.admin_org_ids), sorted(current.admin_org_ids))
+        self.assertEqual(sorted(viewer.affiliated_org_ids), sorted(current.affiliated_org_ids))
+        self.assertEqual(sorted(viewer.appreciation_org_ids), sorted(current.appreciation_org_ids))
+
+    def test_child_organization_added(self):
+        self.assertOrganizationsCurrent(self.admin)
+        self.other_organization.parent = self.organization
+        self.other_organization.save()
+        self.assertOrganizationsCurrent(self.admin)
+        viewer = get_viewer_context(USERMODEL.objects.get(id=self.admin.id))
+        self.assertIn(self.other_organization.id, viewer.affiliated_org_ids)
+
+    def test_child_organization_deleted(self):
+        self.other_organization.parent = self.organization
+        self.other_organization.save()
+        self.assertOrganizationsCurrent(self.admin)
+        self.other_organization.delete()
+        self.assertOrganizationsCurrent(self.admin)
@@ -0,0 +1,97 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.http import QueryDict
+
+from feeds import signals, utils
+from feeds.constants import SHARED_WITH
+from feeds.models import Post, PostVisibility
+from feeds.utils import accessible_posts_by_user_v2, org_reco_api_query, post_api_query
+from feeds.visibility import rebuild_posts_visibility
+
+from .base import VisibilityTestCase
+
+
+class VisibilityIndexParityTest(VisibilityTestCase):
+    """Posts resolved through the PostVisibility index are the same as the ones resolved by the M2M lookups"""
+
+    def setUp(self):
+        super(VisibilityIndexParityTest, self).setUp()
+        rebuild_posts_visibility([post.id for post in self.posts])
+
+    def get_visible_ids(self, user, index_enabled, **kwargs):
+        self.patch(utils, "VISIBILITY_INDEX_ENABLED", index_enabled)
+        post_query, exclusion_query, _ = accessible_posts_by_user_v2(user, user.organization, **kwargs)
+        return self.get_ids(Post.objects.filter(post_query).exclude(exclusion_query))
+
+    def test_accessible_posts(self):
+        for user in self.viewers:
+            for allow_feedback in (False, True):
+                for appreciations in (False, True):
+                    for org_reco_api in (False, True):
+                        kwargs = {
+                            "allow_feedback": allow_feedback, "appreciations": appreciations,
+                            "org_reco_api": org_reco_api,
+                        }
+                        self.assertEqual(
+                            self.get_visible_ids(user, True, **kwargs), self.get_visible_ids(user, False, **kwargs),
+                            "{} {}".format(user.email, kwargs))
+
+    def test_feeds_queries(self):
+        for user in self.viewers:
+            results = []
+            for index_enabled in (False, True):
+                self.patch(utils, "VISIBILITY_INDEX_ENABLED", index_enabled)
+                results.append((
+                    self.get_ids(post_api_query(12, user, None, False, QueryDict(""))[0]),
+                    self.get_ids(org_reco_api_query(user, None, 12, None, QueryDict(""))[0]),
+                    self.get_ids(org_reco_api_query(user, True, 12, None, QueryDict(""))[0]),
+                ))
+            self.assertEqual(results[0], results[1], user.email)
+
+
+class VisibilityIndexSyncTest(VisibilityTestCase):
+    """Index maintained by the signals is the same as the one rebuilt from the posts"""
+
+    def setUp(self):
+        self.patch(signals, "VISIBILITY_INDEX_ENABLED", True)
+        super(VisibilityIndexSyncTest, self).setUp()
+
+    def assertIndexSynced(self):
+        rows = set(PostVisibility.objects.values_list("post_id", "audience_kind", "audience_id"))
+        rebuild_posts_visibility([post.id for post in self.posts])
+        self.assertEqual(rows, set(PostVisibility.objects.values_list("post_id", "audience_kind", "audience_id")))
+
+    def test_created(self):
+        self.assertIndexSynced()
+
+    def test_post_sharing_changed(self):
+        for post in self.posts[:10]:
+            post.shared_with = SHARED_WITH.ALL_DEPARTMENTS
+            post.user = self.outsider
+            post.save()
+            post.organizations.add(self.other_organization)
+            post.departments.clear()
+        self.assertIndexSynced()
+
+    def test_related_side_cleared(self):
+        self.organization.posts.clear()
+        self.department.posts.clear()
+        self.assertIndexSynced()
+
+    def test_creator_changed(self):
+        self.other_department.users.clear()
+        self.member.organization = self.other_organization
+        self.member.save()
+        self.assertIndexSynced()
+
+    def test_unrelated_save(self):
+        rows = set(PostVisibility.objects.values_list("post_id", "audience_kind", "audience_id"))
+        PostVisibility.objects.all().delete()
+        for post in self.posts[:10]:
+            post.title = "Updated"
+            post.save()
+        self.admin.first_name = "Admin"
+        self.admin.save()
+        # nothing the index depends on has changed, it is not synced again
+        self.assertFalse(PostVisibility.objects.exists())
+        self.assertTrue(rows)
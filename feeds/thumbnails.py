@@ -0,0 +1,122 @@
+from __future__ import division, print_function, unicode_literals
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .viewer import FEEDS_CACHE
+
+
+THUMBNAIL_URL_CACHE_SIZE = getattr(settings, "FEEDS_THUMBNAIL_URL_CACHE_SIZE", 4096)
+# entries of the process-local cache are read for this long only, the other processes can not evict them
+THUMBNAIL_URL_LOCAL_TIMEOUT = getattr(settings, "FEEDS_THUMBNAIL_URL_LOCAL_TIMEOUT", 5 * 60)
+THUMBNAIL_URL_CACHE_TIMEOUT = getattr(settings, "FEEDS_THUMBNAIL_URL_CACHE_TIMEOUT", 24 * 60 * 60)
+PROFILE_IMAGE_FIELD = getattr(settings, "FEEDS_PROFILE_IMAGE_FIELD", "img")
+PROFILE_IMAGE_CROP_FIELDS = getattr(settings, "FEEDS_PROFILE_IMAGE_CROP_FIELDS", ("img_thumbnail",))
+THUMBNAIL_URL_CACHE_EVENTS = ("local_hit", "shared_hit", "miss")
+
+
+class LRUCache(object):
+    """Thread safe least recently used cache of a fixed number of entries which expires after the timeout"""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[1] < time.time():
+                return None
+            self.entries[key] = entry
+            return entry[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, time.time() + self.timeout)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local_cache = LRUCache(THUMBNAIL_URL_CACHE_SIZE, THUMBNAIL_URL_LOCAL_TIMEOUT)
+_counters_lock = threading.Lock()
+_counters = defaultdict(int)
+
+
+def record_thumbnail_url_cache_event(event):
+    with _counters_lock:
+        _counters[event] += 1
+
+
+def get_thumbnail_url_cache_stats():
+    """Returns the local hit / shared hit / miss counters of the thumbnail url cache of this process"""
+    with _counters_lock:
+        return dict((event, _counters[event]) for event in THUMBNAIL_URL_CACHE_EVENTS)
+
+
+def get_thumbnail_url_key(image_name, size, crop_box):
+    source = json.dumps([image_name, size, crop_box and "%s" % crop_box])
+    return "feeds:thumbnail_url:{}".format(hashlib.md5(source.encode("utf-8")).hexdigest())
+
+
+def get_thumbnail_url(image_name, size, crop_box, render):
+    """
+    Returns the url of the thumbnail from the process-local LRU, then from the shared cache, renders it
+    (render() i.e. easy_thumbnails which checks the storage) on a miss only. Empty urls (failures) are not cached
+    image_name: str, size: size of the thumbnail, crop_box: crop box of the thumbnail (None if not cropped)
+    """
+    key = get_thumbnail_url_key(image_name, size, crop_box)
+    url = _local_cache.get(key)
+    if url is not None:
+        record_thumbnail_url_cache_event("local_hit")
+        return url
+    url = FEEDS_CACHE.get(key)
+    if url is not None:
+        record_thumbnail_url_cache_event("shared_hit")
+        _local_cache.set(key, url)
+        return url
+    record_thumbnail_url_cache_event("miss")
+    url = render()
+    if url:
+        FEEDS_CACHE.set(key, url, THUMBNAIL_URL_CACHE_TIMEOUT)
+        _local_cache.set(key, url)
+    return url
+
+
+def evict_thumbnail_urls(sources):
+    """
+    Evicts the urls of the thumbnails of the deleted / re-cropped images
+    sources: List[Tuple[str, size, crop_box]] (image name, size and crop box of the thumbnails)
+    """
+    keys = [get_thumbnail_url_key(*source) for source in sources]
+    for key in keys:
+        _local_cache.delete(key)
+    FEEDS_CACHE.delete_many(keys)
+
+
+def get_profile_image_url(user, profile_image_property, default_url):
+    """Returns the url of the profile image (thumbnail property of the user) through the thumbnail url cache"""
+    image = getattr(user, PROFILE_IMAGE_FIELD, None)
+    if not image:
+        return getattr(user, profile_image_property, default_url)
+    crop_box = [getattr(user, field_name, None) for field_name in PROFILE_IMAGE_CROP_FIELDS]
+
+    def render():
+        return getattr(user, profile_image_property, default_url)
+
+    return get_thumbnail_url(image.name, "profile:%s" % profile_image_property, crop_box, render) or default_url
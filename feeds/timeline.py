@@ -0,0 +1,157 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .constants import AUDIENCE_KIND, POST_TYPE, SHARED_WITH
+from .models import Post, TimelineEntry
+from .viewer import FEEDS_CACHE
+from .visibility import get_audience_ids, get_bulk_create_batch_size
+
+
+ORGANIZATION_SETTINGS_MODEL = import_string(settings.ORGANIZATION_SETTINGS_MODEL)
+USER_DEPARTMENT_RELATED_NAME = settings.USER_DEPARTMENT_RELATED_NAME
+# timelines are maintained (signals) only if enabled, organizations can then be switched with the flag
+TIMELINES_ENABLED = getattr(settings, "FEEDS_TIMELINES_ENABLED", False)
+TIMELINE_ENABLE_FLAG = getattr(settings, "FEEDS_TIMELINE_ENABLE_FLAG", "feeds_materialized_timeline")
+TIMELINE_FLAG_TIMEOUT = getattr(settings, "FEEDS_TIMELINE_FLAG_TIMEOUT", 10 * 60)
+
+
+def get_timeline_flag_key(organization_id):
+    return "feeds:timeline:enabled:{}".format(organization_id)
+
+
+def is_timeline_enabled(organization):
+    """
+    Returns True if the organization reads the home feed from the materialized timelines, the flag is cached per
+    organization (refer invalidate_timeline_flag)
+    """
+    if not TIMELINES_ENABLED or organization is None:
+        return False
+    key = get_timeline_flag_key(organization.pk)
+    enabled = FEEDS_CACHE.get(key)
+    if enabled is None:
+        enabled = int(bool(ORGANIZATION_SETTINGS_MODEL.objects.get_value(TIMELINE_ENABLE_FLAG, organization)))
+        FEEDS_CACHE.set(key, enabled, TIMELINE_FLAG_TIMEOUT)
+    return bool(enabled)
+
+
+def invalidate_timeline_flag(organization_id):
+    """Removes the cached timeline flag of the organization"""
+    FEEDS_CACHE.delete(get_timeline_flag_key(organization_id))
+
+
+def get_timeline_audiences(post):
+    """
+    Returns the set of (audience_kind, audience_id) timelines in which the post has to be pushed
+    post: Post
+    """
+    if post.mark_delete or post.post_type == POST_TYPE.FEEDBACK_POST:
+        return set()
+
+    audiences = set((AUDIENCE_KIND.ORGANIZATION, org_id) for org_id in post.organizations.values_list("id", flat=True))
+    audiences.update(
+        (AUDIENCE_KIND.DEPARTMENT, dept_id) for dept_id in post.departments.values_list("id", flat=True))
+    audiences.update(
+        (AUDIENCE_KIND.JOB_FAMILY, jf_id) for jf_id in post.job_families.values_list("id", flat=True))
+
+    creator = post.created_by
+    if post.shared_with == SHARED_WITH.ALL_DEPARTMENTS and creator.organization_id:
+        audiences.add((AUDIENCE_KIND.ORGANIZATION, creator.organization_id))
+    elif post.shared_with == SHARED_WITH.SELF_DEPARTMENT:
+        audiences.update(
+            (AUDIENCE_KIND.DEPARTMENT, dept_id)
+            for dept_id in getattr(creator, USER_DEPARTMENT_RELATED_NAME).values_list("id", flat=True)
+        )
+    return audiences
+
+
+def push_to_timelines(post):
+    """
+    Syncs the timeline entries of the post with its current sharing (removes it when post is deleted)
+    post: Post
+    """
+    audiences = get_timeline_audiences(post)
+    existing_audiences = set(TimelineEntry.objects.filter(post=post).values_list("audience_kind", "audience_id"))
+    stale_audiences = existing_audiences - audiences
+    new_audiences = audiences - existing_audiences
+    with transaction.atomic():
+        if stale_audiences:
+            stale_query = Q()
+            for audience_kind, audience_id in stale_audiences:
+                stale_query |= Q(audience_kind=audience_kind, audience_id=audience_id)
+            TimelineEntry.objects.filter(stale_query, post=post).delete()
+        if new_audiences:
+            TimelineEntry.objects.bulk_create([
+                TimelineEntry(post=post, audience_kind=audience_kind, audience_id=audience_id)
+                for audience_kind, audience_id in new_audiences
+            ])
+
+
+def push_posts_to_timelines(post_ids):
+    """Syncs the timeline entries of the given posts"""
+    for post in Post.objects.filter(id__in=post_ids).select_related("created_by"):
+        push_to_timelines(post)
+
+
+def push_creator_posts_to_timelines(user_ids):
+    """
+    Syncs the timeline entries of the posts which depends on the organization/departments of the creators
+    user_ids: List[int]
+    """
+    push_posts_to_timelines(list(Post.objects.filter(
+        created_by_id__in=user_ids, shared_with__in=[SHARED_WITH.ALL_DEPARTMENTS, SHARED_WITH.SELF_DEPARTMENT]
+    ).values_list("id", flat=True)))
+
+
+def rebuild_timelines(post_ids):
+    """
+    Rebuilds the timeline entries of the given posts using a fixed number of grouped queries
+    post_ids: List[int]
+    """
+    posts = Post.objects.filter(id__in=post_ids, mark_delete=False).exclude(post_type=POST_TYPE.FEEDBACK_POST)
+    lookups = (
+        (AUDIENCE_KIND.ORGANIZATION, "organizations", posts),
+        (AUDIENCE_KIND.DEPARTMENT, "departments", posts),
+        (AUDIENCE_KIND.JOB_FAMILY, "job_families", posts),
+        (AUDIENCE_KIND.ORGANIZATION, "created_by__organization", posts.filter(
+            shared_with=SHARED_WITH.ALL_DEPARTMENTS)),
+        (AUDIENCE_KIND.DEPARTMENT, "created_by__{}".format(USER_DEPARTMENT_RELATED_NAME), posts.filter(
+            shared_with=SHARED_WITH.SELF_DEPARTMENT)),
+    )
+    entries = set()
+    for audience_kind, lookup, queryset in lookups:
+        entries.update(
+            (post_id, audience_kind, audience_id)
+            for post_id, audience_id in queryset.values_list("id", lookup) if audience_id
+        )
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(post_id__in=post_ids).delete()
+        timeline_entries = [
+            TimelineEntry(post_id=post_id, audience_kind=audience_kind, audience_id=audience_id)
+            for post_id, audience_kind, audience_id in entries
+        ]
+        TimelineEntry.objects.bulk_create(
+            timeline_entries, batch_size=get_bulk_create_batch_size(TimelineEntry, timeline_entries))
+    return len(entries)
+
+
+def timeline_query(user, departments, job_family):
+    """
+    Returns the query matching the posts pushed to the timelines of the user's organization, departments and
+    job family, it replaces the organizations/departments lookups of accessible_posts_by_user_v2 for the home feed
+    user: CustomUser
+    departments: QuerySet[Department]/List[int]
+    job_family: UserJobFamily/int
+    """
+    audience_query = (
+        Q(audience_kind=AUDIENCE_KIND.ORGANIZATION, audience_id=user.organization_id) |
+        Q(audience_kind=AUDIENCE_KIND.DEPARTMENT, audience_id__in=get_audience_ids(departments))
+    )
+    if job_family:
+        audience_query |= Q(audience_kind=AUDIENCE_KIND.JOB_FAMILY, audience_id=getattr(job_family, "pk", job_family))
+    entries = TimelineEntry.objects.filter(audience_query).values("post_id")
+    return Q(id__in=entries) | Q(user=user)
@@ -0,0 +1,182 @@
+from __future__ import division, print_function, unicode_literals
+
+import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from .serializers import DocumentsSerializer, ImagesSerializer, VideosSerializer
+from .tasks import generate_image_renditions
+
+
+UPLOAD_WORKERS = getattr(settings, "FEEDS_UPLOAD_WORKERS", 4)
+
+# kind of the upload (multipart field name) -> serializer validating it, file field of the model
+UPLOAD_KINDS = OrderedDict([
+    ("images", (ImagesSerializer, "image")),
+    ("documents", (DocumentsSerializer, "document")),
+    ("videos", (VideosSerializer, "video")),
+])
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingUploadMixin(object):
+    """
+    Streams the files of the multipart requests to temporary files as they are received,
+    so the videos / large documents are never held in memory
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        if not hasattr(request, "_files"):
+            request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super(StreamingUploadMixin, self).initialize_request(request, *args, **kwargs)
+
+
+class Upload(object):
+    """Single file of the upload request, its validated instance and its result"""
+
+    def __init__(self, kind, uploaded_file, serializer):
+        self.kind = kind
+        self.file = uploaded_file
+        self.serializer_class, self.field_name = UPLOAD_KINDS[kind]
+        self.errors = None if serializer.is_valid() else serializer.errors
+        self.instance = None if self.errors else serializer.Meta.model(**serializer.validated_data)
+        self.stored_name = None
+
+    @property
+    def field(self):
+        return self.instance._meta.get_field(self.field_name)
+
+    def store(self):
+        """Writes the file to the storage of the field, runs in the threads of the pool (no DB access)"""
+        field = self.field
+        try:
+            name = field.generate_filename(self.instance, self.file.name)
+            self.stored_name = field.storage.save(name, self.file, max_length=field.max_length)
+        except Exception as ex:
+            logger.error("Error storing the %s %s :  %s", self.kind, self.file.name, ex)
+            self.errors = {self.field_name: ["File could not be uploaded"]}
+
+    def delete(self):
+        try:
+            self.field.storage.delete(self.stored_name)
+        except Exception as ex:
+            logger.error("Error deleting the %s %s :  %s", self.kind, self.stored_name, ex)
+
+    @property
+    def result(self):
+        if self.errors:
+            return {"name": self.file.name, "errors": self.errors}
+        return self.serializer_class(self.instance).data
+
+
+def get_upload_files(request, kinds=None):
+    """Returns the files of the request for the given kinds of upload i.e. {kind: [UploadedFile]}"""
+    return OrderedDict(
+        (kind, request.FILES.getlist(kind)) for kind in (kinds or UPLOAD_KINDS) if kind in request.FILES)
+
+
+def store_uploads(uploads):
+    """Writes the files to the storage concurrently in a bounded thread pool"""
+    if not uploads:
+        return
+    pool = ThreadPool(min(UPLOAD_WORKERS, len(uploads)))
+    try:
+        pool.map(Upload.store, uploads)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def create_upload_rows(uploads, parent_filter):
+    """
+    Inserts the rows of the stored files with bulk_create, one query per model,
+    the ids are read back since bulk_create does not set them
+    """
+    uploads_by_model = OrderedDict()
+    for upload in uploads:
+        setattr(upload.instance, upload.field_name, upload.stored_name)
+        uploads_by_model.setdefault(upload.instance.__class__, []).append(upload)
+
+    for model, model_uploads in uploads_by_model.items():
+        field_name = model_uploads[0].field_name
+        model.objects.bulk_create([upload.instance for upload in model_uploads])
+        ids = dict(model.objects.filter(**parent_filter).filter(**{
+            "%s__in" % field_name: [upload.stored_name for upload in model_uploads]
+        }).values_list(field_name, "id"))
+        for upload in model_uploads:
+            upload.instance.pk = ids.get(upload.stored_name)
+
+
+def get_uploads(files, post_id=None, comment_id=None):
+    """
+    Returns the validated Upload of every file, the parent (post / comment) is validated along with the files
+    if given, otherwise only the files are validated and the parent is set on them before save_uploads e.g.
+    the files of the post being created are validated before the post is saved
+    files: Dict[str, List[UploadedFile]] (refer get_upload_files)
+    """
+    uploads = []
+    for kind, kind_files in files.items():
+        serializer_class, field_name = UPLOAD_KINDS[kind]
+        for uploaded_file in kind_files:
+            data = {field_name: uploaded_file}
+            if post_id:
+                data["post"] = post_id
+            elif comment_id:
+                data["comment"] = comment_id
+            serializer = serializer_class(data=data, partial=not (post_id or comment_id))
+            uploads.append(Upload(kind, uploaded_file, serializer))
+    return uploads
+
+
+def validate_uploads(uploads):
+    """Raises ValidationError with the per-file results if any of the file is not valid"""
+    if any(upload.errors for upload in uploads):
+        raise ValidationError([upload.result for upload in uploads])
+
+
+def save_uploads(uploads, parent_filter, raise_exception=False):
+    """
+    Writes the valid files to the storage concurrently and creates their rows in bulk.
+    Returns the per-file results (serialized row of the uploaded file or name and errors of the failed one)
+    in the order of the files.
+    parent_filter: Dict[str, int] i.e. {"post_id": id} / {"comment_id": id} of the parent set on the uploads
+    raise_exception: bool, raises ValidationError with the results if any of the file is not valid / stored,
+    nothing is saved in that case
+    """
+    store_uploads([upload for upload in uploads if not upload.errors])
+    stored = [upload for upload in uploads if not upload.errors]
+    if raise_exception and len(stored) != len(uploads):
+        for upload in stored:
+            upload.delete()
+        validate_uploads(uploads)
+    try:
+        create_upload_rows(stored, parent_filter)
+    except Exception:
+        for upload in stored:
+            upload.delete()
+        raise
+
+    for upload in stored:
+        if upload.kind == "images":
+            generate_image_renditions.delay(upload.instance._meta.model_name, upload.instance.pk)
+    return [upload.result for upload in uploads]
+
+
+def upload_files(files, post_id=None, comment_id=None, raise_exception=False):
+    """
+    Validates, stores and saves the files of the post / comment, the files are validated before anything is
+    written, then they are written to the storage concurrently and their rows are created in bulk.
+    Returns the per-file results (refer save_uploads)
+    files: Dict[str, List[UploadedFile]] (refer get_upload_files)
+    raise_exception: bool, raises ValidationError with the results if any of the file is not valid
+    """
+    parent_filter = {"post_id": post_id} if post_id else {"comment_id": comment_id}
+    uploads = get_uploads(files, post_id, comment_id)
+    if raise_exception:
+        validate_uploads(uploads)
+    return save_uploads(uploads, parent_filter, raise_exception)
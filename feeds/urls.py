@@ -4,7 +4,7 @@ from ajax_select import urls as ajax_select_urls
 from rest_framework import routers
 
 from .views import CommentViewset, ECardCategoryViewSet, ECardViewSet, PostViewSet, ImagesDetailView, search_user, \
-    UserFeedViewSet, InspireMeViewSet
+    UserFeedViewSet, InspireMeViewSet, feeds_stats
 
 router = routers.DefaultRouter()
 router.register(r'posts', PostViewSet, base_name='posts')
@@ -20,5 +20,6 @@ urlpatterns = [
     url(r'^api/', include(api_urls)),
     url(r'^api/images/(?P<pk>[0-9]+)/$', ImagesDetailView.as_view()),
     url(r'^api/search_users/', search_user),
+    url(r'^api/feeds_stats/$', feeds_stats),
     url(r'^ajax_select/', include(ajax_select_urls)),
 ]
@@ -1,6 +1,7 @@
 from __future__ import division, print_function, unicode_literals
 
 import json
+import logging
 import re
 import pytz
 from django.conf import settings
@@ -10,14 +11,24 @@ from django.utils.module_loading import import_string
 from django.utils import timezone
 from datetime import timedelta
 import calendar
+from collections import namedtuple
 
 from rest_framework import exceptions, serializers
 
 from .constants import POST_TYPE, SHARED_WITH
 from .models import Comment, Post
-from feeds.tasks import notify_user_via_email, notify_user_via_push_notification
+from .thumbnails import get_profile_image_url
+from .timeline import timeline_query
+from .viewer import get_viewer_context
+from .visibility import VISIBILITY_INDEX_ENABLED, get_audience_ids, visibility_query
+from feeds.tasks import (
+    notify_new_comment_via_push_notification, notify_tagged_users, notify_user_via_email,
+    notify_user_via_push_notification,
+)
 
 
+logger = logging.getLogger(__name__)
+
 DEPARTMENT_MODEL = import_string(settings.DEPARTMENT_MODEL)
 ERROR_MESSAGE = "Priority post already exists for user. Set priority to false."
 USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
@@ -28,6 +39,21 @@ NOTIFICATION_OBJECT_TYPE = NOTIFICATION_OBJECT.Posts
 # NOTIFICATION_FEEDBACK_OBJECT_TYPE = NOTIFICATION_OBJECT.feedback
 NOTIF_OBJECT_TYPE_FIELD_NAME = settings.NOTIF_OBJECT_TYPE_FIELD_NAME
 NOTIF_OBJECT_ID_FIELD_NAME = settings.NOTIF_OBJECT_ID_FIELD_NAME
+PUSH_NOTIFICATION_BATCH_SIZE = getattr(settings, "FEEDS_PUSH_NOTIFICATION_BATCH_SIZE", 500)
+# callable delivering the notifications created in bulk, bulk_create does not call save() nor send post_save
+PUSH_NOTIFICATION_DELIVERY = getattr(settings, "FEEDS_PUSH_NOTIFICATION_DELIVERY", None)
+if PUSH_NOTIFICATION_DELIVERY:
+    PUSH_NOTIFICATION_DELIVERY = import_string(PUSH_NOTIFICATION_DELIVERY)
+TAG_PATTERN = re.compile(r"<tag.*?>(.*?)<\/tag>")
+EMAIL_ID_PATTERN = re.compile(r"<email_id>(([\w.-]+)@([\w.-]+))</email_id>")
+USER_ID_PATTERN = re.compile(r"<user_id>([0-9]+)</user_id>")
+# tokens of the mentions matched in a single scan of the text (refer extract_mentions), they all start with "<" so
+# the text is scanned for it only
+MENTION_TOKEN_PATTERN = re.compile(
+    r"<(?:(?P<open>tag[^\n]*?)>|(?P<close>/tag)>|email_id>(?P<email_id>[\w.-]+@[\w.-]+)</email_id>|"
+    r"user_id>(?P<user_id>[0-9]+)</user_id>)"
+)
+Mention = namedtuple("Mention", ["email_id", "user_id"])
 USER_DEPARTMENT_RELATED_NAME = settings.USER_DEPARTMENT_RELATED_NAME
 ORGANIZATION_SETTINGS_MODEL = import_string(settings.ORGANIZATION_SETTINGS_MODEL)
 NOMINATION_STATUS = import_string(settings.NOMINATION_STATUS)
@@ -100,6 +126,68 @@ def accessible_posts_by_user(user, organization, allow_feedback=False, appreciat
     return posts.filter(mark_delete=False)
 
 
+def is_post_shared_with_user(user, post, organization_ids, appreciations, viewer):
+    """
+    Returns True if the (non deleted) post matches the sharing rules of accessible_posts_by_user, the cheap
+    checks are done first and the sharing relations are read only when they decide the access
+    """
+    creator_org_id = post.created_by.organization_id
+    if post.created_by_id == user.pk or post.user_id == user.pk:
+        return True
+    if appreciations and post.post_type == POST_TYPE.USER_CREATED_APPRECIATION:
+        if creator_org_id in viewer.appreciation_org_ids:
+            return True
+    if user.is_staff and creator_org_id in viewer.admin_org_ids and post.post_type in (
+            POST_TYPE.USER_CREATED_POST, POST_TYPE.USER_CREATED_POLL, POST_TYPE.FEEDBACK_POST):
+        return True
+    if post.shared_with == SHARED_WITH.ALL_DEPARTMENTS and creator_org_id in organization_ids:
+        return True
+
+    department_ids = viewer.department_ids
+    if post.shared_with == SHARED_WITH.SELF_DEPARTMENT and getattr(
+            post.created_by, USER_DEPARTMENT_RELATED_NAME).filter(id__in=department_ids).exists():
+        return True
+    if Post.organizations.through.objects.filter(post_id=post.pk, organization_id__in=organization_ids).exists():
+        return True
+    if Post.departments.through.objects.filter(post_id=post.pk, department_id__in=department_ids).exists():
+        return True
+    if post.shared_with == SHARED_WITH.ORGANIZATION_DEPARTMENTS:
+        job_family_ids = list(get_audience_ids(user.job_families))
+        return Post.job_families.through.objects.filter(
+            post_id=post.pk, userjobfamily_id__in=job_family_ids).exists()
+    return False
+
+
+def can_view_post(user, post, organization, allow_feedback=False, appreciations=False, viewer=None):
+    """
+    Returns True if the post is accessible by the user, evaluates the rules of accessible_posts_by_user for the
+    given post (requested by its id) in python so the detail apis do not build the whole visibility query
+    post: Post (created_by is used, select it along with the post)
+    organization: Organization / List[Organization or id] (refer accessible_posts_by_user)
+    """
+    if post.mark_delete:
+        return False
+    viewer = viewer or get_viewer_context(user)
+    organization_ids = set(get_audience_ids(organization))
+    is_feedback = post.post_type == POST_TYPE.FEEDBACK_POST
+    if is_feedback == allow_feedback and is_post_shared_with_user(
+            user, post, organization_ids, appreciations, viewer):
+        return True
+    if not user.is_staff:
+        return False
+
+    # admin can access the posts of the organization requested by id and the self department posts of
+    # the admin organizations which are not shared with any organization
+    creator_org_id = post.created_by.organization_id
+    if creator_org_id in (viewer.admin_org_ids if allow_feedback else [user.organization_id]):
+        return True
+    return (
+        post.shared_with == SHARED_WITH.SELF_DEPARTMENT and creator_org_id in viewer.admin_org_ids and
+        post.post_type in (POST_TYPE.USER_CREATED_POST, POST_TYPE.USER_CREATED_POLL, POST_TYPE.FEEDBACK_POST) and
+        not Post.organizations.through.objects.filter(post_id=post.pk).exists()
+    )
+
+
 def shared_with_all_departments_but_not_belongs_to_user_org_query(user, exclude_query):
     """
     Returns exclude_query (posts which are shared with all departments but created by user's org
@@ -222,26 +310,37 @@ def posts_shared_with_org_department_query(user, admin_orgs):
 
 def accessible_posts_by_user_v2(
         user, organization, allow_feedback=False, appreciations=False, post_id=None, departments=None,
-        org_reco_api=False
+        org_reco_api=False, audience_query=None, viewer=None
 ):
-    """Function is responsible to return the Posts which is accessible by the user based on the privacy of the post"""
+    """
+    Function is responsible to return the Posts which is accessible by the user based on the privacy of the post
+    audience_query: Q() replacing the organizations/departments lookups (e.g. materialized timelines)
+    viewer: ViewerContext of the user (cached relations of the user)
+    """
     if not isinstance(organization, (list, tuple, django_query.QuerySet)):
         organization = [organization]
 
+    viewer = viewer or get_viewer_context(user)
     # get the departments to which this user belongs
-    user_depts = departments or getattr(user, USER_DEPARTMENT_RELATED_NAME).all()
-    job_family = user.job_family
-    post_query = (
-            Q(organizations__in=organization) |
-            Q(departments__in=user_depts) |
-            Q(user=user) |
-            Q(shared_with=SHARED_WITH.ALL_DEPARTMENTS, created_by__organization__in=organization) |
-            Q(shared_with=SHARED_WITH.SELF_DEPARTMENT, created_by__departments__in=user_depts)
-    )
+    user_depts = departments or viewer.department_ids
+    job_family = viewer.job_family_id
+    if audience_query is not None:
+        post_query = audience_query
+    elif VISIBILITY_INDEX_ENABLED:
+        # single join over the PostVisibility index instead of the M2M joins below
+        post_query = visibility_query(user, organization, user_depts)
+    else:
+        post_query = (
+                Q(organizations__in=organization) |
+                Q(departments__in=user_depts) |
+                Q(user=user) |
+                Q(shared_with=SHARED_WITH.ALL_DEPARTMENTS, created_by__organization__in=organization) |
+                Q(shared_with=SHARED_WITH.SELF_DEPARTMENT, created_by__departments__in=user_depts)
+        )
     admin_orgs = None
 
     if user.is_staff:
-        admin_orgs = user.child_organizations
+        admin_orgs = viewer.admin_org_ids
         admin_query = (
             Q(created_by__organization__in=admin_orgs,
               post_type__in=[POST_TYPE.USER_CREATED_POST, POST_TYPE.USER_CREATED_POLL, POST_TYPE.FEEDBACK_POST])
@@ -252,7 +351,7 @@ def accessible_posts_by_user_v2(
 
     if appreciations:
         post_query.add(Q(post_type=POST_TYPE.USER_CREATED_APPRECIATION,
-                         created_by__organization__in=user.orgs_to_access_appreciation, mark_delete=False), Q.OR)
+                         created_by__organization__in=viewer.appreciation_org_ids, mark_delete=False), Q.OR)
 
     feedback_query = Q(post_type=POST_TYPE.FEEDBACK_POST)
     post_query = post_query & (feedback_query if allow_feedback else ~feedback_query)
@@ -272,30 +371,34 @@ def accessible_posts_by_user_v2(
     return post_query, get_exclusion_query(user, admin_orgs, user_depts, org_reco_api, job_family), admin_orgs
 
 
-def fetch_feeds(post_query, exclusion_query, ordering_fields, user):
+def fetch_feeds(post_query, exclusion_query, ordering_fields, user, viewer=None):
     """Return feeds queryset based on Q queries"""
-    # IMP: Do not remove list from here because with the list it is actually faster refer this
-    # https://github.com/rewardz/Feeds/pull/223#issuecomment-2024339238
-
-    queryset = Post.objects.filter(post_query).exclude(exclusion_query)
-    post_ids = set(queryset.values_list('id', flat=True))
-    if getattr(user, 'job_family', None):
-        new_queryset = user.job_family.posts.values_list('id', flat=True)
-        post_ids = set(new_queryset).union(post_ids)
-    queryset = Post.objects.filter(id__in=post_ids)
+    # IMP: Do not filter/order the outer queryset with the visibility joins, it multiplies the rows and forces a
+    # DISTINCT over them refer this https://github.com/rewardz/Feeds/pull/223#issuecomment-2024339238
+    # the ids are resolved in sub queries instead, so they never leave the database
+    feeds_query = Q(id__in=Post.objects.filter(post_query).exclude(exclusion_query).values('id'))
+    job_family_id = (viewer or get_viewer_context(user)).job_family_id
+    if job_family_id:
+        feeds_query |= Q(id__in=Post.objects.filter(job_families=job_family_id).values('id'))
+    queryset = Post.objects.filter(feeds_query)
     return get_related_objects_qs(
         queryset.order_by(*ordering_fields)
     )
 
 
-def post_api_query(version, user, post_id, appreciations, query_params):
-    """Used to return the list API query for the PostViewSet"""
-    departments = user.cached_departments
+def post_api_query(version, user, post_id, appreciations, query_params, timeline=False, viewer=None):
+    """
+    Used to return the list API query for the PostViewSet
+    timeline: if True then read the posts shared with user's org/departments from the materialized timelines
+    viewer: ViewerContext of the user
+    """
+    viewer = viewer or get_viewer_context(user)
+    departments = viewer.department_ids
     allow_feedback = str(query_params.get('feedback', None)) == "true"
     created_by = query_params.get('created_by', None)
     org = user.organization
-    admin_orgs = user.child_organizations if user.is_staff else None
-    exclusion_query = get_exclusion_query(user, admin_orgs, departments, False, user.job_family)
+    admin_orgs = viewer.admin_org_ids if user.is_staff else None
+    exclusion_query = get_exclusion_query(user, admin_orgs, departments, False, viewer.job_family_id)
 
     query = Q(mark_delete=False, post_type=POST_TYPE.USER_CREATED_POST)
     if created_by == "user_org":
@@ -305,8 +408,11 @@ def post_api_query(version, user, post_id, appreciations, query_params):
     else:
         if allow_feedback and user.is_staff:
             org = admin_orgs
+        audience_query = (
+            timeline_query(user, departments, viewer.job_family_id) if timeline and not allow_feedback else None
+        )
         post_query, exclusion_query, admin_orgs = accessible_posts_by_user_v2(
-            user, org, allow_feedback, appreciations, None, departments, False)
+            user, org, allow_feedback, appreciations, None, departments, False, audience_query, viewer)
 
     if created_by in ("user_org", "user_dept"):
         if user.is_staff:
@@ -327,21 +433,22 @@ def post_api_query(version, user, post_id, appreciations, query_params):
     post_query = post_query | posts_shared_with_org_department_query(user, admin_orgs) | get_nomination_query(user)
     return fetch_feeds(
         post_query if allow_feedback else (post_query & extract_date_query(query_params)),
-        exclusion_query, ('-priority', '-modified_on', '-created_on'), user
+        exclusion_query, ('-priority', '-modified_on', '-created_on'), user, viewer
     ), post_query, exclusion_query
 
 
-def org_reco_api_query(user, post_polls, version, greeting, query_params):
+def org_reco_api_query(user, post_polls, version, greeting, query_params, viewer=None):
     """Used to return the list API query for the org_reco API"""
+    viewer = viewer or get_viewer_context(user)
     organization = user.organization
-    departments = user.cached_departments
+    departments = viewer.department_ids
     post_polls_filter = query_params.get("post_polls_filter", None)
     user_id = query_params.get("user", None)
     search = query_params.get("search", None)
     query = None
 
     post_query, exclusion_query, admin_orgs = accessible_posts_by_user_v2(
-        user, organization, False, False if post_polls else True, None, departments, True)
+        user, organization, False, False if post_polls else True, None, departments, True, viewer=viewer)
 
     if post_polls:
         query_post = Q(post_type=POST_TYPE.USER_CREATED_POST)
@@ -394,7 +501,7 @@ def org_reco_api_query(user, post_polls, version, greeting, query_params):
     if query:
         post_query = post_query & query
     return fetch_feeds(post_query & extract_date_query(query_params), exclusion_query,
-                       ('-priority', '-created_on'), user), post_query, exclusion_query
+                       ('-priority', '-created_on'), user, viewer), post_query, exclusion_query
 
 
 def validate_priority(data):
@@ -425,7 +532,7 @@ def get_profile_image(user):
     This function returns the profile image of the user or none
     """
     profile_image = settings.PROFILE_IMAGE_PROPERTY
-    return getattr(user, profile_image, settings.NO_PROFILE_IMAGE)
+    return get_profile_image_url(user, profile_image, settings.NO_PROFILE_IMAGE)
 
 
 def get_user_name(user):
@@ -444,96 +551,97 @@ def get_user_name(user):
 
 
 def user_can_edit(user, instance):
-    if instance.post_type == POST_TYPE.USER_CREATED_POLL:
+    return user_can_edit_post(user, instance.post_type, instance.created_by_id)
+
+
+def user_can_edit_post(user, post_type, created_by_id):
+    if post_type == POST_TYPE.USER_CREATED_POLL:
         return False
     if not user.is_staff:
-        if instance.post_type == POST_TYPE.SYSTEM_CREATED_POST:
+        if post_type == POST_TYPE.SYSTEM_CREATED_POST:
             return False
-        return instance.created_by.id == user.id
+        return created_by_id == user.id
     return True
 
 
 def user_can_delete(user, instance):
+    return user_can_delete_post(user, getattr(instance, "post_type", None), instance.created_by_id)
+
+
+def user_can_delete_post(user, post_type, created_by_id):
     if not user.is_staff:
-        if hasattr(instance, "post_type") and instance.post_type in [POST_TYPE.SYSTEM_CREATED_POST]:
+        if post_type in [POST_TYPE.SYSTEM_CREATED_POST]:
             return False
-        return instance.created_by.id == user.id
+        return created_by_id == user.id
     return True
 
 
-def tag_users_to_post(post, user_list):
-    existing_tagged_users = [u.id for u in post.tagged_users.all()]
-    remove_user_list = list(set(existing_tagged_users).difference(user_list))
-    new_users_tagged = list(set(user_list).difference(existing_tagged_users))
-    object_type = NOTIFICATION_OBJECT_TYPE
-    created_by_user_name = get_user_name(post.created_by)
+def get_user_ids(user_list):
+    """Returns the set of (int) user ids from the list of ids / numeric strings, invalid values are skipped"""
+    user_ids = set()
+    for user_id in user_list:
+        try:
+            user_ids.add(int(user_id))
+        except (TypeError, ValueError):
+            continue
+    return user_ids
+
+
+def sync_tagged_users(instance, user_list, message, object_id):
+    """
+    Tags the new users (validated with a single query) with bulk_create, untags the removed users with a single
+    delete and notifies the newly tagged users in one batch (refer notify_tagged_users_async)
+    instance: Post/Comment
+    user_list: List[int/str]
+    """
+    user_ids = get_user_ids(user_list)
+    existing_tagged_users = set(instance.tagged_users.values_list("id", flat=True))
+    remove_user_list = existing_tagged_users.difference(user_ids)
+    new_users_tagged = list(USERMODEL.objects.filter(
+        id__in=user_ids.difference(existing_tagged_users)).values_list("id", flat=True))
     if new_users_tagged:
-        for user_id in new_users_tagged:
-            try:
-                user = USERMODEL.objects.get(id=user_id)
-                post.tag_user(user)
-                message = _("'%s' has mentioned you in post" % (created_by_user_name))
-                if post.post_type == POST_TYPE.USER_CREATED_APPRECIATION:
-                    message = _("'%s' has mentioned you in appreciation" % (created_by_user_name))
-                if post.post_type == POST_TYPE.USER_CREATED_NOMINATION:
-                    message = _("'%s' has mentioned you in nomination" % (created_by_user_name))
-                push_notification(post.created_by, message, user,
-                                  object_type=object_type, object_id=post.id)
-            except Exception:
-                continue
+        instance.tag_users(new_users_tagged)
+        notify_tagged_users_async(instance.created_by, message, new_users_tagged, object_id)
     if remove_user_list:
-        for user_id in remove_user_list:
-            try:
-                user = USERMODEL.objects.get(id=user_id)
-                post.untag_user(user)
-            except Exception:
-                continue
+        instance.untag_users(remove_user_list)
+
+
+def tag_users_to_post(post, user_list):
+    created_by_user_name = get_user_name(post.created_by)
+    message = _("'%s' has mentioned you in post" % (created_by_user_name))
+    if post.post_type == POST_TYPE.USER_CREATED_APPRECIATION:
+        message = _("'%s' has mentioned you in appreciation" % (created_by_user_name))
+    if post.post_type == POST_TYPE.USER_CREATED_NOMINATION:
+        message = _("'%s' has mentioned you in nomination" % (created_by_user_name))
+    sync_tagged_users(post, user_list, message, post.id)
 
 
 def tag_users_to_comment(comment, user_list):
-    existing_tagged_users = [u.id for u in comment.tagged_users.all()]
-    remove_user_list = list(set(existing_tagged_users).difference(user_list))
-    new_users_tagged = list(set(user_list).difference(existing_tagged_users))
-    object_type = NOTIFICATION_OBJECT_TYPE
     created_by_user_name = get_user_name(comment.created_by)
-    if new_users_tagged:
-        for user_id in new_users_tagged:
-            try:
-                user = USERMODEL.objects.get(id=user_id)
-                comment.tag_user(user)
-                message = _("'%s' has mentioned you in comment" % (created_by_user_name))
-                push_notification(comment.created_by, message, user,
-                                  object_type=object_type, object_id=comment.post_id)
-            except Exception:
-                continue
-    if remove_user_list:
-        for user_id in remove_user_list:
-            try:
-                user = USERMODEL.objects.get(id=user_id)
-                comment.untag_user(user)
-            except Exception:
-                continue
+    message = _("'%s' has mentioned you in comment" % (created_by_user_name))
+    sync_tagged_users(comment, user_list, message, comment.post_id)
 
 
 def notify_new_comment(comment, creator):
+    """
+    Notifies the commentators and the creator of the post about the new comment,
+    it runs in the notify_new_comment_via_push_notification task (refer notify_new_comment_async)
+    """
     post = comment.post
-    commentator_ids = Comment.objects.filter(post=post).values_list('created_by__id', flat=True)
-    # get all the commentators except the one currently commenting
-    commentators = USERMODEL.objects.filter(id__in=commentator_ids).exclude(id=creator.id)
-    # also exclude the creator of the post
-    commentators = commentators.exclude(id=post.created_by.id)
+    post_creator = post.created_by
+    commentator_ids = Comment.objects.filter(post_id=post.id).values("created_by_id")
+    # get all the commentators except the one currently commenting and the creator of the post
+    commentators = USERMODEL.objects.filter(id__in=commentator_ids).exclude(id__in=[creator.id, post_creator.id])
     feedback_post_type = post.post_type == POST_TYPE.FEEDBACK_POST
     object_type = NOTIFICATION_OBJECT.feedback if feedback_post_type else NOTIFICATION_OBJECT.Posts
     comment_creator_string = get_user_name(creator)
-    post_creator = USERMODEL.objects.get(id=post.created_by.id)
 
     # for feedback post user won't receive the notification
     if not feedback_post_type:
-        for usr in commentators:
-            message = _("'%s' commented on the post" % (comment_creator_string))
-            push_notification(
-                creator, message, usr, object_type=object_type, object_id=post.id
-            )
+        message = _("'%s' commented on the post" % (comment_creator_string))
+        bulk_push_notification(
+            creator, message, commentators.values_list("id", flat=True), object_type=object_type, object_id=post.id
+        )
 
         # post creator always receives a notification when a new comment is made
         try:
@@ -555,6 +663,16 @@ def notify_new_comment(comment, creator):
         notify_user_via_email.delay(comment.id)
 
 
+def notify_new_comment_async(comment):
+    """Enqueues the notifications of the new comment so the comment api does not wait for them"""
+    notify_new_comment_via_push_notification.delay(comment_id=comment.id)
+
+
+def notify_tagged_users_async(sender, message, user_ids, object_id):
+    """Enqueues the notifications of the mentioned users so the post / comment api does not wait for them"""
+    notify_tagged_users.delay(sender_id=sender.id, message=message, recipient_ids=list(user_ids), object_id=object_id)
+
+
 def notify_new_post_poll_created(poll, is_post=False):
     notify_user_via_push_notification.delay(
         poll_id=poll.id,
@@ -574,9 +692,10 @@ def notify_flagged_post(post, user, reason):
         + "\n" + str(reason)
     )
     object_type = NOTIFICATION_OBJECT_TYPE
-    for usr in admin_users:
-        push_notification(user, message, usr, object_type=object_type, object_id=post.id)
-        add_email(usr.email, user.email, subject, body)
+    bulk_push_notification(
+        user, message, admin_users.values_list("id", flat=True), object_type=object_type, object_id=post.id)
+    for email in admin_users.values_list("email", flat=True):
+        add_email(email, user.email, subject, body)
 
 
 def add_email(to, from_user, subject, body):
@@ -592,69 +711,148 @@ def add_email(to, from_user, subject, body):
         return False
 
 
+def get_notification_object_fields(object_type=None, object_id=None):
+    """Returns the object type/id fields (named as configured in settings) of the push notification"""
+    fields = {}
+    if object_type:
+        fields[NOTIF_OBJECT_TYPE_FIELD_NAME] = object_type
+    if object_id:
+        fields[NOTIF_OBJECT_ID_FIELD_NAME] = object_id
+    return fields
+
+
 def push_notification(sender, message, recipient, object_type=None, object_id=None, extra_context={}):
     try:
-        notification = PUSH_NOTIFICATION_MODEL.objects.create(
+        PUSH_NOTIFICATION_MODEL.objects.create(
             sender=sender,
             message=message,
             recipient=recipient,
             extra_context=extra_context,
+            **get_notification_object_fields(object_type, object_id)
         )
-        if object_type:
-            setattr(notification, NOTIF_OBJECT_TYPE_FIELD_NAME, object_type)
-        if object_id:
-            setattr(notification, NOTIF_OBJECT_ID_FIELD_NAME, object_id)
-        notification.save()
         return True
     except Exception:
         return False
 
 
-def extract_tagged_users(match_string):
-    pattern = "<tag.*?>(.*?)<\\/tag>"
-    matches = []
-    user_ids = []
+def create_push_notifications(notifications):
+    """
+    Creates the notifications of a chunk with a single bulk_create and hands them to the delivery hook
+    (FEEDS_PUSH_NOTIFICATION_DELIVERY). Without the hook they are saved one by one so the deliveries done by
+    save() / post_save of the notification model keep working
+    notifications: List[PushNotification] (not saved)
+    """
+    if PUSH_NOTIFICATION_DELIVERY is None:
+        for notification in notifications:
+            notification.save()
+        return
+    PUSH_NOTIFICATION_MODEL.objects.bulk_create(notifications)
+    PUSH_NOTIFICATION_DELIVERY(notifications)
 
-    matches_found = re.findall(pattern, match_string)
-    if matches_found:
-        matches.extend(matches_found)
 
-    if not matches:
-        return user_ids
+def bulk_push_notification(sender, message, recipient_ids, object_type=None, object_id=None, extra_context={},
+                           batch_size=None, raise_exception=False):
+    """
+    Creates the same notification for every recipient in chunks of batch_size (FEEDS_PUSH_NOTIFICATION_BATCH_SIZE),
+    with one query per chunk instead of a write per recipient if the delivery hook is configured
+    (refer create_push_notifications).
+    Recipients are notified once even if they are repeated. Returns the number of notifications created
+    sender: CustomUser
+    recipient_ids: Iterable[int] (it is consumed lazily so values_list(...).iterator() can be passed)
+    raise_exception: bool (errors are logged and the count created so far is returned if False)
+    """
+    batch_size = batch_size or PUSH_NOTIFICATION_BATCH_SIZE
+    fields = get_notification_object_fields(object_type, object_id)
+    notified_ids, notifications, created = set(), [], 0
+    try:
+        for recipient_id in recipient_ids:
+            if recipient_id is None or recipient_id in notified_ids:
+                continue
+            notified_ids.add(recipient_id)
+            notifications.append(PUSH_NOTIFICATION_MODEL(
+                sender=sender, message=message, recipient_id=recipient_id, extra_context=extra_context, **fields))
+            if len(notifications) >= batch_size:
+                create_push_notifications(notifications)
+                created += len(notifications)
+                notifications = []
+        if notifications:
+            create_push_notifications(notifications)
+            created += len(notifications)
+    except Exception:
+        if raise_exception:
+            raise
+        logger.exception("Unable to create push notifications of %s", sender)
+    return created
+
 
-    for user_detail in matches:
-        user_info = extract_user_info(user_detail)
-        if not user_info:
+def extract_mentions(*texts):
+    """
+    Returns the mentions (<tag><email_id>..</email_id><user_id>..</user_id></tag>) of the texts in order, every
+    text is scanned once by the tokenizer (MENTION_TOKEN_PATTERN) instead of searching the email / user id in the
+    body of every tag. The first email / user id of the tag is taken (same as extract_user_info)
+    texts: str (title, description, comment content etc. None is skipped)
+    """
+    mentions = []
+    for text in texts:
+        if not text:
             continue
-        email = user_info['email_id']
-        user_id = user_info['user_id']
-        if not user_id:
-            try:
-                user = USERMODEL.objects.get(email=email)
-                user_ids.append(user.id)
-            except Exception:
+        in_tag, email_id, user_id, body_start = False, None, None, 0
+        for token in MENTION_TOKEN_PATTERN.finditer(text):
+            kind = token.lastgroup
+            if kind == "open":
+                # a tag is not matched across lines (as with TAG_PATTERN), the tag opened on a previous line is
+                # replaced, the one opened on the same line is kept (nested tags are part of its body)
+                if in_tag and text.find("\n", body_start, token.start()) == -1:
+                    continue
+                in_tag, email_id, user_id, body_start = True, None, None, token.end()
+            elif not in_tag:
                 continue
-        else:
+            elif kind == "close":
+                if (email_id or user_id) and text.find("\n", body_start, token.start()) == -1:
+                    mentions.append(Mention(email_id, user_id))
+                in_tag = False
+            elif kind == "email_id":
+                email_id = email_id or token.group(kind)
+            else:
+                user_id = user_id or token.group(kind)
+    return mentions
+
+
+def resolve_mentions(mentions):
+    """
+    Returns the user ids of the mentions, mentions having only email are resolved with a single email__in query
+    (emails not matching exactly one user are skipped)
+    mentions: List[Mention]
+    """
+    emails = set(mention.email_id for mention in mentions if not mention.user_id)
+    users_by_email = {}
+    if emails:
+        for user_id, email in USERMODEL.objects.filter(email__in=emails).values_list("id", "email"):
+            users_by_email[email] = None if email in users_by_email else user_id
+
+    user_ids = []
+    for mention in mentions:
+        user_id = int(mention.user_id) if mention.user_id else users_by_email.get(mention.email_id)
+        if user_id:
             user_ids.append(user_id)
     return user_ids
 
 
+def extract_tagged_users(*match_strings):
+    """Returns the ids of the users mentioned in the given texts (refer extract_mentions)"""
+    mentions = extract_mentions(*match_strings)
+    if not mentions:
+        return []
+    return resolve_mentions(mentions)
+
+
 def extract_user_info(user_detail):
-    user_info = {}
-    email_pattern = r"<email_id>(([\w.-]+)@([\w.-]+))</email_id>"
-    email_detail = re.compile(email_pattern).search(user_detail)
-    email_id = None
-    if email_detail:
-        email_id = email_detail.group(1)
-    user_info['email_id'] = email_id
-
-    user_id_pattern = r"<user_id>([0-9]+)</user_id>"
-    user_id_detail = re.compile(user_id_pattern).search(user_detail)
-    user_id = None
-    if user_id_detail:
-        user_id = user_id_detail.group(1)
-    user_info['user_id'] = user_id
-    return user_info
+    email_detail = EMAIL_ID_PATTERN.search(user_detail)
+    user_id_detail = USER_ID_PATTERN.search(user_detail)
+    return {
+        "email_id": email_detail.group(1) if email_detail else None,
+        "user_id": user_id_detail.group(1) if user_id_detail else None,
+    }
 
 
 def get_date_range(days):
@@ -783,23 +981,34 @@ def assigned_nomination_post_ids(user):
     return assigned_nomination_post_ids
 
 
-def posts_not_visible_to_user(posts, user, post_polls):
+def posts_not_visible_to_user_query(user, post_polls, viewer=None):
     """
-    Returns List of post ids to exclude
-    params: posts: QuerySet[Post]
+    Returns the combined query matching the posts not visible to the user based on shared_with flag and user type,
+    nominations assigned to the user for review are always visible
     params: user: CustomUser
+    params: post_polls: Bool
+    params: viewer: ViewerContext
     """
-    posts_ids_to_exclude = list(posts_not_shared_with_self_department(posts, user).values_list("id", flat=True))
-    posts_ids_to_exclude.extend(list(admin_feeds_to_exclude(posts, user).values_list("id", flat=True)))
-    posts_ids_to_exclude.extend(list(posts_not_shared_with_org_department(posts, user).values_list("id", flat=True)))
+    viewer = viewer or get_viewer_context(user)
+    exclude_query = posts_not_shared_with_self_department_query(user, viewer.department_ids)
+    exclude_query = admin_feeds_to_exclude_query(user, exclude_query)
     if post_polls:
-        posts_ids_to_exclude.extend(list(shared_with_all_departments_but_not_belongs_to_user_org(
-            posts, user).values_list("id", flat=True)))
-        posts_ids_to_exclude.extend(list(posts_not_shared_with_job_family(posts, user).values_list("id", flat=True)))
+        exclude_query = posts_not_shared_with_job_family_query(user, exclude_query, viewer.job_family_id)
+    exclude_query = posts_not_shared_with_org_department_query(
+        user, viewer.admin_org_ids, viewer.department_ids, exclude_query)
+    if post_polls:
+        exclude_query = shared_with_all_departments_but_not_belongs_to_user_org_query(user, exclude_query)
+    return exclude_query & ~Q(id__in=assigned_nomination_post_ids(user))
+
 
-    posts_ids_not_to_exclude = assigned_nomination_post_ids(user)
-    posts_ids_to_exclude = list(set(posts_ids_to_exclude) - set(posts_ids_not_to_exclude))
-    return posts_ids_to_exclude
+def posts_not_visible_to_user(user, post_polls, viewer=None):
+    """
+    Returns the ids (as sub query) of the posts to exclude, so the exclusion is evaluated in the same SQL statement
+    params: user: CustomUser
+    params: post_polls: Bool
+    params: viewer: ViewerContext
+    """
+    return Post.objects.filter(posts_not_visible_to_user_query(user, post_polls, viewer)).values("id")
 
 
 def posts_shared_with_org_department(user, post_types, excluded_ids):
@@ -845,7 +1054,7 @@ def get_job_families(user, shared_with, data):
     if isinstance(job_families, str) or isinstance(job_families,  unicode):
         job_families = json.loads(job_families)
 
-    return validate_job_families(job_families, user.get_affiliated_orgs())
+    return validate_job_families(job_families, get_viewer_context(user).affiliated_org_ids)
 
 def get_user_localtime(date, org_timezone, date_format="%Y-%m-%d"):
     return timezone.localtime(date, pytz.timezone(org_timezone)).strftime(date_format)
@@ -885,7 +1094,7 @@ def get_related_objects_qs(feeds):
             "user", "transaction", "nomination", "greeting", "ecard", "modified_by", "created_by"
         ).prefetch_related(
             "organizations", "transactions", "cc_users", "departments", "job_families", "tagged_users", "tags",
-            "images_set", "documents_set", "postliked_set", "comment_set")
+            "images_set", "documents_set", "videos_set", "postliked_set", "comment_set")
 
 
 def extract_date_query(query_params):
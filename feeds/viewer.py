@@ -0,0 +1,102 @@
+from __future__ import division, print_function, unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .visibility import get_audience_ids
+
+
+FEEDS_CACHE = caches[getattr(settings, "FEEDS_CACHE_ALIAS", "default")]
+VIEWER_CONTEXT_TIMEOUT = getattr(settings, "FEEDS_VIEWER_CONTEXT_TIMEOUT", 15 * 60)
+# bump it whenever the attributes of ViewerContext change so the old pickles are not read anymore
+VIEWER_CONTEXT_VERSION = 1
+
+
+class ViewerContext(object):
+    """
+    Ids of the relations of the requested user used to build the visibility queries of feeds.utils,
+    built once per user and cached, refer get_viewer_context
+    """
+
+    def __init__(self, user):
+        job_family = user.job_family
+        self.user_id = user.pk
+        self.organization_id = user.organization_id
+        self.is_staff = user.is_staff
+        self.department_ids = list(get_audience_ids(user.cached_departments))
+        self.job_family_id = job_family.id if job_family else None
+        self.admin_org_ids = list(user.child_organizations.values_list("id", flat=True)) if user.is_staff else []
+        self.appreciation_org_ids = list(get_audience_ids(user.orgs_to_access_appreciation))
+        self.affiliated_org_ids = list(user.get_affiliated_orgs().values_list("id", flat=True))
+
+    def is_valid_for(self, user):
+        """Returns False if the context was built before the organization/staff flag of the user changed"""
+        return self.organization_id == user.organization_id and self.is_staff == user.is_staff
+
+
+def get_viewer_generation_key(user_id):
+    return "feeds:viewer:generation:{}".format(user_id)
+
+
+def get_organizations_generation_key():
+    return "feeds:viewer:organizations:generation"
+
+
+def get_viewer_context_key(user_id):
+    """
+    Returns the versioned cache key, the generation of the user changes on every invalidation of the user and the
+    generation of the organizations on every change of the organizations (hierarchy, affiliations)
+    """
+    keys = [get_viewer_generation_key(user_id), get_organizations_generation_key()]
+    generations = FEEDS_CACHE.get_many(keys)
+    for key in keys:
+        if generations.get(key) is None:
+            generations[key] = int(time.time() * 1000)
+            FEEDS_CACHE.add(key, generations[key], None)
+    return "feeds:viewer:v{}:{}:{}:{}".format(
+        VIEWER_CONTEXT_VERSION, user_id, generations[keys[0]], generations[keys[1]])
+
+
+def get_viewer_context(user):
+    """
+    Returns the ViewerContext of the user, it is read from the cache once per request (kept on the user object)
+    user: CustomUser
+    """
+    viewer = getattr(user, "_feeds_viewer_context", None)
+    if viewer is not None:
+        return viewer
+
+    key = get_viewer_context_key(user.pk)
+    viewer = FEEDS_CACHE.get(key)
+    if viewer is None or not viewer.is_valid_for(user):
+        viewer = ViewerContext(user)
+        FEEDS_CACHE.set(key, viewer, VIEWER_CONTEXT_TIMEOUT)
+    user._feeds_viewer_context = viewer
+    return viewer
+
+
+def invalidate_viewer_contexts(user_ids):
+    """
+    Moves the given users to a new cache generation so their cached ViewerContext is not read anymore
+    user_ids: List[int]
+    """
+    for user_id in user_ids:
+        generation_key = get_viewer_generation_key(user_id)
+        try:
+            FEEDS_CACHE.incr(generation_key)
+        except ValueError:
+            FEEDS_CACHE.set(generation_key, int(time.time() * 1000), None)
+
+
+def invalidate_organization_viewer_contexts():
+    """
+    Moves all the users to a new cache generation, the admin / affiliated / appreciation organizations of the
+    users depend on the other organizations (parent, affiliations) so every context is built again
+    """
+    generation_key = get_organizations_generation_key()
+    try:
+        FEEDS_CACHE.incr(generation_key)
+    except ValueError:
+        FEEDS_CACHE.set(generation_key, int(time.time() * 1000), None)
@@ -1,5 +1,6 @@
 from __future__ import division, print_function, unicode_literals
 
+from collections import OrderedDict
 from json import loads
 from django.conf import settings
 from django.db import transaction
@@ -17,22 +18,43 @@ from rest_framework.response import Response
 from feeds.constants import SHARED_WITH
 
 from .filters import PostFilter, PostFilterBase
+from .approvals import get_approvals_count
+from .bulk import PostBulkContext
 from .constants import POST_TYPE, SHARED_WITH
+from .counters import update_comment_like_count
+from .instrumentation import INSTRUMENTATION_ENABLED, InstrumentedViewMixin, get_request_stats, instrument_view
 from .models import (
     Comment, Documents, ECard, ECardCategory,
-    Post, PostLiked, PollsAnswer, Images, CommentLiked,
+    Post, PostLiked, PollsAnswer, Images, CommentLiked, PostStrength,
 )
-from .paginator import FeedsResultsSetPagination, FeedsCommentsSetPagination
-from .permissions import IsOptionsOrAuthenticated
+from .paginator import (
+    FeedsCommentsSetPagination, FeedsCursorPagination, FeedsResultsSetPagination, is_cursor_pagination,
+)
+from .permissions import IsOptionsOrAuthenticated, IsOptionsOrStaff
+from .reactions import (
+    REACTION_BATCH_SIZE, get_post_reactions_summary, parse_reaction_type, set_post_reaction, toggle_post_reaction,
+)
+from .response_cache import (
+    ORG_RECO_CACHE_ENABLED, cache_org_reco_response, get_cached_org_reco_response, get_org_reco_cache_key,
+    get_org_reco_cache_stats, get_org_reco_generation, is_org_reco_cacheable, overlay_viewer_fields,
+    record_org_reco_cache_event,
+)
+from .strengths import posts_with_strength
+from .thumbnails import get_thumbnail_url_cache_stats
+from .timeline import is_timeline_enabled
+from .uploads import (
+    StreamingUploadMixin, get_upload_files, get_uploads, save_uploads, upload_files, validate_uploads,
+)
+from .viewer import get_viewer_context
 from .serializers import (
     CommentDetailSerializer, CommentSerializer, CommentCreateSerializer,
-    DocumentsSerializer, ECardCategorySerializer, ECardSerializer,
+    ECardCategorySerializer, ECardSerializer,
     FlagPostSerializer, PostLikedSerializer, PostSerializer,
-    PostDetailSerializer, PollsAnswerSerializer, ImagesSerializer,
-    UserInfoSerializer, VideosSerializer, PostFeedSerializer, GreetingSerializer, OrganizationRecognitionSerializer
+    PostDetailSerializer, PollsAnswerSerializer,
+    UserInfoSerializer, PostFeedSerializer, GreetingSerializer, OrganizationRecognitionSerializer
 )
 from .utils import (
-    accessible_posts_by_user, extract_tagged_users, get_user_name, notify_new_comment,
+    accessible_posts_by_user, can_view_post, extract_tagged_users, get_user_name, notify_new_comment_async,
     notify_new_post_poll_created, notify_flagged_post, push_notification, tag_users_to_comment,
     tag_users_to_post, user_can_delete, user_can_edit, get_date_range, since_last_appreciation,
     get_current_month_end_date, get_absolute_url, posts_not_visible_to_user,
@@ -69,7 +91,7 @@ def is_appreciation_post(post_id):
         return False
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(InstrumentedViewMixin, StreamingUploadMixin, viewsets.ModelViewSet):
     parser_classes = (MultiPartParser, JSONParser, FormParser,)
     permission_classes = (IsOptionsOrAuthenticated,)
     pagination_class = FeedsResultsSetPagination
@@ -78,29 +100,43 @@ class PostViewSet(viewsets.ModelViewSet):
     def custom_paginated_queryset(self, result):
         result = PostFilter(self.request.GET, queryset=result).qs
         page = self.paginate_queryset(result)
-        serializer = self.get_serializer(page, many=True)
+        serializer = self.get_serializer(page, many=True, context={"bulk": PostBulkContext(page, self.request.user)})
         return self.get_paginated_response(serializer.data)
 
     def list(self, request, *args, **kwargs):
         query_params = self.request.query_params
         post_id = self.kwargs.get("pk", None)
         user = self.request.user
+        cursor_pagination = is_cursor_pagination(request)
+        if cursor_pagination:
+            self.pagination_class = FeedsCursorPagination
+        viewer = get_viewer_context(user)
+        timeline = not post_id and is_timeline_enabled(user.organization)
         result, post_query, exclusion_query = post_api_query(
-            self.request.version, user, post_id, is_appreciation_post(post_id) if post_id else False, query_params)
+            self.request.version, user, post_id, is_appreciation_post(post_id) if post_id else False, query_params,
+            timeline, viewer)
+        if cursor_pagination:
+            # pages are resolved by keyset, the fallback is decided on the first rows instead of the count
+            if not timeline and self.paginator.has_fewer_rows(
+                    PostFilter(self.request.GET, queryset=result).qs, request):
+                result = fetch_feeds(
+                    post_query, exclusion_query, ('-priority', '-modified_on', '-created_on'), user, viewer)
+            return self.custom_paginated_queryset(result)
         try:
             response = self.custom_paginated_queryset(result).data
         except NotFound:
             response = {}
-        if response.get("count", 0) < query_params.get("page_size", settings.FEEDS_PAGE_SIZE):
+        # the timelines are read once, the posts of the period only (no fallback to the whole visibility query)
+        if not timeline and response.get("count", 0) < query_params.get("page_size", settings.FEEDS_PAGE_SIZE):
             feeds = fetch_feeds(
-                post_query, exclusion_query, ('-priority', '-modified_on', '-created_on'), user)
+                post_query, exclusion_query, ('-priority', '-modified_on', '-created_on'), user, viewer)
             response = self.custom_paginated_queryset(feeds).data
         return Response(response)
 
     def _create_or_update(self, request, create=False):
         payload = request.data
         current_user = self.request.user
-        affiliated_orgs = current_user.get_affiliated_orgs()
+        affiliated_org_ids = get_viewer_context(current_user).affiliated_org_ids
         if not current_user:
             raise serializers.ValidationError({'created_by': _('Created by is required!')})
 
@@ -111,13 +147,14 @@ class PostViewSet(viewsets.ModelViewSet):
         for key, value in payload.items():
             if key in ["organizations", "departments", "job_families"] and isinstance(payload.get(key), unicode):
                 val = loads(value)
-                if key in ["organizations"] and val and affiliated_orgs.filter(id__in=val).count() != len(val):
+                if key in ["organizations"] and val and len(
+                        set(affiliated_org_ids).intersection(int(org_id) for org_id in val)) != len(val):
                     raise serializers.ValidationError(_("Invalid organization id"))
                 data.update({key: val})
                 continue
             data.update({key: value})
 
-        if current_user.organization not in affiliated_orgs:
+        if current_user.organization_id not in affiliated_org_ids:
             raise serializers.ValidationError(_(
                 "User is not allowed to create post for different organization"
             ))
@@ -125,19 +162,7 @@ class PostViewSet(viewsets.ModelViewSet):
         delete_image_ids = data.get('delete_image_ids', None)
         delete_document_ids = data.get('delete_document_ids', None)
 
-        tag_users = []
-        title_str = data.get('title', None)
-        if title_str:
-            title_tagged = extract_tagged_users(title_str)
-            if title_tagged:
-                tag_users.extend(title_tagged)
-
-        description_str = data.get('description', None)
-        if description_str:
-            description_tagged = extract_tagged_users(description_str)
-            if description_tagged:
-                tag_users.extend(description_tagged)
-
+        tag_users = extract_tagged_users(data.get('title', None), data.get('description', None))
         if tag_users:
             data['tag_users'] = tag_users
 
@@ -179,39 +204,18 @@ class PostViewSet(viewsets.ModelViewSet):
 
         return data
 
-    def _upload_files(self, request, post_id):
-        images = dict((request.FILES).lists()).get('images', None)
-        if images:
-            for img in images:
-                data = {'post': post_id}
-                data['image'] = img
-                image_serializer = ImagesSerializer(data=data)
-                image_serializer.is_valid(raise_exception=True)
-                image_serializer.save()
-
-        documents = dict((request.FILES).lists()).get('documents', None)
-        if documents:
-            for doc in documents:
-                data = {'post': post_id}
-                data['document'] = doc
-                document_serializer = DocumentsSerializer(data=data)
-                if document_serializer.is_valid():
-                    document_serializer.save()
-                else:
-                    return Response({'message': 'Document not uploaded'},
-                                    status=status.HTTP_400_BAD_REQUEST)
-
-        videos = dict((request.FILES).lists()).get('videos', None)
-        if videos:
-            for video in videos:
-                data = {'post': post_id}
-                data['video'] = video
-                video_serializer = VideosSerializer(data=data)
-                if video_serializer.is_valid():
-                    video_serializer.save()
-                else:
-                    return Response({'message': 'Video not uploaded'},
-                                    status=status.HTTP_400_BAD_REQUEST)
+    @staticmethod
+    def _get_uploads(request):
+        """Returns the files of the request validated before the post is saved, refer _upload_files"""
+        uploads = get_uploads(get_upload_files(request)) if request.FILES else []
+        validate_uploads(uploads)
+        return uploads
+
+    @staticmethod
+    def _upload_files(uploads, post):
+        for upload in uploads:
+            upload.instance.post = post
+        return save_uploads(uploads, {"post_id": post.pk}, raise_exception=True)
 
     def save_custom_tags(self, tags, organization):
         try:
@@ -229,8 +233,8 @@ class PostViewSet(viewsets.ModelViewSet):
         tags = data.get('tags', None)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
+        uploads = self._get_uploads(request)
         instance = serializer.save()
-        post_id = instance.id
         if tag_users:
             tag_users_to_post(instance, tag_users)
 
@@ -239,8 +243,8 @@ class PostViewSet(viewsets.ModelViewSet):
             self.save_custom_tags(tags, request.user.organization)
             instance.tags.set(*tags)
 
-        if request.FILES:
-            self._upload_files(request, post_id)
+        if uploads:
+            self._upload_files(uploads, instance)
 
         notify_new_post_poll_created(instance, True)
         return Response(serializer.data)
@@ -250,6 +254,7 @@ class PostViewSet(viewsets.ModelViewSet):
         user = request.user
         if not user_can_edit(user, instance):
             raise serializers.ValidationError(_("You do not have permission to edit"))
+        uploads = self._get_uploads(request)
         data = self._create_or_update(request)
         tag_users = data.get('tag_users', None)
         if "job_families" in data and int(data.get("shared_with")) == SHARED_WITH.ORGANIZATION_DEPARTMENTS:
@@ -283,8 +288,8 @@ class PostViewSet(viewsets.ModelViewSet):
             tags = list(tags.split(","))
             self.save_custom_tags(tags, user.organization)
             instance.tags.set(*tags)
-        if request.FILES:
-            self._upload_files(request, instance.pk)
+        if uploads:
+            self._upload_files(uploads, instance)
         self.perform_update(serializer)
         return Response(self.get_serializer(Post.objects.get(id=instance.id)).data)
 
@@ -293,7 +298,8 @@ class PostViewSet(viewsets.ModelViewSet):
         user = request.user
         if not user_can_delete(user, instance):
             raise serializers.ValidationError(_("You do not have permission to delete"))
-        appreciation_trxns = instance.transactions.filter(organization_id__in=user.get_affiliated_orgs())
+        appreciation_trxns = instance.transactions.filter(
+            organization_id__in=get_viewer_context(user).affiliated_org_ids)
         message = "reverting transaction for appreciation post {}".format(instance.title)
         if request.data.get("revert_transaction", False):
             reason, _ = PointsTable.objects.get_or_create(
@@ -327,7 +333,7 @@ class PostViewSet(viewsets.ModelViewSet):
             serializer_class = PostDetailSerializer
         else:
             serializer_class = PostSerializer
-        kwargs["context"] = {"request": self.request}
+        kwargs["context"] = dict(kwargs.get("context", {}), request=self.request)
         return serializer_class(*args, **kwargs)
 
     def get_queryset(self):
@@ -348,7 +354,7 @@ class PostViewSet(viewsets.ModelViewSet):
             query.add(Q(departments__in=departments, created_by__departments__in=departments), query.connector)
         else:
             if allow_feedback and user.is_staff:
-                org = list(user.child_organizations.values_list("id", flat=True))
+                org = get_viewer_context(user).admin_org_ids
             result = accessible_posts_by_user(
                 user,
                 org,
@@ -361,7 +367,8 @@ class PostViewSet(viewsets.ModelViewSet):
             if user.is_staff:
                 query.add(Q(
                     mark_delete=False,
-                    post_type=POST_TYPE.USER_CREATED_POST, created_by__organizations__in=user.child_organizations), Q.OR
+                    post_type=POST_TYPE.USER_CREATED_POST,
+                    created_by__organizations__in=get_viewer_context(user).admin_org_ids), Q.OR
                 )
             result = Post.objects.filter(query)
 
@@ -406,7 +413,7 @@ class PostViewSet(viewsets.ModelViewSet):
             raise ValidationError(_("You are not authorised to create the poll"))
         payload = self.request.data
         data = {k: v for k, v in payload.items()}
-        if user.organization not in user.get_affiliated_orgs():
+        if user.organization_id not in get_viewer_context(user).affiliated_org_ids:
             raise serializers.ValidationError(_(
                 "User is not allowed to create post for different organization"
             ))
@@ -449,10 +456,17 @@ class PostViewSet(viewsets.ModelViewSet):
 
     @staticmethod
     def get_post_by_id(user, org, allow_feedback, appreciations, post_id, query):
+        """
+        Returns the post matching the query if it is accessible by the user (refer can_view_post), the appreciation
+        rule matches the appreciation posts only so appreciations=True can be passed for any post
+        """
         try:
-            return accessible_posts_by_user(user, org, allow_feedback, appreciations, post_id).distinct().get(query)
+            post = Post.objects.select_related("created_by").get(query)
         except Post.DoesNotExist:
             raise ValidationError(_('You do not have access'))
+        if not can_view_post(user, post, org, allow_feedback, appreciations):
+            raise ValidationError(_('You do not have access'))
+        return post
 
     @detail_route(methods=["GET", "POST"], permission_classes=(IsOptionsOrAuthenticated,))
     def comments(self, request, *args, **kwargs):
@@ -466,20 +480,19 @@ class PostViewSet(viewsets.ModelViewSet):
             self.pagination_class = FeedsCommentsSetPagination
         else:
             allow_feedback = False
+        if is_cursor_pagination(request):
+            self.pagination_class = FeedsCursorPagination
         user = self.request.user
         post_id = self.kwargs.get("pk", None)
         if not post_id:
             raise ValidationError(_('Post ID required to retrieve all the related comments'))
         post_id = int(post_id)
-        org = (
-            list(user.child_organizations.values_list("id", flat=True))
-            if allow_feedback and user.is_staff else user.organization
-        )
+        org = get_viewer_context(user).admin_org_ids if allow_feedback and user.is_staff else user.organization
         query = Q(id=post_id, mark_delete=False)
         if self.request.method == "POST" and allow_feedback and not user.is_staff:
             query = query & Q(created_by=user)
 
-        post = self.get_post_by_id(user, org, allow_feedback, is_appreciation_post(post_id), post_id, query)
+        post = self.get_post_by_id(user, org, allow_feedback, True, post_id, query)
 
         if self.request.method == "GET":
             serializer_context = {'request': self.request}
@@ -524,32 +537,30 @@ class PostViewSet(viewsets.ModelViewSet):
             data['modified_by'] = self.request.user.id
             serializer = CommentCreateSerializer(data=data)
             serializer.is_valid(raise_exception=True)
+            # for feedback post, we need to allow the images and documents, validated before the comment is saved
+            uploads = get_uploads(get_upload_files(request, ["images", "documents"])) if allow_feedback else []
+            validate_uploads(uploads)
             inst = serializer.save()
 
-            # for feedback post, we need to allow the images and documents
-            if allow_feedback and request.FILES:
-                attach_files = dict((request.FILES).lists())
-                images = attach_files.get('images', None)
-                documents = attach_files.get('documents', None)
-
-                if images:
-                    for image in images:
-                        image_serializer = ImagesSerializer(data={"comment": inst.pk, 'image': image})
-                        image_serializer.is_valid(raise_exception=True)
-                        image_serializer.save()
-
-                if documents:
-                    for document in documents:
-                        document_serializer = DocumentsSerializer(data={"comment": inst.pk, "document": document})
-                        document_serializer.is_valid(raise_exception=True)
-                        document_serializer.save()
+            if uploads:
+                for upload in uploads:
+                    upload.instance.comment = inst
+                save_uploads(uploads, {"comment_id": inst.pk}, raise_exception=True)
 
             if tag_users:
                 tag_users_to_comment(inst, tag_users)
             if post:
-                notify_new_comment(inst, self.request.user)
+                notify_new_comment_async(inst)
             return Response(serializer.data)
 
+    def _notify_reaction(self, request, post, reaction_type):
+        user = request.user
+        if request.version >= 12 and user == post.created_by:
+            return
+        notif_message = _("'%s' likes your post" % (get_user_name(user)))
+        push_notification(user, notif_message, post.created_by, object_type=NOTIFICATION_OBJECT_TYPE,
+                          object_id=post.id, extra_context={"reaction_type": reaction_type})
+
     @detail_route(methods=["POST"], permission_classes=(IsOptionsOrAuthenticated,))
     def appreciate(self, request, *args, **kwargs):
         user = self.request.user
@@ -559,49 +570,64 @@ class PostViewSet(viewsets.ModelViewSet):
             raise ValidationError(_('Post ID required to appreciate a post'))
         post_id = int(post_id)
         organization = user.organization
-        post = self.get_post_by_id(user, organization, False, is_appreciation_post(post_id), post_id, Q(id=post_id))
-        reaction_type = self.request.data.get('type', 0)  # to handle existing workflow
-        object_type = NOTIFICATION_OBJECT_TYPE
-        post_liked = PostLiked.objects.filter(post_id=post_id, created_by=user)
-        if post_liked.exists():
-            user_reactions = post_liked.filter(reaction_type=reaction_type)
-            if user_reactions.exists():
-                user_reactions.delete()
-                liked = False
-                message = "Successfully Removed Reaction"
-            else:
-                liked = True
-                message = "Successfully Added Reaction"
-                PostLiked.objects.filter(post_id=post_id, created_by=user).update(reaction_type=reaction_type)
-            post_object = PostLiked.objects.filter(post_id=post_id, created_by=user).first()
-            response_status = status.HTTP_200_OK
-        else:
-            post_object = PostLiked.objects.create(post_id=post_id, created_by=user, reaction_type=reaction_type)
-            message = "Successfully Added Reaction"
-            liked = True
-            response_status = status.HTTP_201_CREATED
-            user_name = get_user_name(user)
-            if post:
-                send_notification = True
-                if request.version >= 12 and user == post.created_by:
-                    send_notification = False
-                if send_notification:
-                    notif_message = _("'%s' likes your post" % (user_name))
-                    push_notification(user, notif_message, post.created_by, object_type=object_type,
-                                      object_id=post.id, extra_context={"reaction_type": reaction_type})
-        count = PostLiked.objects.filter(post_id=post_id).count()
-        user_info = UserInfoSerializer(user).data
-
-        post_reactions = list()
-        post_likes = PostLiked.objects.filter(post_id=post_id)
-        if post_likes.exists():
-            post_reactions = post_likes.values('reaction_type').annotate(
-                reaction_count=Count('reaction_type')).order_by('-reaction_count')[:2]
+        post = self.get_post_by_id(user, organization, False, True, post_id, Q(id=post_id))
+        reaction_type = parse_reaction_type(self.request.data.get('type', 0))  # to handle existing workflow
+        change = toggle_post_reaction(post_id, user, reaction_type)
+        if change.created:
+            self._notify_reaction(request, post, reaction_type)
+        count, post_reactions = get_post_reactions_summary(post_id)
 
         return Response({
-            "message": message, "liked": liked, "count": count, "user_info": user_info,
-            "reaction_type": post_object.reaction_type if post_object else None, "post_reactions": post_reactions},
-            status=response_status)
+            "message": "Successfully Added Reaction" if change.liked else "Successfully Removed Reaction",
+            "liked": change.liked, "count": count, "user_info": UserInfoSerializer(user).data,
+            "reaction_type": change.reaction_type, "post_reactions": post_reactions},
+            status=status.HTTP_201_CREATED if change.created else status.HTTP_200_OK)
+
+    @list_route(methods=["POST"], permission_classes=(IsOptionsOrAuthenticated,))
+    def appreciate_batch(self, request, *args, **kwargs):
+        """
+        Sets the reactions of the user on multiple posts e.g. the reactions queued by the offline clients,
+        {"reactions": [{"post": <post id>, "type": <reaction type, null to remove the reaction>}, ...]}
+        the last reaction of the post wins, returns the result of every post
+        """
+        user = self.request.user
+        reactions = self.request.data.get("reactions", None)
+        if not isinstance(reactions, list) or not reactions:
+            raise ValidationError(_('reactions is a required parameter.'))
+        if len(reactions) > REACTION_BATCH_SIZE:
+            raise ValidationError(_('Maximum %d reactions are allowed.' % REACTION_BATCH_SIZE))
+
+        post_reaction_types = OrderedDict()
+        for reaction in reactions:
+            try:
+                post_id = int(reaction.get("post"))
+            except (AttributeError, TypeError, ValueError):
+                raise ValidationError(_('post should be numeric value.'))
+            reaction_type = reaction.get("type", None)
+            post_reaction_types[post_id] = None if reaction_type is None else parse_reaction_type(reaction_type)
+
+        # same access rule as appreciate (refer get_post_by_id), the viewer context is read once for the batch
+        viewer = get_viewer_context(user)
+        posts = {
+            post.id: post
+            for post in Post.objects.filter(id__in=list(post_reaction_types)).select_related("created_by")
+            if can_view_post(user, post, user.organization, False, True, viewer)
+        }
+
+        results = []
+        for post_id, reaction_type in post_reaction_types.items():
+            post = posts.get(post_id)
+            if post is None:
+                results.append({"post": post_id, "error": _('You do not have access')})
+                continue
+            change = set_post_reaction(post_id, user, reaction_type)
+            if change.created:
+                self._notify_reaction(request, post, reaction_type)
+            count, post_reactions = get_post_reactions_summary(post_id)
+            results.append({
+                "post": post_id, "liked": change.liked, "reaction_type": change.reaction_type, "count": count,
+                "post_reactions": post_reactions})
+        return Response({"results": results})
 
     @detail_route(methods=["GET"], permission_classes=(permissions.IsAuthenticated,))
     def appreciated_by(self, request, *args, **kwargs):
@@ -675,7 +701,7 @@ class PostViewSet(viewsets.ModelViewSet):
         payload = self.request.data
         data = {k: v for k, v in payload.items()}
         post = self.get_post_by_id(
-            user, user.organization, False, is_appreciation_post(post_id), post_id, Q(id=post_id))
+            user, user.organization, False, True, post_id, Q(id=post_id))
         data["flagger"] = user.id
         data["post"] = post_id
         serializer = FlagPostSerializer(data=data)
@@ -712,7 +738,7 @@ class PostViewSet(viewsets.ModelViewSet):
         recent = request.query_params.get("recent", None)
         reaction_type = request.query_params.get("reaction_type", None)
         # Q(organizations__in=user.get_affiliated_orgs()) | Q(organizations__isnull=True)
-        post = self.get_post_by_id(user, organization, False, is_appreciation_post(post_id), post_id, Q(id=post_id))
+        post = self.get_post_by_id(user, organization, False, True, post_id, Q(id=post_id))
         post_likes = post.postliked_set.all().order_by("-id")
         all_reaction_count = post_likes.count()
         if recent:
@@ -732,28 +758,15 @@ class PostViewSet(viewsets.ModelViewSet):
         return post_reactions
 
 
-class ImagesView(views.APIView):
+class ImagesView(StreamingUploadMixin, views.APIView):
     parser_classes = (MultiPartParser,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, *args, **kwargs):
-        post_id = request.data['post_id']
-        images = dict((request.data).lists())['images']
-        flag = 1
-        arr = []
-        for img in images:
-            data = {'post': post_id}
-            data['image'] = img
-            image_serializer = ImagesSerializer(data=data)
-            if image_serializer.is_valid():
-                image_serializer.save()
-                arr.append(image_serializer.data)
-            else:
-                flag = 0
-        if flag == 1:
-            return Response(arr, status=status.HTTP_201_CREATED)
-        else:
-            return Response(arr, status=status.HTTP_400_BAD_REQUEST)
+        results = upload_files(get_upload_files(request, ["images"]), post_id=request.data['post_id'])
+        if any("errors" in result for result in results):
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results, status=status.HTTP_201_CREATED)
 
 
 class ImagesDetailView(views.APIView):
@@ -773,31 +786,18 @@ class ImagesDetailView(views.APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class VideosView(views.APIView):
+class VideosView(StreamingUploadMixin, views.APIView):
     parser_classes = (MultiPartParser,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def post(self, request, *args, **kwargs):
-        post_id = request.data['post_id']
-        videos = dict((request.data).lists())['videos']
-        flag = 1
-        arr = []
-        for video in videos:
-            data = {'post': post_id}
-            data['video'] = video
-            video_serializer = VideosSerializer(data=data)
-            if video_serializer.is_valid():
-                video_serializer.save()
-                arr.append(video_serializer.data)
-            else:
-                flag = 0
-        if flag == 1:
-            return Response(arr, status=status.HTTP_201_CREATED)
-        else:
-            return Response(arr, status=status.HTTP_400_BAD_REQUEST)
+        results = upload_files(get_upload_files(request, ["videos"]), post_id=request.data['post_id'])
+        if any("errors" in result for result in results):
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results, status=status.HTTP_201_CREATED)
 
 
-class CommentViewset(viewsets.ModelViewSet):
+class CommentViewset(InstrumentedViewMixin, viewsets.ModelViewSet):
     permission_classes = (IsOptionsOrAuthenticated,)
 
     def get_serializer(self, *args, **kwargs):
@@ -851,7 +851,11 @@ class CommentViewset(viewsets.ModelViewSet):
             user_reactions = CommentLiked.objects.filter(
                 comment_id=comment_id, created_by=user, reaction_type=reaction_type)
             if user_reactions.exists():
-                user_reactions.delete()
+                with transaction.atomic():
+                    # locked so the reactions removed by a concurrent request are not taken out of like_count twice
+                    removed_ids = list(user_reactions.select_for_update().values_list("id", flat=True))
+                    CommentLiked.objects.filter(id__in=removed_ids).delete()
+                    update_comment_like_count(comment_id, -len(removed_ids))
                 message = "Successfully Removed Reaction"
                 liked = False
                 response_status = status.HTTP_200_OK
@@ -860,7 +864,9 @@ class CommentViewset(viewsets.ModelViewSet):
                 message = "Successfully Added Reaction"
                 CommentLiked.objects.filter(comment_id=comment_id, created_by=user).update(reaction_type=reaction_type)
         else:
-            CommentLiked.objects.create(comment_id=comment_id, created_by=user, reaction_type=reaction_type)
+            with transaction.atomic():
+                CommentLiked.objects.create(comment_id=comment_id, created_by=user, reaction_type=reaction_type)
+                update_comment_like_count(comment_id, 1)
             message = "Successfully Liked"
             liked = True
             response_status = status.HTTP_200_OK
@@ -891,6 +897,7 @@ class CommentViewset(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @permission_classes((IsOptionsOrAuthenticated,))
+@instrument_view
 def search_user(request):
     """
     Search users based on the search term
@@ -914,6 +921,21 @@ def search_user(request):
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes((IsOptionsOrStaff,))
+def feeds_stats(request):
+    """
+    Returns the per view/action/API version request stats of this process (FEEDS_INSTRUMENTATION_ENABLED)
+    and the hit/miss/bypass counters of the organization recognitions cache and the thumbnail url cache
+    """
+    return Response({
+        "instrumentation_enabled": INSTRUMENTATION_ENABLED,
+        "requests": get_request_stats(),
+        "organization_recognitions_cache": get_org_reco_cache_stats(),
+        "thumbnail_url_cache": get_thumbnail_url_cache_stats(),
+    })
+
+
 class ECardCategoryViewSet(viewsets.ModelViewSet):
     queryset = ECardCategory.objects.none()
     serializer_class = ECardCategorySerializer
@@ -972,7 +994,7 @@ class ECardViewSet(viewsets.ModelViewSet):
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
-class UserFeedViewSet(viewsets.ModelViewSet):
+class UserFeedViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     parser_classes = (JSONParser,)
     permission_classes = (IsOptionsOrAuthenticated,)
     serializer_class = PostFeedSerializer
@@ -989,14 +1011,14 @@ class UserFeedViewSet(viewsets.ModelViewSet):
         params: user: CustomUser
         params: post_polls: Bool
         """
-        return feeds.exclude(id__in=posts_not_visible_to_user(feeds, user, post_polls))
+        return feeds.exclude(id__in=posts_not_visible_to_user(user, post_polls))
 
     @staticmethod
     def get_user_by_id(user_id, requested_user):
         """Returns the user by id provided"""
         try:
             user = CustomUser.objects.get(id=user_id, is_active=True)
-            if user.organization not in requested_user.get_affiliated_orgs():
+            if user.organization_id not in get_viewer_context(requested_user).affiliated_org_ids:
                 raise CustomUser.DoesNotExist
         except (CustomUser.DoesNotExist, ValueError):
             raise ValidationError("Invalid user id")
@@ -1021,7 +1043,7 @@ class UserFeedViewSet(viewsets.ModelViewSet):
         if feed_flag == "post_polls":
             feeds = posts.filter(post_type__in=[POST_TYPE.USER_CREATED_POST,
                                                 POST_TYPE.USER_CREATED_POLL], created_by=user)
-            feeds = feeds.exclude(id__in=posts_not_visible_to_user(feeds, self.request.user, True))
+            feeds = feeds.exclude(id__in=posts_not_visible_to_user(self.request.user, True))
             feeds = PostFilter(self.request.GET, queryset=feeds).qs
             return feeds.distinct()
         else:
@@ -1066,16 +1088,12 @@ class UserFeedViewSet(viewsets.ModelViewSet):
         show_approvals = False
         supervisor_remaining_budget = ""
         page = self.paginate_queryset(self.get_queryset())
-        serializer = PostFeedSerializer(page, context={"request": request}, many=True)
+        serializer = PostFeedSerializer(
+            page, context={"request": request, "bulk": PostBulkContext(page, request.user)}, many=True)
         user_id = self.request.query_params.get("user_id", None)
         requested_user = self.request.user
         user = self.get_user_by_id(user_id, requested_user) if user_id else requested_user
-        organization = user.organization
-        posts = self.get_queryset()
-        approvals_count = posts.filter(
-            Q(nomination__assigned_reviewer=user) | Q(nomination__alternate_reviewer=user),
-            post_type=POST_TYPE.USER_CREATED_NOMINATION
-        ).exclude(nomination__nom_status__in=[NOMINATION_STATUS.approved, NOMINATION_STATUS.rejected]).distinct().count()
+        approvals_count = get_approvals_count(user)
         if approvals_count > 0 or user.is_nomination_reviewer:
             show_approvals = True
         if user.supervisor_remaining_budget is not None:
@@ -1102,14 +1120,12 @@ class UserFeedViewSet(viewsets.ModelViewSet):
             except ValueError:
                 raise ValidationError(_('strength should be numeric value.'))
 
-            posts = accessible_posts_by_user(user, organization, False, True, None).distinct()
-            user_appreciations = posts.filter(
-                user=user, post_type=POST_TYPE.USER_CREATED_APPRECIATION).values(
-                'transactions__context', 'transactions__creator')
-
-            my_appreciations_user = [user_appreciation.get('transactions__creator') for user_appreciation in
-                                     user_appreciations if loads(user_appreciation.get('transactions__context') or '{}').get(
-                'strength_id') == strength_id]
+            posts = accessible_posts_by_user(user, organization, False, True, None)
+            # senders of the transactions having the strength
+            my_appreciations_user = PostStrength.objects.filter(
+                user_strength_id=strength_id, post__in=posts.filter(
+                    user=user, post_type=POST_TYPE.USER_CREATED_APPRECIATION).values("id")
+            ).values_list('transaction__creator', flat=True)
 
         if badge_id:
             try:
@@ -1145,10 +1161,7 @@ class UserFeedViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(created_by=user)
         else:
             raise ValidationError(_('User does not exist'))
-        transactions = queryset.values('id', 'transactions__context')
-        posts = [transaction.get('id') for transaction in transactions if loads(
-            transaction.get('transactions__context') or '{}').get('strength_id') == strength_id]
-        queryset = queryset.filter(id__in=posts)
+        queryset = queryset.filter(id__in=posts_with_strength(strength_id))
         serializer = PostFeedSerializer(queryset, many=True, context={"request": request}, fields=[
             "id", "ecard", "gif", "images", "description", "points", "images_with_ecard"])
         return Response({"strengths": serializer.data})
@@ -1192,7 +1205,8 @@ class UserFeedViewSet(viewsets.ModelViewSet):
         feeds = feeds.filter(created_on__gte=start_date, created_on__lte=end_date)[:5]
         feeds = get_related_objects_qs(feeds)
         page = self.paginate_queryset(feeds)
-        serializer = PostFeedSerializer(page, context={"request": request}, many=True)
+        serializer = PostFeedSerializer(
+            page, context={"request": request, "bulk": PostBulkContext(page, request.user)}, many=True)
         feeds = self.get_paginated_response(serializer.data)
         user_appreciation = posts.filter(post_type=POST_TYPE.USER_CREATED_APPRECIATION,
                                          created_by=request.user).first()
@@ -1202,10 +1216,7 @@ class UserFeedViewSet(viewsets.ModelViewSet):
                 feeds.data['days_passed'] = days_passed
                 show_cheer_msg = True
 
-        approvals_count = posts.filter(
-            Q(nomination__assigned_reviewer=user) | Q(nomination__alternate_reviewer=user),
-            post_type=POST_TYPE.USER_CREATED_NOMINATION
-        ).exclude(nomination__nom_status__in=[NOMINATION_STATUS.approved, NOMINATION_STATUS.rejected]).distinct().count()
+        approvals_count = get_approvals_count(user)
         if approvals_count > 0 or user.is_nomination_reviewer:
             show_approvals = True
         feeds.data['approvals_count'] = approvals_count
@@ -1233,23 +1244,22 @@ class UserFeedViewSet(viewsets.ModelViewSet):
             return Post.objects.none()
 
         strength_id = int(strength_id) if isinstance(strength_id, (str, unicode)) else strength_id
-        feeds = feeds.filter(transactions__context__isnull=False, transactions__isnull=False)
-        return PostFilterBase(self.request.GET, queryset=feeds.filter(id__in=[
-            feed.get("id")
-            for feed in feeds.values("transactions__context", "id")
-            if loads(feed.get("transactions__context") or '{}').get("strength_id") == strength_id
-        ])).qs
+        return PostFilterBase(self.request.GET, queryset=feeds.filter(id__in=posts_with_strength(strength_id))).qs
 
-    def load_posts(self, request, post_polls, greeting, feeds, filter_appreciations):
+    def filter_posts(self, post_polls, greeting, feeds, filter_appreciations):
         if post_polls is None and greeting is None:
             if self.request.GET.get("user_strength", 0):
                 filter_appreciations = self.filter_appreciations(feeds)
         feeds = PostFilter(self.request.GET, queryset=feeds).qs
         if filter_appreciations.exists():
             feeds = (feeds | filter_appreciations)
-        page = self.paginate_queryset(feeds.distinct())
+        return feeds.distinct()
+
+    def load_posts(self, request, post_polls, greeting, feeds, filter_appreciations):
+        page = self.paginate_queryset(self.filter_posts(post_polls, greeting, feeds, filter_appreciations))
         serializer = GreetingSerializer if greeting else OrganizationRecognitionSerializer
-        serializer = serializer(page, context={"request": request}, many=True)
+        serializer = serializer(
+            page, context={"request": request, "bulk": PostBulkContext(page, request.user)}, many=True)
         return self.get_paginated_response(serializer.data)
 
     @list_route(methods=["GET"], permission_classes=(IsOptionsOrAuthenticated,))
@@ -1259,15 +1269,36 @@ class UserFeedViewSet(viewsets.ModelViewSet):
         greeting = request.query_params.get("greeting", None)
         query_params = request.query_params
         filter_appreciations = Post.objects.none()
+        viewer = get_viewer_context(user)
+        cache_key = None
+        if ORG_RECO_CACHE_ENABLED:
+            generation = get_org_reco_generation(user.organization_id)
+            if is_org_reco_cacheable(request, user, generation):
+                cache_key = get_org_reco_cache_key(request, user, viewer, generation)
+                response = get_cached_org_reco_response(cache_key)
+                if response is not None:
+                    return Response(overlay_viewer_fields(response, user))
+            else:
+                record_org_reco_cache_event("bypass")
         feeds, post_query, exclusion_query = org_reco_api_query(
-            user, post_polls, request.version, greeting, query_params)
-        try:
-            response = self.load_posts(request, post_polls, greeting, feeds, filter_appreciations).data
-        except NotFound:
-            response = {}
-        if response.get("count", 0) < query_params.get("page_size", settings.FEEDS_PAGE_SIZE):
-            feeds = fetch_feeds(post_query, exclusion_query, ('-priority', '-created_on'), user)
+            user, post_polls, request.version, greeting, query_params, viewer)
+        if is_cursor_pagination(request):
+            # pages are resolved by keyset, the fallback is decided on the first rows instead of the count
+            self.pagination_class = FeedsCursorPagination
+            posts = self.filter_posts(post_polls, greeting, feeds, filter_appreciations)
+            if self.paginator.has_fewer_rows(posts, request):
+                feeds = fetch_feeds(post_query, exclusion_query, ('-priority', '-created_on'), user, viewer)
             response = self.load_posts(request, post_polls, greeting, feeds, filter_appreciations).data
+        else:
+            try:
+                response = self.load_posts(request, post_polls, greeting, feeds, filter_appreciations).data
+            except NotFound:
+                response = {}
+            if response.get("count", 0) < query_params.get("page_size", settings.FEEDS_PAGE_SIZE):
+                feeds = fetch_feeds(post_query, exclusion_query, ('-priority', '-created_on'), user, viewer)
+                response = self.load_posts(request, post_polls, greeting, feeds, filter_appreciations).data
+        if cache_key:
+            response = cache_org_reco_response(cache_key, response)
         return Response(response)
 
 
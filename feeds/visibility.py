@@ -0,0 +1,173 @@
+from __future__ import division, print_function, unicode_literals
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, query as django_query
+from django.utils.module_loading import import_string
+
+from .constants import AUDIENCE_KIND, SHARED_WITH
+from .models import Post, PostVisibility
+
+
+USERMODEL = import_string(settings.CUSTOM_USER_MODEL)
+USER_DEPARTMENT_RELATED_NAME = settings.USER_DEPARTMENT_RELATED_NAME
+VISIBILITY_INDEX_ENABLED = getattr(settings, "FEEDS_VISIBILITY_INDEX_ENABLED", False)
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def get_bulk_create_batch_size(model, objs):
+    """
+    Returns the number of rows inserted per statement, BULK_CREATE_BATCH_SIZE within the limits of the database
+    (an explicit batch_size is not capped by the backend e.g. SQLite)
+    """
+    return max(min(BULK_CREATE_BATCH_SIZE, connection.ops.bulk_batch_size(model._meta.concrete_fields, objs)), 1)
+
+
+def get_audience_ids(values):
+    """
+    Returns the ids of the given objects, ids or QuerySet (kept lazy so it is used as a sub query)
+    values: Organization/Department/int/list/QuerySet
+    """
+    if values is None:
+        return []
+    if isinstance(values, django_query.QuerySet):
+        return values.values_list("id", flat=True)
+    if not isinstance(values, (list, tuple, set)):
+        values = [values]
+    return [getattr(value, "pk", value) for value in values]
+
+
+def get_audience_rows(post):
+    """
+    Returns the set of (audience_kind, audience_id) to which the post is shared
+    post: Post
+    """
+    creator = post.created_by
+    rows = set((AUDIENCE_KIND.ORGANIZATION, org_id) for org_id in post.organizations.values_list("id", flat=True))
+    rows.update((AUDIENCE_KIND.DEPARTMENT, dept_id) for dept_id in post.departments.values_list("id", flat=True))
+    rows.update((AUDIENCE_KIND.JOB_FAMILY, jf_id) for jf_id in post.job_families.values_list("id", flat=True))
+    rows.add((AUDIENCE_KIND.CREATOR, post.created_by_id))
+    if post.user_id:
+        rows.add((AUDIENCE_KIND.USER, post.user_id))
+    if creator.organization_id:
+        rows.add((AUDIENCE_KIND.CREATOR_ORGANIZATION, creator.organization_id))
+    rows.update(
+        (AUDIENCE_KIND.CREATOR_DEPARTMENT, dept_id)
+        for dept_id in getattr(creator, USER_DEPARTMENT_RELATED_NAME).values_list("id", flat=True)
+    )
+    return rows
+
+
+def index_post_visibility(post):
+    """
+    Syncs the PostVisibility rows of the post with its current organizations, departments, job families and users
+    post: Post
+    """
+    rows = get_audience_rows(post)
+    existing_rows = set(PostVisibility.objects.filter(post=post).values_list("audience_kind", "audience_id"))
+    stale_rows = existing_rows - rows
+    new_rows = rows - existing_rows
+    with transaction.atomic():
+        if stale_rows:
+            stale_query = Q()
+            for audience_kind, audience_id in stale_rows:
+                stale_query |= Q(audience_kind=audience_kind, audience_id=audience_id)
+            PostVisibility.objects.filter(stale_query, post=post).delete()
+        if new_rows:
+            PostVisibility.objects.bulk_create([
+                PostVisibility(post=post, audience_kind=audience_kind, audience_id=audience_id)
+                for audience_kind, audience_id in new_rows
+            ])
+
+
+def index_posts_visibility(post_ids):
+    """Syncs the PostVisibility rows of the given posts"""
+    for post in Post.objects.filter(id__in=post_ids).select_related("created_by"):
+        index_post_visibility(post)
+
+
+def reindex_creator_departments(user_ids):
+    """
+    Re-syncs the CREATOR_DEPARTMENT rows of the posts created by the given users,
+    called whenever the department membership of the users changes
+    user_ids: List[int]
+    """
+    for user in USERMODEL.objects.filter(id__in=user_ids):
+        post_ids = list(Post.objects.filter(created_by=user).values_list("id", flat=True))
+        if not post_ids:
+            continue
+        department_ids = list(getattr(user, USER_DEPARTMENT_RELATED_NAME).values_list("id", flat=True))
+        with transaction.atomic():
+            PostVisibility.objects.filter(
+                post_id__in=post_ids, audience_kind=AUDIENCE_KIND.CREATOR_DEPARTMENT).delete()
+            rows = [
+                PostVisibility(post_id=post_id, audience_kind=AUDIENCE_KIND.CREATOR_DEPARTMENT, audience_id=dept_id)
+                for post_id in post_ids for dept_id in department_ids
+            ]
+            PostVisibility.objects.bulk_create(rows, batch_size=get_bulk_create_batch_size(PostVisibility, rows))
+
+
+def reindex_creator_organization(user):
+    """
+    Re-syncs the CREATOR_ORGANIZATION rows of the posts created by the user if the organization has changed
+    user: CustomUser
+    """
+    PostVisibility.objects.filter(
+        post__created_by=user, audience_kind=AUDIENCE_KIND.CREATOR_ORGANIZATION
+    ).exclude(audience_id=user.organization_id).update(audience_id=user.organization_id)
+
+
+def visibility_query(user, organizations, departments):
+    """
+    Returns the query matching the posts shared with the given organizations/departments or with the user
+    using the PostVisibility index, equivalent to the OR of M2M lookups built in accessible_posts_by_user_v2.
+    All the conditions refer to the same join as long as the query is passed to a single filter() call
+    user: CustomUser
+    organizations: Organization/List[Organization]/QuerySet[Organization]
+    departments: QuerySet[Department]
+    """
+    org_ids = get_audience_ids(organizations)
+    department_ids = get_audience_ids(departments)
+    return (
+        Q(visibilities__audience_kind=AUDIENCE_KIND.ORGANIZATION, visibilities__audience_id__in=org_ids) |
+        Q(visibilities__audience_kind=AUDIENCE_KIND.DEPARTMENT, visibilities__audience_id__in=department_ids) |
+        Q(visibilities__audience_kind=AUDIENCE_KIND.USER, visibilities__audience_id=user.id) |
+        Q(shared_with=SHARED_WITH.ALL_DEPARTMENTS, visibilities__audience_kind=AUDIENCE_KIND.CREATOR_ORGANIZATION,
+          visibilities__audience_id__in=org_ids) |
+        Q(shared_with=SHARED_WITH.SELF_DEPARTMENT, visibilities__audience_kind=AUDIENCE_KIND.CREATOR_DEPARTMENT,
+          visibilities__audience_id__in=department_ids)
+    )
+
+
+def rebuild_posts_visibility(post_ids):
+    """
+    Rebuilds the PostVisibility rows of the given posts using a fixed number of grouped queries,
+    used to backfill the index in bulk
+    post_ids: List[int]
+    """
+    posts = Post.objects.filter(id__in=post_ids)
+    rows = set()
+    lookups = (
+        (AUDIENCE_KIND.ORGANIZATION, "organizations"),
+        (AUDIENCE_KIND.DEPARTMENT, "departments"),
+        (AUDIENCE_KIND.JOB_FAMILY, "job_families"),
+        (AUDIENCE_KIND.USER, "user"),
+        (AUDIENCE_KIND.CREATOR, "created_by"),
+        (AUDIENCE_KIND.CREATOR_ORGANIZATION, "created_by__organization"),
+        (AUDIENCE_KIND.CREATOR_DEPARTMENT, "created_by__{}".format(USER_DEPARTMENT_RELATED_NAME)),
+    )
+    for audience_kind, lookup in lookups:
+        rows.update(
+            (post_id, audience_kind, audience_id)
+            for post_id, audience_id in posts.values_list("id", lookup) if audience_id
+        )
+
+    with transaction.atomic():
+        PostVisibility.objects.filter(post_id__in=post_ids).delete()
+        visibility_rows = [
+            PostVisibility(post_id=post_id, audience_kind=audience_kind, audience_id=audience_id)
+            for post_id, audience_kind, audience_id in rows
+        ]
+        PostVisibility.objects.bulk_create(
+            visibility_rows, batch_size=get_bulk_create_batch_size(PostVisibility, visibility_rows))
+    return len(rows)
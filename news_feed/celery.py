@@ -0,0 +1,9 @@
+from __future__ import absolute_import, unicode_literals
+
+from celery import Celery
+
+
+app = Celery("news_feed")
+# the CELERY_* settings (e.g. CELERY_ALWAYS_EAGER of the tests) are read from the django settings
+app.config_from_object("django.conf:settings")
+app.autodiscover_tasks(lambda: ["feeds"])
@@ -0,0 +1,12 @@
+from __future__ import division, print_function, unicode_literals
+
+from feeds.benchmark.generator import TenantGenerator
+
+from .finance.models import Transaction
+
+
+class BenchmarkTenantGenerator(TenantGenerator):
+    """Generates the appreciation transactions with the stub finance app"""
+
+    def create_transaction(self, organization, creator, receiver):
+        return Transaction.objects.create(user=receiver, creator=creator, organization=organization, points=10)
@@ -0,0 +1,10 @@
+from __future__ import division, print_function, unicode_literals
+
+from model_helpers import Choices
+
+
+REPEATED_EVENT_TYPES = Choices({
+    "event_birthday": 0,
+    "event_anniversary": 1,
+    "event_custom": 2,
+})
@@ -1,10 +1,13 @@
 from django.db import models
 
+from .constants import REPEATED_EVENT_TYPES
+
 
 class RepeatedEvent(models.Model):
 
     user = models.ForeignKey("profiles.CustomUser", blank=False, on_delete=models.CASCADE)
     organization = models.ForeignKey("profiles.Organization", related_name="repeated_events", editable=False)
+    event_type = models.SmallIntegerField(choices=REPEATED_EVENT_TYPES(), default=REPEATED_EVENT_TYPES.event_birthday)
 
     month = models.PositiveSmallIntegerField(blank=True, default=0, db_index=True)
     day = models.PositiveSmallIntegerField(db_index=True)
@@ -0,0 +1,12 @@
+from __future__ import division, print_function, unicode_literals
+
+from rest_framework import serializers
+
+from .models import RepeatedEvent
+
+
+class RepeatedEventSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = RepeatedEvent
+        fields = ("id", "user", "event_type", "month", "day", "year")
@@ -16,3 +16,23 @@ class Feedback(models.Model):
 
     def __unicode__(self):
         return self.user.email
+
+    @property
+    def display_status(self):
+        return FEEDBACK_STATUS_OPTIONS.get_display_name(self.status)
+
+    @property
+    def organization_name(self):
+        return self.user.organization.name
+
+    @property
+    def department_name(self):
+        department = self.user.department
+        return department.name if department else ""
+
+    category_id = category_name = sub_category_id = sub_category_name = None
+
+
+class FeedbackPost(models.Model):
+    feedback = models.ForeignKey(Feedback, blank=True, null=True, on_delete=models.CASCADE)
+    post = models.ForeignKey("feeds.Post", on_delete=models.CASCADE)
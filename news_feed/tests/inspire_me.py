@@ -0,0 +1,20 @@
+from __future__ import division, print_function, unicode_literals
+
+
+class InspireMeAPI(object):
+    """Wrapper of the content generation api, the responses are empty in the tests"""
+
+    def amplify_core_value_recognition(self, request):
+        return {}
+
+    def edit_tone(self, request):
+        return {}
+
+    def amplify_content_post(self, request):
+        return {}
+
+    def amplify_content_poll(self, request):
+        return {}
+
+    def proof_read_content(self, request):
+        return {}
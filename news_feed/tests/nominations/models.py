@@ -24,6 +24,8 @@ class NominationCategory(models.Model):
     )
     reviewer_level = models.SmallIntegerField(choices=REVIEWER_LEVEL(), default=REVIEWER_LEVEL.none)
     auto_action_time = models.PositiveIntegerField(blank=True, null=True, help_text="Auto Action Time in Hours")
+    is_group_nomination = models.BooleanField(default=False)
+    can_attach_badge = models.BooleanField(default=False)
 
     def __unicode__(self):
         return self.name
@@ -35,6 +37,8 @@ class Nominations(models.Model):
     points = models.DecimalField(blank=True, null=True, max_digits=12, decimal_places=2)
     nominator = models.ForeignKey("profiles.CustomUser", related_name="current_user")
     assigned_reviewer = models.ManyToManyField("profiles.CustomUser", related_name="reviewer")
+    alternate_reviewer = models.ManyToManyField(
+        "profiles.CustomUser", related_name="alternate_reviewer_nominations", blank=True)
     nominated_team_member = models.ForeignKey("profiles.CustomUser", related_name="nominated_user",
                                               verbose_name="Nominated Team Member"
                                               )
@@ -43,6 +47,8 @@ class Nominations(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     user_strength = models.ForeignKey("profiles.UserStrength", blank=True, null=True, on_delete=models.CASCADE)
     message_to_reviewer = models.TextField(blank=True, null=True)
+    nominees = models.ManyToManyField("profiles.CustomUser", related_name="group_nominations", blank=True)
+    question = models.ManyToManyField("Question", related_name="nominations", blank=True)
 
     def __unicode__(self):
         return self.nominator.email
@@ -56,3 +62,25 @@ class Nominations(models.Model):
         if time_left > 0:
             return time_left
         return None
+
+
+class NominationHistory(models.Model):
+    nomination = models.ForeignKey(Nominations, related_name="histories", on_delete=models.CASCADE)
+    reviewer = models.ForeignKey("profiles.CustomUser", related_name="nomination_histories", on_delete=models.CASCADE)
+    status = models.SmallIntegerField(choices=NOMINATION_STATUS(), default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class Question(models.Model):
+    question_lable = models.CharField(max_length=250)
+    question_type = models.SmallIntegerField(default=0)
+    icon = models.ImageField(upload_to="nominations/questions", blank=True, null=True)
+
+    def __unicode__(self):
+        return self.question_lable
+
+
+class Answer(models.Model):
+    question = models.ForeignKey(Question, related_name="answers", on_delete=models.CASCADE)
+    nomination = models.ForeignKey(Nominations, related_name="answers", on_delete=models.CASCADE)
+    answer = models.TextField(blank=True)
@@ -38,3 +38,8 @@ NOTIFICATION_STATUS = Choices({
     'error': ERROR,
     'inactive': INACTIVE,
 })
+
+EMAIL_TYPE = Choices({
+    "html": 0,
+    "text": 1,
+})
@@ -6,27 +6,56 @@ from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.db import models
+from django.db.models import Q
 from django.template.defaultfilters import slugify
 from django.utils.translation import ugettext_lazy as _
 
 from cropimg.fields import CIImageField, CIThumbnailField
 from easy_thumbnails.exceptions import InvalidImageFormatError
 from easy_thumbnails.files import get_thumbnailer
+from annoying.fields import JSONField
 from model_helpers import upload_to
+from taggit.managers import TaggableManager
+from taggit.models import TaggedItemBase
 
-from .constants import NOTIFICATION_OBJECTS, NOTIFICATION_STATES, NOTIFICATION_STATUS
+from .constants import EMAIL_TYPE, NOTIFICATION_OBJECTS, NOTIFICATION_STATES, NOTIFICATION_STATUS
 
 
 logger = logging.getLogger(__name__)
 
 
+class OrganizationPostAdminTag(TaggedItemBase):
+    content_object = models.ForeignKey("Organization", related_name="post_admin_tagged_items")
+
+
+class OrganizationPostUserTag(TaggedItemBase):
+    content_object = models.ForeignKey("Organization", related_name="post_user_tagged_items")
+
+
 class Organization(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, db_index=False, blank=True)
+    parent = models.ForeignKey("self", related_name="child_organizations", blank=True, null=True)
+    img = models.ImageField(upload_to="organization/images", blank=True, null=True)
+    timezone = models.CharField(max_length=50, default="UTC")
+    appreciation_screen_setting = JSONField(blank=True, null=False, default="{}")
+    show_greeting_department = models.BooleanField(default=False)
+    post_admin_tags = TaggableManager(through=OrganizationPostAdminTag, related_name="admin_tag_organizations",
+                                      blank=True)
+    post_user_tags = TaggableManager(through=OrganizationPostUserTag, related_name="user_tag_organizations",
+                                     blank=True)
 
     def __unicode__(self):
         return self.name
 
+    @property
+    def display_img_url(self):
+        return self.img.url if self.img else ""
+
+    @property
+    def has_setting_to_show_greeting_department(self):
+        return self.show_greeting_department
+
 
 class CustomUserBase(AbstractBaseUser):
 
@@ -125,6 +154,10 @@ class CustomUser(CustomUserBase):
     # img_display = CIThumbnailField('image', (1, 1), blank=True, null=True)
     # img_thumbnail = CIThumbnailField('image', (1, 1), blank=True, null=True)
     hide_appreciation = models.BooleanField(default=False, help_text="Hide appreciations from other users")
+    is_dob_public = models.BooleanField(default=True)
+    is_anniversary_public = models.BooleanField(default=True)
+    allow_user_post_feed = models.BooleanField(default=True)
+    appreciation_budget_left_in_month = models.IntegerField(default=0)
 
     objects = DefaultCustomUserManager()
 
@@ -163,6 +196,35 @@ class CustomUser(CustomUserBase):
     def department(self):
         return self.departments.first()
 
+    @property
+    def cached_departments(self):
+        return self.departments.all()
+
+    @property
+    def job_family(self):
+        employee_id_store = EmployeeIDStore.objects.filter(user=self).select_related("job_family").first()
+        return employee_id_store.job_family if employee_id_store else None
+
+    @property
+    def job_families(self):
+        return UserJobFamily.objects.filter(employee_id_stores__user=self)
+
+    @property
+    def child_organizations(self):
+        """Organization of the user and the organizations under it"""
+        return Organization.objects.filter(Q(id=self.organization_id) | Q(parent_id=self.organization_id))
+
+    @property
+    def orgs_to_access_appreciation(self):
+        return Organization.objects.filter(id=self.organization_id)
+
+    def get_affiliated_orgs(self):
+        return self.child_organizations
+
+    @property
+    def is_nomination_reviewer(self):
+        return self.reviewer.exists() or self.alternate_reviewer_nominations.exists()
+
     @property
     def full_name(self):
         return self.get_full_name()
@@ -276,6 +338,12 @@ class PasswordHistory(models.Model):
         verbose_name_plural = "Password history entries"
 
 
+class PendingEmailManager(models.Manager):
+
+    def send_email(self, email, from_user, subject, body, email_type=EMAIL_TYPE.html):
+        return self.create(to=email, from_user=from_user, subject=subject, body=body, type=email_type)
+
+
 class PendingEmail(models.Model):
     """
     This model keeps record of all the weekly mails sent.
@@ -307,6 +375,8 @@ class PendingEmail(models.Model):
     remarks = models.TextField(null=True, blank=True, verbose_name=_("remarks"))
     created = models.DateTimeField(auto_now_add=True, verbose_name=_("created"))
 
+    objects = PendingEmailManager()
+
     class Meta:
         verbose_name = _("pending email")
         verbose_name_plural = _("pending emails")
@@ -349,6 +419,7 @@ class PushNotification(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     is_viewed = models.BooleanField(default=False, editable=False)
+    extra_context = JSONField(default={}, blank=True)
 
     def __unicode__(self):
         return "{sender} - {recipient}".format(sender=self.sender,
@@ -418,3 +489,47 @@ class SuperVisor(models.Model):
 
     def __unicode__(self):
         return "%s" % (self.supervisor.email)
+
+
+class UserJobFamily(models.Model):
+    organization = models.ForeignKey(Organization, related_name="job_families", on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    is_active = models.BooleanField(default=True)
+
+    def __unicode__(self):
+        return self.name
+
+
+class EmployeeIDStore(models.Model):
+    user = models.OneToOneField(CustomUser, related_name="employee_id_store", blank=True, null=True)
+    organization = models.ForeignKey(Organization, blank=True, null=True, on_delete=models.CASCADE)
+    job_family = models.ForeignKey(UserJobFamily, related_name="employee_id_stores", blank=True, null=True,
+                                   on_delete=models.SET_NULL)
+    signed_up = models.BooleanField(default=False)
+
+
+class OrganizationSettingsManager(models.Manager):
+
+    def get_value(self, key, organization):
+        setting = self.filter(key=key, organization=organization).first()
+        return setting.value if setting else False
+
+
+class OrganizationSettings(models.Model):
+    organization = models.ForeignKey(Organization, related_name="settings", on_delete=models.CASCADE)
+    key = models.CharField(max_length=100)
+    value = models.BooleanField(default=False)
+
+    objects = OrganizationSettingsManager()
+
+
+class EmailTemplate(models.Model):
+    FEEDBACK_NEW_COMMENT = "feedback_new_comment"
+
+    name = models.CharField(max_length=100, unique=True)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+
+    @classmethod
+    def get_feedback_new_comment_notification_template(cls):
+        return cls.objects.filter(name=cls.FEEDBACK_NEW_COMMENT).first()
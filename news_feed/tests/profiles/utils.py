@@ -0,0 +1,6 @@
+from __future__ import division, print_function, unicode_literals
+
+
+def check_org_email(email):
+    """Returns the sender address of the emails sent on behalf of the user"""
+    return email
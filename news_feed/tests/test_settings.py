@@ -60,6 +60,33 @@ DATABASES = {
     }
 }
 
+# PostgreSQL only features (upserts, partial indexes) are tested when the tests run against PostgreSQL
+if os.environ.get('FEEDS_TEST_POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'NAME': os.environ['FEEDS_TEST_POSTGRES_DB'],
+        'USER': os.environ.get('FEEDS_TEST_POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('FEEDS_TEST_POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('FEEDS_TEST_POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('FEEDS_TEST_POSTGRES_PORT', '5432'),
+    }
+
+
+class DisableMigrations(object):
+    """
+    Migrations of feeds depend on the migrations of the host apps (e.g. profiles), which are not part of the test
+    apps, so the tables of the tests are created from the models
+    """
+
+    def __contains__(self, item):
+        return True
+
+    def __getitem__(self, item):
+        return "notmigrations"
+
+
+MIGRATION_MODULES = DisableMigrations()
+
 REST_FRAMEWORK = {
     'DATETIME_FORMAT': '%Y-%m-%dT%H:%M:%S',
     'DEFAULT_FILTER_BACKENDS': (
@@ -97,3 +124,27 @@ PROFILE_LAST_NAME = 'last_name'
 NOTIF_OBJECT_TYPE_FIELD_NAME = 'object_type'
 NOTIF_OBJECT_ID_FIELD_NAME = 'object_id'
 USER_DEPARTMENT_RELATED_NAME = 'departments'
+USER_JOB_FAMILY = 'news_feed.tests.profiles.models.UserJobFamily'
+EMPLOYEE_ID_STORE = 'news_feed.tests.profiles.models.EmployeeIDStore'
+ORGANIZATION_SETTINGS_MODEL = 'news_feed.tests.profiles.models.OrganizationSettings'
+TEMPLATE_MODEL = 'news_feed.tests.profiles.models.EmailTemplate'
+EMAIL_TYPE = 'news_feed.tests.profiles.constants.EMAIL_TYPE'
+CHECK_ORG_EMAIL = 'news_feed.tests.profiles.utils.check_org_email'
+QUESTION_MODEL = 'news_feed.tests.nominations.models.Question'
+ANSWER_MODEL = 'news_feed.tests.nominations.models.Answer'
+REVIEWER_LEVEL = 'news_feed.tests.nominations.constants.REVIEWER_LEVEL'
+POINTS_TABLE = 'news_feed.tests.finance.models.PointsTable'
+POINT_SOURCE = 'news_feed.tests.finance.constants.POINT_SOURCE'
+REPEATED_EVENT_TYPES_CHOICE = 'news_feed.tests.events.constants.REPEATED_EVENT_TYPES'
+REPEATED_EVENT_SERIALIZER = 'news_feed.tests.events.serializers.RepeatedEventSerializer'
+API_WRAPPER_CLASS = 'news_feed.tests.inspire_me.InspireMeAPI'
+MULTI_ORG_POST_ENABLE_FLAG = 'multi_org_post'
+DEFAULT_PROFILE_PICTURE = ''
+FEEDS_PAGE_SIZE = 10
+
+# celery tasks (e.g. notification fan-out) run in process
+CELERY_ALWAYS_EAGER = True
+CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
+
+# benchmarks (benchmark_feeds / benchmark_post_strengths) generate the transactions with the stub finance app
+FEEDS_BENCHMARK_GENERATOR = 'news_feed.tests.benchmark.BenchmarkTenantGenerator'